@@ -0,0 +1,62 @@
+""" JSON Codec Benchmark
+
+Compare the JSON codecs on representative REST API payloads.
+
+Example:
+    python benchmarks/bench_codecs.py --number 200
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from testharness.rest_api.json_codecs import CODECS  # noqa: E402
+
+
+def payloads():
+    """ Representative payloads: a small object, a page of records, a bulk upload. """
+    record = {
+        'id': 12345, 'name': 'server-12345.example.com', 'active': True, 'score': 98.6,
+        'tags': ['prod', 'east', 'web'], 'owner': {'id': 7, 'email': 'ops@example.com'},
+    }
+    return [
+        ('small object', record),
+        ('page of 100 records', {'items': [dict(record, id=n) for n in range(100)],
+                                 'next_cursor': 'abc'}),
+        ('bulk of 10000 records', [dict(record, id=n) for n in range(10000)]),
+    ]
+
+
+def available_codecs():
+    codecs = []
+    for (name, codec_class) in sorted(CODECS.items()):
+        try:
+            codecs.append((name, codec_class()))
+        except ImportError as e:
+            print('skip {}: {}'.format(name, e))
+    return codecs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the JSON codecs.')
+    parser.add_argument('-n', '--number', type=int, default=100, help='runs per measurement')
+    args = parser.parse_args(argv)
+
+    codecs = available_codecs()
+    print('{:<24} {:<8} {:>12} {:>12}'.format('payload', 'codec', 'encode us', 'decode us'))
+    for (payload_name, payload) in payloads():
+        for (codec_name, codec) in codecs:
+            data = codec.dumps(payload)
+            encode = min(timeit.repeat(lambda: codec.dumps(payload), number=args.number,
+                                       repeat=3)) / args.number
+            decode = min(timeit.repeat(lambda: codec.loads(data), number=args.number,
+                                       repeat=3)) / args.number
+            print('{:<24} {:<8} {:>12.1f} {:>12.1f}'.format(
+                payload_name, codec_name, encode * 1e6, decode * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+""" Test Harness Overhead Benchmark
+
+Measure what the harness clients add on top of the raw HTTP libraries.
+
+RestApiClient is compared with a raw requests.Session against a local
+stdlib HTTP server; FlaskTestingRestApiClient with the raw Flask test_client
+on the tests' Flask app (skipped unless flask and flask_restplus are installed).
+The cases are single-call latency, throughput under concurrency, memory
+per request and import time.
+
+The results are one JSON document. Each "*_ratio" is harness / raw,
+so lower is better and it holds across machines: pass a previous run
+as "--baseline" to fail on a ratio that grew past the tolerance.
+
+Example (from the repository root):
+    python benchmarks/bench_harness.py --output bench.json
+    python benchmarks/bench_harness.py --baseline bench.json --tolerance 0.25
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+from testharness.rest_api import __version__  # noqa: E402
+from testharness.rest_api.clients.live import RestApiClient  # noqa: E402
+from tests.testharness.rest_api.clients.http_server import (  # noqa: E402
+    JsonTestHandler, LocalTestServer)
+
+REST_URL = '/v1/bench/object'
+
+
+class BenchHandler(JsonTestHandler):
+    """ the test server's handler, with no Nagle delay on its small writes """
+    disable_nagle_algorithm = True
+
+
+def latency_stats(call, number):
+    """ Latency Statistics.
+
+    :param call: callable sending one request
+    :param int number: requests to time
+    :returns: dict of mean, p50 and p99 latency (in microseconds)
+    """
+
+    latencies = []
+    for n in range(number):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1e6)
+
+    latencies.sort()
+    return {
+        'mean_us': round(statistics.mean(latencies), 1),
+        'p50_us': round(latencies[len(latencies) // 2], 1),
+        'p99_us': round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)], 1),
+    }
+
+
+def compare_latency(raw_call, client_call, number):
+    """ Compare single-call latency, after a warm-up of each. """
+    for call in (raw_call, client_call):
+        for n in range(min(number, 50)):
+            call()
+
+    raw = latency_stats(raw_call, number)
+    client = latency_stats(client_call, number)
+    return {
+        'raw': raw,
+        'client': client,
+        'overhead_us': round(client['mean_us'] - raw['mean_us'], 1),
+        'latency_ratio': round(client['mean_us'] / raw['mean_us'], 3),
+    }
+
+
+def throughput(call, number, workers):
+    """ requests per second with "workers" threads sending "number" requests """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda n: call(), range(number)))
+        return number / (time.perf_counter() - start)
+
+
+def compare_throughput(raw_call, client_call, number, workers):
+    """ Compare throughput under concurrency. """
+    raw = throughput(raw_call, number, workers)
+    client = throughput(client_call, number, workers)
+    return {
+        'workers': workers,
+        'raw_rps': round(raw, 1),
+        'client_rps': round(client, 1),
+        'throughput_ratio': round(raw / client, 3),
+    }
+
+
+def bytes_per_request(call, number):
+    """ Python heap in use at the request's peak, and retained after it, in bytes. """
+    call()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        (start, _) = tracemalloc.get_traced_memory()
+        peaks = []
+        for n in range(number):
+            (before, _) = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        gc.collect()
+        (after, _) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'peak_bytes': round(statistics.mean(peaks), 1),
+        'retained_bytes': round((after - start) / number, 1),
+    }
+
+
+def compare_memory(raw_call, client_call, number):
+    """ Compare memory per request. """
+    raw = bytes_per_request(raw_call, number)
+    client = bytes_per_request(client_call, number)
+    return {
+        'raw': raw,
+        'client': client,
+        'memory_ratio': round(client['peak_bytes'] / max(raw['peak_bytes'], 1.0), 3),
+    }
+
+
+def import_seconds(module, repeat=5):
+    """ best time to import a module in a fresh interpreter (in seconds) """
+    code = ('import time; start = time.perf_counter(); import {}; '
+            'print(time.perf_counter() - start)').format(module)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    return min(float(subprocess.check_output([sys.executable, '-c', code], env=env))
+               for n in range(repeat))
+
+
+def bench_import():
+    raw = import_seconds('requests')
+    harness = import_seconds('testharness.rest_api.testcases')
+    return {
+        'requests_ms': round(raw * 1e3, 2),
+        'testharness_ms': round(harness * 1e3, 2),
+        'import_ratio': round(harness / raw, 3),
+    }
+
+
+def bench_live(args):
+    """ RestApiClient vs a raw requests.Session on a local HTTP server. """
+    server = LocalTestServer(BenchHandler).start()
+    client = RestApiClient(server.host, port=server.port, pool_maxsize=args.workers)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.workers)
+    session.mount('http://', adapter)
+    raw_url = client.get_url(REST_URL)
+    headers = client._add_rest_headers()
+
+    def raw_call():
+        session.get(raw_url, headers=headers, timeout=client.response_timeout).json()
+
+    def client_call():
+        client.get(REST_URL).json()
+
+    try:
+        return {
+            'latency': compare_latency(raw_call, client_call, args.number),
+            'throughput': compare_throughput(raw_call, client_call, args.number, args.workers),
+            'memory': compare_memory(raw_call, client_call, args.memory_number),
+        }
+    finally:
+        session.close()
+        client.close()
+        server.stop()
+
+
+def bench_flask(args):
+    """ FlaskTestingRestApiClient vs the raw Flask test_client. """
+    try:
+        from testharness.rest_api.clients.flask import FlaskTestingRestApiClient
+        from tests.testharness.rest_api.clients.flask.server import app
+    except ImportError as e:
+        return {'skipped': str(e)}
+
+    client = FlaskTestingRestApiClient(app)
+    test_client = app.test_client()
+    headers = client._add_rest_headers()
+
+    def raw_call():
+        test_client.get('/v1/testing/hello', headers=headers).json
+
+    def client_call():
+        client.get('/v1/testing/hello').json
+
+    return {
+        'latency': compare_latency(raw_call, client_call, args.number),
+        'memory': compare_memory(raw_call, client_call, args.memory_number),
+    }
+
+
+def ratios(results, path=()):
+    """ flatten the "*_ratio" results into {"a.b.name_ratio": value} """
+    found = {}
+    for (key, value) in results.items():
+        if isinstance(value, dict):
+            found.update(ratios(value, path + (key,)))
+        elif key.endswith('_ratio'):
+            found['.'.join(path + (key,))] = value
+    return found
+
+
+def regressions(results, baseline, tolerance):
+    """ Regressions.
+
+    :returns: list of messages, one per ratio grown past (1 + tolerance) times the baseline
+    """
+
+    current = ratios(results['benchmarks'])
+    found = []
+    for (name, before) in sorted(ratios(baseline['benchmarks']).items()):
+        after = current.get(name)
+        if after is not None and after > before * (1.0 + tolerance):
+            found.append('{}: {} -> {} (+{:.0%})'.format(name, before, after,
+                                                         after / before - 1))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the test harness client overhead.')
+    parser.add_argument('-n', '--number', type=int, default=500,
+                        help='requests per latency or throughput measurement')
+    parser.add_argument('--memory-number', type=int, default=100,
+                        help='requests per memory measurement')
+    parser.add_argument('-w', '--workers', type=int, default=8,
+                        help='concurrent requests for throughput')
+    parser.add_argument('-o', '--output', help='write the JSON results to a file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed ratio growth over the baseline (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    results = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {'number': args.number, 'memory_number': args.memory_number,
+                       'workers': args.workers},
+        'benchmarks': {
+            'live': bench_live(args),
+            'flask': bench_flask(args),
+            'import': bench_import(),
+        },
+    }
+
+    document = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(document + '\n')
+    else:
+        print(document)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for message in found:
+            print('REGRESSION {}'.format(message), file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+""" URL Composition Benchmark
+
+Compare the per-call cost of "get_url" / "delete_url" with a precompiled Route,
+as seen in a hot request loop with DEBUG logging off.
+
+Example:
+    python benchmarks/bench_urls.py --number 100000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from testharness.rest_api.clients.base import BaseRestApiClient  # noqa: E402
+
+
+def cases(client):
+    """ Pairs of (name, callable) doing the same URL composition. """
+    things = client.route('/v1/things')
+    thing = client.route('/v1/things/{id}')
+    query = {'page': 2, 'type': 'server'}
+
+    return [
+        ('get_url no query', lambda: client.get_url('/v1/things')),
+        ('route.url no query', lambda: things.url()),
+        ('get_url with query', lambda: client.get_url('/v1/things', query=query)),
+        ('route.url with query', lambda: things.url(query)),
+        ('delete_url object_key', lambda: client.delete_url('/v1/things', 12345)),
+        ('route.url path param', lambda: thing.url(id=12345)),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare URL composition per call.')
+    parser.add_argument('-n', '--number', type=int, default=100000,
+                        help='calls per measurement')
+    args = parser.parse_args(argv)
+
+    logging.getLogger('testharness').setLevel(logging.WARNING)
+    client = BaseRestApiClient('test.example.com')
+
+    print('{:<24} {:>10}'.format('case', 'ns/call'))
+    for (name, func) in cases(client):
+        best = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print('{:<24} {:>10.0f}'.format(name, best * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,17 @@
 #! /usr/bin/env python
 
+import os
+import re
+
 from setuptools import setup, find_packages
-from testharness.rest_api import __version__
+
+
+def version():
+    """ read __version__ without importing the package """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'testharness', 'rest_api', '__init__.py')
+    with open(path) as f:
+        return re.search(r"^__version__ = '([^']+)'", f.read(), re.M).group(1)
 
 
 def readme():
@@ -10,7 +20,7 @@ def readme():
 
 
 setup(name='testharness_rest_api',
-      version=__version__,
+      version=version(),
       license='PSF',
       description='REST API Test Harness for unittest',
       long_description=readme(),
@@ -21,6 +31,16 @@ setup(name='testharness_rest_api',
       install_requires=[
           'requests>=2.20.1',
       ],
+      extras_require={
+          'orjson': ['orjson>=3.0'],
+          'compression': ['brotli>=1.0', 'zstandard>=0.18'],
+      },
+      entry_points={
+          'console_scripts': [
+              'testharness-rest-api-runner=testharness.rest_api.runner:main',
+              'testharness-rest-api=testharness.rest_api.history:main',
+          ],
+      },
       test_suite='nose.collector',
       # tests_require=['nose>=1.3.7', 'coverage>=4.4.1'],
       # NOTE: ./setup.py nosetests <= needs "setup_requires"
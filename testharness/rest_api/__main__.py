@@ -0,0 +1,8 @@
+""" python -m testharness.rest_api: the performance history command line """
+
+import sys
+
+from .history import main
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,62 @@
+""" REST API Test Harness for asyncio
+
+The async unittest.TestCase subclass, apart so that importing "testcases"
+does not import asyncio. Import it from "testcases" as usual.
+"""
+
+import unittest
+
+from .clients.async_live import AsyncRestApiClient
+from .testcases import RestApiAssertionsMixin
+
+
+class AsyncLiveRestApiTestCase(RestApiAssertionsMixin, unittest.IsolatedAsyncioTestCase):
+    """ Async Live REST API Test Case.
+
+    This Test Case provides a QA or Regression testing plan with asyncio.
+
+    Each "async def" test method awaits the client's get/post/delete, so
+    it can asyncio.gather() many endpoint checks at once. The client keeps
+    at most MAX_CONCURRENCY requests in flight.
+    """
+
+    # Change these constants in the subclass to the real server.
+    SCHEME = 'http'  # Change to "https" SSL as needed.
+    HOST = 'example.com'
+    PORT = 80
+
+    MAX_CONCURRENCY = 10
+
+    # Request timings sink for the shared client (default: in-memory histograms).
+    METRICS_SINK = None
+
+    # RetryPolicy for transient failures (default: no retries).
+    RETRY_POLICY = None
+
+    # Throttle of request rate and concurrency (default: no limits).
+    THROTTLE = None
+
+    # Compression of request bodies and Accept-Encoding (default: uncompressed requests).
+    COMPRESSION = None
+
+    # OpenAPI document for assertMatchesSchema: rest_url, file path or dict (default: none).
+    OPENAPI_SPEC = None
+
+    # JSON codec name or JsonCodec (default: orjson when installed, else json).
+    JSON_CODEC = None
+
+    @classmethod
+    def setUpClass(cls):
+        """ prepare async HTTP client """
+        cls.client = AsyncRestApiClient(
+            cls.HOST, port=cls.PORT, scheme=cls.SCHEME,
+            max_concurrency=cls.MAX_CONCURRENCY, metrics=cls.METRICS_SINK,
+            retry=cls.RETRY_POLICY, codec=cls.JSON_CODEC, throttle=cls.THROTTLE,
+            compression=cls.COMPRESSION)
+        if cls.OPENAPI_SPEC is not None:
+            cls.client.load_openapi(cls.OPENAPI_SPEC)
+
+    @classmethod
+    def tearDownClass(cls):
+        """ close async HTTP client connections """
+        cls.client.close()
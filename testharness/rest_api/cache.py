@@ -0,0 +1,175 @@
+""" REST API Response Cache
+
+Reuse GET responses across the tests of a class.
+
+The cache is opt-in: pass a ResponseCache to the client. GET responses are
+keyed on the full URL from "get_url". An entry is fresh for "ttl" seconds;
+after that the client revalidates it with If-None-Match / If-Modified-Since,
+so an unchanged resource costs a 304 instead of its whole body. At most
+"max_entries" responses are kept, evicting the least recently used.
+A POST or DELETE on a rest_url drops every entry under the same prefix.
+"""
+
+import logging
+import threading
+import time
+
+from collections import OrderedDict, namedtuple
+
+log = logging.getLogger(__name__)
+
+# Cache counters.
+#   hits: GETs served from the cache without a request
+#   misses: GETs sent to the server (revalidated: those answered "304 Not Modified")
+CacheStats = namedtuple('CacheStats', [
+    'hits', 'misses', 'revalidated', 'evictions', 'invalidations', 'entries'])
+
+
+class CacheEntry(object):
+    """ Cache Entry: one GET response and its validators. """
+
+    __slots__ = ('rest_url', 'response', 'stored', 'etag', 'last_modified')
+
+    def __init__(self, rest_url, response, stored):
+        self.rest_url = rest_url
+        self.response = response
+        self.stored = stored
+
+        headers = getattr(response, 'headers', None) or {}
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+
+    def validators(self):
+        """ conditional request headers to revalidate the entry """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def _under(rest_url, prefix):
+    """ the rest_url is the prefix path or one of its sub-paths """
+    return rest_url == prefix or rest_url.startswith(prefix.rstrip('/') + '/')
+
+
+def _no_store(response):
+    cache_control = (getattr(response, 'headers', None) or {}).get('Cache-Control', '')
+    return 'no-store' in cache_control.lower()
+
+
+class ResponseCache(object):
+    """ Response Cache.
+
+    LRU and TTL bounded GET responses with revalidation; safe across threads.
+    """
+
+    def __init__(self, max_entries=256, ttl=60.0, clock=time.monotonic):
+        """ Init ResponseCache.
+
+        :param int max_entries: most responses kept (least recently used are evicted)
+        :param float ttl: seconds an entry is used without revalidation
+        :param clock: monotonic time function
+        """
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, full_url):
+        """ Lookup a GET response.
+
+        :param full_url: the GET endpoint URL
+        :returns: tuple (CacheEntry or None, bool fresh)
+        """
+
+        with self._lock:
+            entry = self._entries.get(full_url)
+            if entry is None:
+                self.misses += 1
+                return (None, False)
+
+            self._entries.move_to_end(full_url)
+            if self._clock() - entry.stored < self.ttl:
+                self.hits += 1
+                return (entry, True)
+
+            self.misses += 1
+            if not (entry.etag or entry.last_modified):
+                del self._entries[full_url]
+                return (None, False)
+            return (entry, False)
+
+    def store(self, full_url, rest_url, response):
+        """ Store a 200 GET response, unless it says "Cache-Control: no-store". """
+        if _no_store(response):
+            return
+
+        with self._lock:
+            self._entries[full_url] = CacheEntry(rest_url, response, self._clock())
+            self._entries.move_to_end(full_url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def revalidate(self, full_url, entry, not_modified):
+        """ Revalidate an entry.
+
+        :param entry: the stale CacheEntry
+        :param not_modified: the 304 response to the conditional GET
+        :returns: the cached response, fresh again
+        """
+
+        with self._lock:
+            entry.stored = self._clock()
+            headers = getattr(not_modified, 'headers', None) or {}
+            entry.etag = headers.get('ETag') or entry.etag
+            self.revalidated += 1
+            if full_url in self._entries:
+                self._entries.move_to_end(full_url)
+        return entry.response
+
+    def invalidate(self, rest_url):
+        """ Drop the entries under (or above) the rest_url prefix.
+
+        :param rest_url: the relative URL a POST or DELETE touched
+        :returns: number of entries dropped
+        """
+
+        with self._lock:
+            stale = [url for (url, entry) in self._entries.items()
+                     if _under(entry.rest_url, rest_url) or _under(rest_url, entry.rest_url)]
+            for url in stale:
+                del self._entries[url]
+            self.invalidations += len(stale)
+
+        if stale:
+            log.debug('Cache invalidated %d entries under %s', len(stale), rest_url)
+        return len(stale)
+
+    def clear(self):
+        """ Drop every entry. """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """ Cache Statistics.
+
+        :returns: a CacheStats
+        """
+
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.revalidated, self.evictions,
+                              self.invalidations, len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,41 @@
+""" REST API Clients
+
+The HTTP REST Client backends load lazily, on first use: importing this
+package does not import "requests", Flask or asyncio.
+
+Example:
+    from testharness.rest_api.clients import RestApiClient
+"""
+
+import importlib
+
+# Client class name -> module, imported on first attribute access.
+_LAZY_CLIENTS = {
+    'BaseRestApiClient': 'base',
+    'BatchResult': 'base',
+    'RestApiClient': 'live',
+    'AsyncRestApiClient': 'async_live',
+    'FlaskTestingRestApiClient': 'flask',
+    'RecordingRestApiClient': 'cassette',
+    'ReplayRestApiClient': 'cassette',
+    'CassetteError': 'cassette',
+    'MultiHostRestApiClient': 'multi',
+    'MultiResponse': 'multi',
+    'WSGIAdapter': 'wsgi',
+}
+
+__all__ = sorted(_LAZY_CLIENTS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_CLIENTS.get(name)
+    if module_name is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+    value = getattr(importlib.import_module('.' + module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_CLIENTS))
@@ -0,0 +1,194 @@
+""" Async Live REST API Client
+
+The Live HTTP REST Client implementation for asyncio.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ..pagination import OffsetPagination
+from .base import BaseRestApiClient, BatchResult
+from .live import PooledSessionMixin
+
+# log package name.
+log = logging.getLogger('.'.join(__name__.split('.')[:-1]))
+
+
+class AsyncRestApiClient(PooledSessionMixin, BaseRestApiClient):
+    """ Async Live REST API Client.
+
+    This HTTP client provides a REST API requests implementation as awaitables.
+    Each request runs on a pooled requests.Session in a worker thread.
+    There are at most "max_concurrency" requests in flight, so tests may
+    asyncio.gather() hundreds of requests without flooding the server.
+    """
+
+    def __init__(self, hostname, port=80, scheme='http', response_timeout=10.0,
+                 max_concurrency=10, metrics=None, cache=None, retry=None,
+                 codec=None, throttle=None, compression=None):
+        """ Init AsyncRestApiClient.
+
+        :param str hostname: server hostname
+        :param int port: server port number
+        :param str scheme: URL scheme is "http" unless set to "https" for SSL
+        :param float response_timeout: wait timeout for a response (in seconds)
+        :param int max_concurrency: maximum number of requests in flight
+        :param metrics: a MetricsSink for request timings (default: in-memory histograms)
+        :param cache: a ResponseCache for GET responses (default: no caching)
+        :param retry: a RetryPolicy for transient failures (default: no retries)
+        :param codec: a JsonCodec or codec name (default: orjson when installed, else json)
+        :param throttle: a Throttle of request rate and concurrency, shared by the
+            worker threads (default: no limits)
+        :param compression: a Compression of request bodies and Accept-Encoding
+            (default: uncompressed requests, the HTTP library's Accept-Encoding)
+        """
+
+        super().__init__(hostname, port=port, scheme=scheme, response_timeout=response_timeout,
+                         metrics=metrics, cache=cache, retry=retry,
+                         codec=codec, throttle=throttle, compression=compression)
+
+        self.max_concurrency = max_concurrency
+        self._init_session(pool_maxsize=max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix='AsyncRestApiClient')
+
+    async def _run(self, func, *args, **kwargs):
+        """ Run a blocking session call in the worker thread pool.
+
+        :param func: a blocking requests.Session method
+        :returns: the call's return value
+        """
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,
+                                          functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        """ Close the worker threads and the session's pooled connections. """
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    # =================================================
+    # REST API: Dispatch
+    # =================================================
+
+    async def request(self, method, rest_url, query=None, payload=None, object_key=None,
+                      stream=False, full_url=None):
+        """ REST API Request.
+
+        Every HTTP verb dispatches here, so "await client.get(...)" and the
+        other verbs await the request in the worker thread pool.
+
+        :param str method: HTTP method
+        :param rest_url: a relative URL on the API
+        :param query: query string params as dict
+        :param payload: JSON payload to send
+        :param object_key: a key or id appended to the URL path
+        :param bool stream: leave the response body unread
+        :param full_url: the precomposed endpoint URL of a Route
+        returns: an HTTP response
+        """
+
+        return await self._run(super().request, method, rest_url, query=query, payload=payload,
+                               object_key=object_key, stream=stream, full_url=full_url)
+
+    def get_stream(self, rest_url, query={}, chunk_size=None):
+        """ GET Stream is not available: reading the body would block the event loop. """
+        raise NotImplementedError('GET Stream needs the RestApiClient: {}'.format(
+            self.get_url(rest_url, query=query)))
+
+    # =================================================
+    # REST API: Pagination
+    # =================================================
+
+    async def paginate(self, rest_url, query={}, strategy=None, prefetch=True):
+        """ Paginate a REST API Collection.
+
+        Await each page of the collection and yield its items, in order.
+        Iterate it with "async for"; with "prefetch", the next page is
+        already in flight while the caller consumes the current page.
+
+        :param rest_url: a relative URL on the API
+        :param query: query string params as dict, for the first page
+        :param strategy: a PaginationStrategy (default: OffsetPagination())
+        :param bool prefetch: GET the next page while this one is consumed
+        :returns: async generator of the collection items
+        """
+
+        strategy = strategy if strategy is not None else OffsetPagination()
+        page = strategy.first_page(rest_url, query)
+        pending = asyncio.ensure_future(self.get(*page)) if prefetch else None
+
+        try:
+            while page is not None:
+                resp = await (pending if prefetch else self.get(*page))
+                data = self.json(resp)
+                items = strategy.page_items(resp, data=data)
+                log.debug('Client page %s %s: %d items', page[0], page[1], len(items))
+
+                page = strategy.next_page(page, resp, items, data=data)
+                if page is not None and prefetch:
+                    pending = asyncio.ensure_future(self.get(*page))
+                for item in items:
+                    yield item
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    # =================================================
+    # REST API: Batch Requests
+    # =================================================
+
+    async def _batch_call(self, request, semaphore):
+        """ Batch Call.
+
+        Await one batch request on its HTTP method and time it.
+
+        :param request: tuple (method, rest_url) or (method, rest_url, args)
+        :param semaphore: asyncio.Semaphore bounding the batch's requests in flight
+        :returns: a BatchResult
+        """
+
+        (http_method, rest_url, args) = self._batch_method(request)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await http_method(rest_url, *args)
+            return BatchResult(response, time.perf_counter() - start)
+
+    async def batch(self, batch_requests, max_workers=None):
+        """ Batch of REST API Requests.
+
+        Gather the requests with at most "max_workers" in flight.
+
+        :param batch_requests: list of tuples (method, rest_url, args)
+        :param max_workers: maximum concurrent requests (default: max_concurrency)
+        :returns: list of BatchResult in input order
+        """
+
+        semaphore = asyncio.Semaphore(max_workers or self.max_concurrency)
+        return list(await asyncio.gather(*[
+            self._batch_call(request, semaphore) for request in batch_requests
+        ]))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    log.setLevel(logging.DEBUG)
+    log.addHandler(logging.StreamHandler())
+
+    client = AsyncRestApiClient('micro.dev.att.com', port=8030)
+    sample_rest_url = '/osscwl/servers'
+
+    async def main():
+        responses = await asyncio.gather(*[
+            client.get(sample_rest_url, {'page': n}) for n in range(5)
+        ])
+        for response in responses:
+            print('GET: status={}'.format(response.status_code))
+
+    print('Host URL: ', client.host_url)
+    asyncio.run(main())
+    client.close()
@@ -3,13 +3,101 @@
 The HTTP REST Client interface.
 """
 
+import datetime
+import json
 import logging
+import threading
+import time
 
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
 
+from ..compression import decompress
+from ..json_codecs import get_codec
+from ..metrics import HistogramMetricsSink, RequestTiming
+from ..pagination import OffsetPagination
+from ..routes import Route
+from ..streaming import CHUNK_SIZE, StreamedResponse
+
 # log package name.
 log = logging.getLogger('.'.join(__name__.split('.')[:-1]))
 
+# HTTP methods that change the resource, and so invalidate cached GET responses.
+WRITE_METHODS = frozenset(['DELETE', 'PATCH', 'POST', 'PUT'])
+
+# A batch response with its elapsed wall time (in seconds).
+BatchResult = namedtuple('BatchResult', ['response', 'elapsed'])
+
+# Size of the request body this thread compressed, before compression.
+_request_body_size = threading.local()
+
+
+def _request_bytes(resp, payload, decoded_size=None):
+    """ size of the request body sent, in bytes
+
+    :param decoded_size: size of a compressed body before compression, when known
+    :returns: tuple (decoded size, size on the wire)
+    """
+
+    request = getattr(resp, 'request', None)
+    body = getattr(request, 'body', None)
+    if isinstance(body, str):
+        body = body.encode('utf8')
+    if isinstance(body, bytes):
+        encoding = (getattr(request, 'headers', None) or {}).get('Content-Encoding')
+        if encoding is None:
+            return (len(body), len(body))
+        if decoded_size is None:
+            decoded_size = len(decompress(body, encoding))
+        return (decoded_size, len(body))
+    if payload is not None:
+        size = len(json.dumps(payload).encode('utf8'))
+        return (size, size)
+    return (0, 0)
+
+
+def _log_request(method, full_url, payload=None):
+    """ log the request lazily: nothing is formatted unless DEBUG is on """
+    if payload is not None:
+        log.debug('Client %s %s payload=%s', method, full_url, payload)
+    else:
+        log.debug('Client %s %s', method, full_url)
+
+
+def _content_length(resp):
+    """ the response's Content-Length header, else None """
+    length = (getattr(resp, 'headers', None) or {}).get('Content-Length')
+    return int(length) if str(length).isdigit() else None
+
+
+def _response_bytes(resp, stream=False):
+    """ size of the response body received, in bytes
+
+    :returns: tuple (decoded size, size on the wire)
+    """
+
+    if stream:
+        # Do not read a streamed body: trust its Content-Length, if any.
+        length = _content_length(resp) or 0
+        return (length, length)
+
+    size = 0
+    for name in ('content', 'data'):
+        body = getattr(resp, name, None)
+        if isinstance(body, bytes):
+            size = len(body)
+            break
+    if not (getattr(resp, 'headers', None) or {}).get('Content-Encoding'):
+        return (size, size)
+
+    # The HTTP library decoded the body: count the bytes it read off the wire.
+    tell = getattr(getattr(resp, 'raw', None), 'tell', None)
+    wire = tell() if callable(tell) else None
+    if not isinstance(wire, int) or not wire:
+        wire = _content_length(resp)
+    return (size, wire if wire is not None else size)
+
 
 class BaseRestApiClient(object):
     """ Base REST API Client.
@@ -17,17 +105,33 @@ class BaseRestApiClient(object):
     This HTTP client describes a REST API requests interface.
     """
 
-    def __init__(self, hostname, port=80, scheme='http', response_timeout=10.0):
+    def __init__(self, hostname, port=80, scheme='http', response_timeout=10.0, metrics=None,
+                 cache=None, retry=None, codec=None, throttle=None, compression=None):
         """ Init RestApiClient.
 
         :param str hostname: server hostname
         :param int port: server port number
         :param str scheme: URL scheme is "http" unless set to "https" for SSL
         :param float response_timeout: wait timeout for a response (in seconds)
+        :param metrics: a MetricsSink for request timings (default: in-memory histograms)
+        :param cache: a ResponseCache for GET responses (default: no caching)
+        :param retry: a RetryPolicy for transient failures (default: no retries)
+        :param codec: a JsonCodec or codec name (default: orjson when installed, else json)
+        :param throttle: a Throttle of request rate and concurrency (default: no limits)
+        :param compression: a Compression of request bodies and Accept-Encoding
+            (default: uncompressed requests, the HTTP library's Accept-Encoding)
         """
 
         self.host_url = self._set_host_url(scheme, hostname, port)
         self.response_timeout = response_timeout
+        self.metrics = metrics if metrics is not None else HistogramMetricsSink()
+        self.cache = cache
+        self.retry = retry
+        self.codec = get_codec(codec)
+        self.throttle = throttle
+        self.compression = compression
+        self.openapi = None
+        self._routes = {}
 
     def _set_host_url(self, scheme, hostname, port):
         """ Set Host URL.
@@ -51,19 +155,232 @@ class BaseRestApiClient(object):
         :returns: a full URL
         """
 
-        url_list = [self.host_url, rest_url]
-        url_list.extend(extra_path)
-        full_url = ''.join(url_list)
-        return full_url
+        if not extra_path:
+            return self.host_url + rest_url
+        return ''.join([self.host_url, rest_url] + list(extra_path))
 
     def _add_rest_headers(self, headers={}):
         headers['Content-Type'] = 'application/json'
+        if self.compression is not None:
+            headers['Accept-Encoding'] = self.compression.accept_header
         return headers
 
+    def _request_body(self, payload, headers):
+        """ Request Body.
+
+        Encode the JSON payload, compressed when the client's Compression says so.
+
+        :param payload: JSON payload to send
+        :param headers: request headers as dict; takes the Content-Encoding
+        :returns: dict of keyword arguments for the HTTP library's request call
+        """
+
+        if self.compression is None or self.compression.request_encoding is None:
+            return self.codec.request_body(payload)
+
+        data = self.codec.dumps(payload)
+        (body, encoding) = self.compression.encode(data)
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+            _request_body_size.size = len(data)
+        return {'data': body}
+
+    def json(self, resp):
+        """ Decode the JSON response body with the client's codec.
+
+        :param resp: an HTTP response
+        :returns: the decoded JSON body
+        """
+
+        body = resp.content if hasattr(resp, 'content') else resp.data
+        return self.codec.loads(body)
+
+    def load_openapi(self, source):
+        """ Load the OpenAPI (or Swagger) document that responses are validated against.
+
+        A spec loaded from a file or a rest_url is loaded once, and shared with
+        every client of the same host, with its compiled validators.
+
+        :param source: an OpenApiSpec, a document dict, a file path, or the
+            spec's rest_url on this host (e.g. "/v1/swagger.json")
+        :returns: the client's OpenApiSpec
+        """
+
+        from ..schema import load_spec
+
+        self.openapi = load_spec(source, client=self)
+        return self.openapi
+
+    # =================================================
+    # Request Timing
+    # =================================================
+
+    def _start_transport_timing(self):
+        """ Start collecting connection timings for the next request. """
+        pass
+
+    def _transport_timing(self):
+        """ Transport Timing.
+
+        :returns: tuple (connect, tls) seconds spent opening a new connection
+        """
+
+        return (0.0, 0.0)
+
+    def _timed(self, method, rest_url, full_url, send, payload=None, stream=False):
+        """ Timed Request.
+
+        Send the request and record its RequestTiming in the metrics sink.
+        The timing is also attached to the response as "response.timing".
+        With a RetryPolicy, each attempt is timed and recorded on its own.
+        With a Throttle, each attempt waits for its slot before the timing
+        starts, and a Retry-After answer holds back the host's next requests.
+
+        :param str method: HTTP method
+        :param rest_url: a relative URL on the API
+        :param full_url: the endpoint URL
+        :param send: callable that sends the request and returns the response
+        :param payload: JSON payload sent with the request
+        :param bool stream: the response body is unread; time up to the headers
+        :returns: an HTTP response
+        """
+
+        def timed_send():
+            resp = None
+            self._start_transport_timing()
+            start = time.perf_counter()
+            try:
+                resp = send()
+                return resp
+            finally:
+                self._record_timing(method, rest_url, full_url, resp, payload,
+                                    time.perf_counter() - start, stream=stream)
+
+        def attempt():
+            if self.throttle is None:
+                return timed_send()
+            with self.throttle.slot(self.host_url, rest_url):
+                resp = timed_send()
+            self.throttle.record(self.host_url, resp)
+            return resp
+
+        try:
+            if self.retry is None:
+                return attempt()
+            return self.retry.send(method, full_url, self.host_url, attempt)
+        finally:
+            if self.cache is not None and method in WRITE_METHODS:
+                self.cache.invalidate(rest_url)
+
+    def _record_timing(self, method, rest_url, full_url, resp, payload, total, stream=False):
+        """ Record Timing.
+
+        Timing is best effort: a failing metrics sink is logged, never raised,
+        so it cannot break a request or hide the request's own error.
+
+        :param resp: the HTTP response or None when the request raised
+        :param float total: time to the whole response (in seconds)
+        """
+
+        (connect, tls) = self._transport_timing()
+        decoded_size = getattr(_request_body_size, 'size', None)
+        _request_body_size.size = None
+        try:
+            elapsed = getattr(resp, 'elapsed', None)
+            ttfb = elapsed.total_seconds() if isinstance(elapsed, datetime.timedelta) else total
+
+            (request_bytes, request_wire_bytes) = _request_bytes(resp, payload,
+                                                                 decoded_size=decoded_size)
+            (response_bytes, response_wire_bytes) = _response_bytes(resp, stream=stream)
+            timing = RequestTiming(
+                method, rest_url, full_url, getattr(resp, 'status_code', None),
+                connect, tls, ttfb, total, request_bytes, response_bytes,
+                request_wire_bytes, response_wire_bytes)
+            self.metrics.record(timing)
+        except Exception:
+            log.exception('Metrics sink failed to record %s %s', method, full_url)
+            return
+
+        if resp is not None:
+            try:
+                resp.timing = timing
+            except AttributeError:
+                log.debug('Response %r does not take a timing', resp)
+
+    # =================================================
+    # Response Cache
+    # =================================================
+
+    def _cached_get(self, rest_url, full_url, send):
+        """ Cached GET.
+
+        Answer from the response cache when the entry is fresh, else send
+        the GET, conditional on the stale entry's ETag or Last-Modified.
+
+        :param rest_url: a relative URL on the API
+        :param full_url: the GET endpoint URL
+        :param send: callable(extra headers) that sends the timed GET
+        :returns: an HTTP response
+        """
+
+        if self.cache is None:
+            return send({})
+
+        (entry, fresh) = self.cache.lookup(full_url)
+        if fresh:
+            log.debug('Client GET %s (cached)', full_url)
+            return entry.response
+
+        resp = send(entry.validators() if entry is not None else {})
+        if entry is not None and resp.status_code == 304:
+            return self.cache.revalidate(full_url, entry, resp)
+        if resp.status_code == 200:
+            self.cache.store(full_url, rest_url, resp)
+        return resp
+
     # =================================================
     # Compose URLs.
     # =================================================
 
+    def request_url(self, method, rest_url, query=None, object_key=None, payload=None):
+        """ Request URL.
+
+        :param str method: HTTP method
+        :param rest_url: a relative URL on the API
+        :param query: query string params as dict
+        :param object_key: a key or id appended to the URL path
+        :param payload: JSON payload, only logged
+        :returns: endpoint URL
+        """
+
+        extra_path = ['/', repr(object_key)] if object_key is not None else []
+        full_url = self._get_full_url(rest_url, extra_path=extra_path)
+        if isinstance(query, dict) and query:
+            query_string = urlencode(query)
+            full_url = '?'.join([full_url, query_string])
+
+        _log_request(method, full_url, payload)
+        return full_url
+
+    def route(self, template):
+        """ Route.
+
+        Precompile a URL template for a hot request loop.
+
+        Example:
+            things = client.route('/v1/things/{id}')
+            for n in range(1000):
+                things.get(id=n)
+
+        :param str template: a relative URL with "{name}" path parameters
+        :returns: a Route bound to this client
+        """
+
+        route = self._routes.get(template)
+        if route is None:
+            route = self._routes[template] = Route(self, template)
+        return route
+
     def delete_url(self, rest_url, object_key):
         """ DELETE URL.
 
@@ -72,10 +389,7 @@ class BaseRestApiClient(object):
         :returns: DELETE endpoint URL
         """
 
-        full_url = self._get_full_url(rest_url, extra_path=['/', repr(object_key)])
-        log.debug('Client DELETE {}'.format(full_url))
-
-        return full_url
+        return self.request_url('DELETE', rest_url, object_key=object_key)
 
     def get_url(self, rest_url, query={}):
         """ GET URL with Query String.
@@ -85,13 +399,7 @@ class BaseRestApiClient(object):
         :returns: GET endpoint URL
         """
 
-        full_url = self._get_full_url(rest_url)
-        if isinstance(query, dict) and query:
-            query_string = urlencode(query)
-            full_url = '?'.join([full_url, query_string])
-        log.debug('Client GET {}'.format(full_url))
-
-        return full_url
+        return self.request_url('GET', rest_url, query=query)
 
     def post_url(self, rest_url, payload_dict):
         """ POST URL with Input Payload.
@@ -101,11 +409,74 @@ class BaseRestApiClient(object):
         :returns: POST endpoint tuple (url, payload)
         """
 
-        full_url = self._get_full_url(rest_url)
-        log.debug('Client POST {} payload={}'.format(full_url, payload_dict))
+        full_url = self.request_url('POST', rest_url, payload=payload_dict)
 
         return (full_url, payload_dict)
 
+    # =================================================
+    # REST API: Dispatch
+    # =================================================
+
+    def request(self, method, rest_url, query=None, payload=None, object_key=None,
+                stream=False, full_url=None):
+        """ REST API Request.
+
+        Every HTTP verb dispatches here: compose the URL, then answer from
+        the response cache, or send the request under the retry policy
+        and record its timing. Subclasses only implement "_send".
+
+        :param str method: HTTP method
+        :param rest_url: a relative URL on the API
+        :param query: query string params as dict
+        :param payload: JSON payload to send
+        :param object_key: a key or id appended to the URL path
+        :param bool stream: leave the response body unread
+        :param full_url: the precomposed endpoint URL of a Route (query and object_key unused)
+        returns: an HTTP response
+        """
+
+        method = method.upper()
+        if full_url is None:
+            full_url = self.request_url(method, rest_url, query=query, object_key=object_key,
+                                        payload=payload)
+        else:
+            _log_request(method, full_url, payload)
+
+        def send(headers):
+            return self._timed(method, rest_url, full_url, lambda: self._send(
+                method, full_url, headers, payload=payload, stream=stream),
+                payload=payload, stream=stream)
+
+        if method == 'GET' and not stream:
+            return self._cached_get(rest_url, full_url, send)
+        return send({})
+
+    def _send(self, method, full_url, headers, payload=None, stream=False):
+        """ Send one HTTP request.
+
+        :param str method: HTTP method
+        :param full_url: the endpoint URL
+        :param headers: extra request headers as dict
+        :param payload: JSON payload to send
+        :param bool stream: leave the response body unread
+        :returns: an HTTP response
+        """
+
+        if payload is not None:
+            raise NotImplementedError('{} Endpoint: {} payload={}'.format(
+                method, full_url, payload))
+        raise NotImplementedError('{} Endpoint: {}'.format(method, full_url))
+
+    def _stream_response(self, resp, chunk_size):
+        """ Stream Response.
+
+        :param resp: an HTTP response with its body unread
+        :param int chunk_size: bytes per chunk read from the body
+        :returns: a StreamedResponse
+        """
+
+        return StreamedResponse(resp, resp.iter_content(chunk_size), resp.close)
+
     # =================================================
     # REST API: HTTP Methods
     # =================================================
@@ -118,8 +489,7 @@ class BaseRestApiClient(object):
         returns: an HTTP response
         """
 
-        full_url = self.delete_url(rest_url, object_key)
-        raise NotImplementedError('DELETE Endpoint: {}'.format(full_url))
+        return self.request('DELETE', rest_url, object_key=object_key)
 
     def get(self, rest_url, query={}):
         """ GET from REST API Endpoint.
@@ -129,8 +499,52 @@ class BaseRestApiClient(object):
         returns: an HTTP response
         """
 
-        full_url = self.get_url(rest_url, query=query)
-        raise NotImplementedError('GET Endpoint: {}'.format(full_url))
+        return self.request('GET', rest_url, query=query)
+
+    def get_stream(self, rest_url, query={}, chunk_size=CHUNK_SIZE):
+        """ GET Stream from REST API Endpoint.
+
+        Read the response body on demand, so large payloads keep memory flat.
+        The request timing covers the time to the response headers only.
+
+        :param rest_url: a relative URL on the API
+        :param query: query string params as dict
+        :param int chunk_size: bytes per chunk read from the body
+        returns: a StreamedResponse
+        """
+
+        resp = self.request('GET', rest_url, query=query, stream=True)
+        return self._stream_response(resp, chunk_size)
+
+    def head(self, rest_url, query={}):
+        """ HEAD of REST API Endpoint.
+
+        :param rest_url: a relative URL on the API
+        :param query: query string params as dict
+        returns: an HTTP response
+        """
+
+        return self.request('HEAD', rest_url, query=query)
+
+    def options(self, rest_url):
+        """ OPTIONS of REST API Endpoint.
+
+        :param rest_url: a relative URL on the API
+        returns: an HTTP response
+        """
+
+        return self.request('OPTIONS', rest_url)
+
+    def patch(self, rest_url, payload_dict, object_key=None):
+        """ PATCH to REST API Endpoint with payload.
+
+        :param rest_url: a relative URL on the API
+        :param payload_dict: JSON payload with the changes
+        :param object_key: a key or id of the object to change
+        returns: an HTTP response
+        """
+
+        return self.request('PATCH', rest_url, payload=payload_dict, object_key=object_key)
 
     def post(self, rest_url, payload_dict):
         """ POST to REST API Endpoint with payload.
@@ -140,8 +554,110 @@ class BaseRestApiClient(object):
         returns: an HTTP response
         """
 
-        full_url = self.post_url(rest_url, payload_dict)
-        raise NotImplementedError('POST Endpoint: {} payload={}'.format(full_url, payload_dict))
+        return self.request('POST', rest_url, payload=payload_dict)
+
+    def put(self, rest_url, payload_dict, object_key=None):
+        """ PUT to REST API Endpoint with payload.
+
+        :param rest_url: a relative URL on the API
+        :param payload_dict: JSON payload to store
+        :param object_key: a key or id of the object to replace
+        returns: an HTTP response
+        """
+
+        return self.request('PUT', rest_url, payload=payload_dict, object_key=object_key)
+
+    # =================================================
+    # REST API: Pagination
+    # =================================================
+
+    def paginate(self, rest_url, query={}, strategy=None, prefetch=True):
+        """ Paginate a REST API Collection.
+
+        GET each page of the collection and yield its items, in order.
+        With "prefetch", the next page is requested in a background thread
+        while the caller consumes the current page.
+
+        :param rest_url: a relative URL on the API
+        :param query: query string params as dict, for the first page
+        :param strategy: a PaginationStrategy (default: OffsetPagination())
+        :param bool prefetch: GET the next page while this one is consumed
+        :returns: generator of the collection items
+        """
+
+        strategy = strategy if strategy is not None else OffsetPagination()
+        page = strategy.first_page(rest_url, query)
+
+        executor = None
+        if prefetch:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='paginate')
+            pending = executor.submit(self.get, *page)
+
+        try:
+            while page is not None:
+                resp = pending.result() if prefetch else self.get(*page)
+                data = self.json(resp)
+                items = strategy.page_items(resp, data=data)
+                log.debug('Client page %s %s: %d items', page[0], page[1], len(items))
+
+                page = strategy.next_page(page, resp, items, data=data)
+                if page is not None and prefetch:
+                    pending = executor.submit(self.get, *page)
+                yield from items
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    # =================================================
+    # REST API: Batch Requests
+    # =================================================
+
+    def _batch_method(self, request):
+        """ Batch Method.
+
+        :param request: tuple (method, rest_url) or (method, rest_url, args)
+        :returns: tuple (HTTP method function, rest_url, args tuple)
+        """
+
+        (method, rest_url, args) = (tuple(request) + ((),))[:3]
+        if not isinstance(args, tuple):
+            args = (args,)
+
+        return (getattr(self, method.lower()), rest_url, args)
+
+    def _batch_call(self, request):
+        """ Batch Call.
+
+        Dispatch one batch request to its HTTP method and time it.
+
+        :param request: tuple (method, rest_url) or (method, rest_url, args)
+        :returns: a BatchResult
+        """
+
+        (http_method, rest_url, args) = self._batch_method(request)
+        start = time.perf_counter()
+        response = http_method(rest_url, *args)
+        return BatchResult(response, time.perf_counter() - start)
+
+    def batch(self, batch_requests, max_workers=None):
+        """ Batch of REST API Requests.
+
+        Send the requests one at a time, in order.
+        Live clients override this to send them concurrently.
+
+        Example:
+            client.batch([
+                ('GET', '/v1/things', ({'page': 2},)),
+                ('POST', '/v1/things', ({'name': 'new'},)),
+                ('DELETE', '/v1/things', 'old'),
+            ])
+
+        :param batch_requests: list of tuples (method, rest_url, args)
+        :param max_workers: maximum concurrent requests (unused when sequential)
+        :returns: list of BatchResult in input order
+        """
+
+        return [self._batch_call(request) for request in batch_requests]
 
 
 if __name__ == '__main__':  # pragma: no cover
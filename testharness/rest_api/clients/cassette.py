@@ -0,0 +1,284 @@
+""" Record and Replay REST API Clients
+
+Record live REST API responses to a cassette file and replay them offline.
+
+The RecordingRestApiClient is a live client that writes each request
+and response to a cassette. The ReplayRestApiClient serves the responses
+from that cassette with no network: the file is memory-mapped and indexed
+by request key once, and each response is decoded only when replayed.
+
+Cassette file format, one request per line:
+
+    <sha1 request key> TAB <JSON request and response> NEWLINE
+
+The request key is the method, the URL relative to the host and the JSON
+payload, so a cassette recorded on one host replays for any host.
+A request sent many times replays its recorded responses in order,
+then repeats the last one. A streamed GET is recorded when the test
+closes the stream, with its whole body, and replays as a stream.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+
+import requests
+
+from requests.structures import CaseInsensitiveDict
+
+from ..streaming import StreamedResponse
+from .base import BaseRestApiClient
+from .live import RestApiClient
+
+# log package name.
+log = logging.getLogger('.'.join(__name__.split('.')[:-1]))
+
+
+class CassetteError(LookupError):
+    """ The cassette is missing or has no recorded response for a request. """
+
+
+def request_key(method, relative_url, payload=None):
+    """ Request Key.
+
+    :param str method: HTTP method
+    :param str relative_url: URL path and query string
+    :param payload: JSON payload sent with the request
+    :returns: hex digest of the request
+    """
+
+    body = json.dumps(payload, sort_keys=True) if payload is not None else ''
+    return hashlib.sha1('\n'.join([method, relative_url, body]).encode('utf8')).hexdigest()
+
+
+class CassetteWriter(object):
+    """ Cassette Writer.
+
+    Append recorded requests to a cassette file; safe across threads.
+    """
+
+    def __init__(self, path, mode='w'):
+        """ Init CassetteWriter.
+
+        :param str path: cassette file path
+        :param str mode: "w" to re-record or "a" to append to the cassette
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, mode + 'b')
+
+    def record(self, method, relative_url, payload, resp, content=None):
+        """ Record one request and its response.
+
+        :param content: the body of a streamed response, read by the test
+        """
+
+        if content is None:
+            content = resp.content
+        try:
+            (body, encoding) = (content.decode('utf8'), 'utf8')
+        except UnicodeDecodeError:
+            (body, encoding) = (base64.b64encode(content).decode('ascii'), 'base64')
+
+        entry = json.dumps({
+            'method': method,
+            'url': relative_url,
+            'payload': payload,
+            'status_code': resp.status_code,
+            'reason': resp.reason,
+            'headers': dict(resp.headers),
+            'body': body,
+            'encoding': encoding,
+        }, separators=(',', ':'))
+
+        line = '{}\t{}\n'.format(request_key(method, relative_url, payload), entry)
+        with self._lock:
+            self._file.write(line.encode('utf8'))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class CassetteReader(object):
+    """ Cassette Reader.
+
+    Memory-map a cassette file and index its entries by request key.
+    """
+
+    def __init__(self, path):
+        """ Init CassetteReader.
+
+        :param str path: cassette file path
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._index = {}
+        self._plays = {}
+        self._mmap = None
+
+        if not os.path.exists(path):
+            raise CassetteError('Cassette {} does not exist: record it first with '
+                                'TESTHARNESS_CASSETTE_MODE=record'.format(path))
+
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._build_index()
+
+    def _build_index(self):
+        """ Index each entry's (start, end) offsets by request key. """
+        data = self._mmap
+        pos = 0
+        size = len(data)
+        while pos < size:
+            tab = data.find(b'\t', pos)
+            end = data.find(b'\n', tab)
+            if tab < 0 or end < 0:
+                log.warning('Cassette %s: ignored truncated entry at offset %d', self.path, pos)
+                break
+            key = data[pos:tab].decode('ascii')
+            self._index.setdefault(key, []).append((tab + 1, end))
+            pos = end + 1
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._index.values())
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def play(self, method, relative_url, payload=None):
+        """ Play the next recorded response for a request.
+
+        :returns: a requests.Response
+        :raises CassetteError: the request was never recorded
+        """
+
+        key = request_key(method, relative_url, payload)
+        entries = self._index.get(key)
+        if not entries:
+            raise CassetteError('{} {} is not in cassette {}'.format(
+                method, relative_url, self.path))
+
+        with self._lock:
+            play = self._plays.get(key, 0)
+            self._plays[key] = play + 1
+        (start, end) = entries[min(play, len(entries) - 1)]
+        return self._response(json.loads(self._mmap[start:end].decode('utf8')))
+
+    def _response(self, entry):
+        resp = requests.Response()
+        resp.status_code = entry['status_code']
+        resp.reason = entry['reason']
+        resp.headers = CaseInsensitiveDict(entry['headers'])
+        resp.url = entry['url']
+        if entry['encoding'] == 'base64':
+            resp._content = base64.b64decode(entry['body'])
+        else:
+            resp._content = entry['body'].encode('utf8')
+        # The body is all read, so iter_content() streams it from memory.
+        resp._content_consumed = True
+        return resp
+
+    def rewind(self):
+        """ Replay every request from its first recorded response again. """
+        with self._lock:
+            self._plays.clear()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+
+
+class RecordingRestApiClient(RestApiClient):
+    """ Recording REST API Client.
+
+    This live HTTP client writes every request and response to a cassette.
+    """
+
+    def __init__(self, hostname, cassette_path, mode='w', **kwargs):
+        """ Init RecordingRestApiClient.
+
+        :param str hostname: server hostname
+        :param str cassette_path: cassette file to record
+        :param str mode: "w" to re-record or "a" to append to the cassette
+        :param kwargs: RestApiClient options (port, scheme, ..etc.)
+        """
+
+        super().__init__(hostname, **kwargs)
+        self.cassette = CassetteWriter(cassette_path, mode=mode)
+
+    def _timed(self, method, rest_url, full_url, send, payload=None, stream=False):
+        resp = super()._timed(method, rest_url, full_url, send, payload=payload, stream=stream)
+        if stream:
+            # Record the body as the test streams it, not all up front.
+            resp.cassette_request = (method, full_url[len(self.host_url):], payload)
+        else:
+            self.cassette.record(method, full_url[len(self.host_url):], payload, resp)
+        return resp
+
+    def _stream_response(self, resp, chunk_size):
+        """ Stream Response, recorded to the cassette when it is closed. """
+        (method, relative_url, payload) = resp.cassette_request
+
+        def chunks():
+            body = []
+            for chunk in resp.iter_content(chunk_size):
+                body.append(chunk)
+                yield chunk
+            self.cassette.record(method, relative_url, payload, resp, content=b''.join(body))
+
+        body = chunks()
+
+        def close():
+            # A stream closed early still records its whole body: read the rest.
+            try:
+                for chunk in body:
+                    pass
+            except OSError as e:
+                log.warning('Cassette skipped stream %s %s: %s', method, relative_url, e)
+            resp.close()
+
+        return StreamedResponse(resp, body, close)
+
+    def close(self):
+        """ Close the cassette and the session's pooled connections. """
+        self.cassette.close()
+        super().close()
+
+
+class ReplayRestApiClient(BaseRestApiClient):
+    """ Replay REST API Client.
+
+    This HTTP client serves the responses recorded in a cassette, with no network.
+    """
+
+    def __init__(self, hostname, cassette_path, port=80, scheme='http', response_timeout=10.0,
+                 metrics=None):
+        """ Init ReplayRestApiClient.
+
+        :param str hostname: server hostname (only used to compose URLs)
+        :param str cassette_path: cassette file to replay
+        :param int port: server port number
+        :param str scheme: URL scheme is "http" unless set to "https" for SSL
+        :param float response_timeout: ignored, there is no network
+        :param metrics: a MetricsSink for request timings (default: in-memory histograms)
+        """
+
+        super().__init__(hostname, port=port, scheme=scheme, response_timeout=response_timeout,
+                         metrics=metrics)
+        self.cassette = CassetteReader(cassette_path)
+
+    def _send(self, method, full_url, headers, payload=None, stream=False):
+        """ Play the next recorded response for the request from the cassette. """
+        return self.cassette.play(method, full_url[len(self.host_url):], payload)
+
+    def close(self):
+        """ Close the cassette. """
+        self.cassette.close()
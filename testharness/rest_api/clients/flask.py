@@ -5,6 +5,7 @@ The Flask Testing HTTP REST Client implemetation.
 
 import logging
 
+from ..streaming import StreamedResponse
 from .base import BaseRestApiClient
 
 # log package name.
@@ -17,14 +18,16 @@ class FlaskTestingRestApiClient(BaseRestApiClient):
     This HTTP client binds a Flask app to a REST API requests implemetation.
     """
 
-    def __init__(self, flask_app):
+    def __init__(self, flask_app, metrics=None, cache=None, codec=None):
         """ Init RestApiClient.
 
         :param flask.App flask_app: Flask application object to make test client
-        :param float response_timeout: wait timeout for a response (in seconds)
+        :param metrics: a MetricsSink for request timings (default: in-memory histograms)
+        :param cache: a ResponseCache for GET responses (default: no caching)
+        :param codec: a JsonCodec or codec name (default: orjson when installed, else json)
         """
 
-        super().__init__('flask.example.com')
+        super().__init__('flask.example.com', metrics=metrics, cache=cache, codec=codec)
 
         self.app = flask_app
         self.app.config['TESTING'] = True
@@ -38,43 +41,32 @@ class FlaskTestingRestApiClient(BaseRestApiClient):
 
         return ''
 
-    # =================================================
-    # REST API: HTTP Methods
-    # =================================================
+    def _send(self, method, full_url, headers, payload=None, stream=False):
+        """ Send one HTTP request to the Flask test client.
 
-    def delete(self, rest_url, object_key):
-        """ DELETE from REST API Endpoint.
+        A streamed response is left unbuffered, so large payloads keep memory flat.
 
-        :param rest_url: a relative URL on the API
-        :param object_key: a key or id to delete the object
-        returns: an HTTP response
+        :param str method: HTTP method
+        :param full_url: the endpoint URL
+        :param headers: extra request headers as dict
+        :param payload: JSON payload to send
+        :param bool stream: leave the response body unread
+        :returns: a Flask (Werkzeug) response
         """
 
-        full_url = self.delete_url(rest_url, object_key)
-        return self.test_client.delete(full_url)
+        options = self.codec.request_body(payload) if payload is not None else {}
+        if stream:
+            options['buffered'] = False
+        return getattr(self.test_client, method.lower())(
+            full_url, headers=self._add_rest_headers(dict(headers)), **options)
 
-    def get(self, rest_url, query={}):
-        """ GET from REST API Endpoint.
+    def _stream_response(self, resp, chunk_size):
+        """ Stream Response.
 
-        :param rest_url: a relative URL on the API
-        :param query: query string params as dict
-        returns: an HTTP response
+        The chunks are the app's own response chunks; "chunk_size" is unused.
         """
 
-        full_url = self.get_url(rest_url, query=query)
-        return self.test_client.get(full_url, headers=self._add_rest_headers())
-
-    def post(self, rest_url, payload_dict):
-        """ POST to REST API Endpoint with payload.
-
-        :param rest_url: a relative URL on the API
-        :param payload_dict: JSON payload to post
-        returns: an HTTP response
-        """
-
-        (full_url, payload_dict) = self.post_url(rest_url, payload_dict)
-        return self.test_client.post(full_url, json=payload_dict,
-                                     headers=self._add_rest_headers())
+        return StreamedResponse(resp, resp.iter_encoded(), resp.close)
 
 
 if __name__ == '__main__':  # pragma: no cover
@@ -5,64 +5,283 @@ The Live HTTP REST Client implementation.
 
 import logging
 import requests
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
 from .base import BaseRestApiClient
+from .wsgi import WSGIAdapter
 
 # log package name.
 log = logging.getLogger('.'.join(__name__.split('.')[:-1]))
 
+# Connection timings of the request in progress on this thread.
+_transport = threading.local()
+
+
+def _add_transport_time(name, elapsed):
+    timings = getattr(_transport, 'timings', None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + elapsed
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """ HTTP connection that times its DNS lookup and TCP connect. """
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _add_transport_time('connect', time.perf_counter() - start)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    """ HTTPS connection that times its DNS lookup, TCP connect and TLS handshake. """
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._connect_time = time.perf_counter() - start
+            _add_transport_time('connect', self._connect_time)
+
+    def connect(self):
+        self._connect_time = 0.0
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _add_transport_time('tls', time.perf_counter() - start - self._connect_time)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """ Pooled HTTP Adapter.
+
+    This requests transport adapter keeps keep-alive connection pools
+    and counts how many connections were opened and reused.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+        # Keep the counts of connection pools evicted from the pool manager.
+        self._retired_connections = 0
+        self._retired_requests = 0
+
+        pools = self.poolmanager.pools
+        dispose_func = pools.dispose_func
+
+        def retire_pool(pool):
+            self._retired_connections += pool.num_connections
+            self._retired_requests += pool.num_requests
+            if dispose_func is not None:
+                dispose_func(pool)
+
+        pools.dispose_func = retire_pool
+
+    def _pool_totals(self):
+        """ Pool Totals.
+
+        :returns: tuple (connections opened, requests sent) over all pools
+        """
+
+        opened = self._retired_connections
+        sent = self._retired_requests
+
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+
+        return (opened, sent)
+
+    @property
+    def connections_opened(self):
+        """ number of new connections opened by the adapter """
+        return self._pool_totals()[0]
+
+    @property
+    def connections_reused(self):
+        """ number of requests sent on an already open connection """
+        (opened, sent) = self._pool_totals()
+        return max(sent - opened, 0)
+
+
+class PooledSessionMixin(object):
+    """ Pooled Session Mixin.
 
-class RestApiClient(BaseRestApiClient):
+    Share one requests.Session on a PooledHTTPAdapter, and time its new
+    connections, for the clients that send requests through it.
+    """
+
+    def _init_session(self, **adapter_options):
+        """ Init Session.
+
+        Set the client's "adapter" and its "session".
+
+        :param adapter_options: PooledHTTPAdapter keyword arguments
+        """
+
+        self.adapter = PooledHTTPAdapter(**adapter_options)
+        self.session = self._make_session(self.adapter)
+
+    def _make_session(self, adapter):
+        """ Make Session.
+
+        Mount the pooled adapter for both URL schemes on a new session.
+
+        :param adapter: a requests transport adapter
+        :returns: a requests.Session
+        """
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _send(self, method, full_url, headers, payload=None, stream=False):
+        """ Send one HTTP request on the pooled session.
+
+        :param str method: HTTP method
+        :param full_url: the endpoint URL
+        :param headers: extra request headers as dict
+        :param payload: JSON payload to send
+        :param bool stream: leave the response body unread
+        :returns: a requests.Response
+        """
+
+        headers = self._add_rest_headers(dict(headers))
+        options = self._request_body(payload, headers) if payload is not None else {}
+        if stream:
+            options['stream'] = True
+        return getattr(self.session, method.lower())(
+            full_url, headers=headers, timeout=self.response_timeout, **options)
+
+    def _start_transport_timing(self):
+        _transport.timings = {}
+
+    def _transport_timing(self):
+        timings = getattr(_transport, 'timings', None) or {}
+        _transport.timings = None
+        return (timings.get('connect', 0.0), timings.get('tls', 0.0))
+
+    @property
+    def connections_opened(self):
+        """ number of new connections opened by this client """
+        return self.adapter.connections_opened
+
+    @property
+    def connections_reused(self):
+        """ number of requests sent on an already open connection """
+        return self.adapter.connections_reused
+
+
+class RestApiClient(PooledSessionMixin, BaseRestApiClient):
     """ Live REST API Client.
 
     This HTTP client provides a REST API requests implementation.
+    Requests share a keep-alive requests.Session, so the TCP connection
+    (and TLS handshake) is set up once per pooled connection.
     """
 
-    # =================================================
-    # REST API: HTTP Methods
-    # =================================================
+    def __init__(self, hostname, port=80, scheme='http', response_timeout=10.0,
+                 pool_connections=10, pool_maxsize=10, max_retries=0, pool_block=False,
+                 metrics=None, cache=None, retry=None,
+                 codec=None, wsgi_app=None, throttle=None, compression=None):
+        """ Init RestApiClient.
 
-    def delete(self, rest_url, object_key):
-        """ DELETE from REST API Endpoint.
-
-        :param rest_url: a relative URL on the API
-        :param object_key: a key or id to delete the object
-        returns: an HTTP response
+        :param str hostname: server hostname
+        :param int port: server port number
+        :param str scheme: URL scheme is "http" unless set to "https" for SSL
+        :param float response_timeout: wait timeout for a response (in seconds)
+        :param int pool_connections: number of host connection pools to cache
+        :param int pool_maxsize: maximum number of connections kept in each pool
+        :param max_retries: connection retries as int or urllib3 Retry object
+        :param bool pool_block: block for a free connection when the pool is full
+        :param metrics: a MetricsSink for request timings (default: in-memory histograms)
+        :param cache: a ResponseCache for GET responses (default: no caching)
+        :param retry: a RetryPolicy for transient failures (default: no retries)
+        :param codec: a JsonCodec or codec name (default: orjson when installed, else json)
+        :param wsgi_app: a WSGI application (or "package.module:attribute") to send
+            the host's requests to in-process, with no sockets
+        :param throttle: a Throttle of request rate and concurrency (default: no limits)
+        :param compression: a Compression of request bodies and Accept-Encoding
+            (default: uncompressed requests, the HTTP library's Accept-Encoding)
         """
 
-        full_url = self.delete_url(rest_url, object_key)
-        resp = requests.delete(full_url, headers=self._add_rest_headers(),
-                               timeout=self.response_timeout)
-        return resp
+        super().__init__(hostname, port=port, scheme=scheme, response_timeout=response_timeout,
+                         metrics=metrics, cache=cache, retry=retry,
+                         codec=codec, throttle=throttle, compression=compression)
+
+        self.pool_maxsize = pool_maxsize
+        self._init_session(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            pool_block=pool_block)
+        if wsgi_app is not None:
+            self.mount_wsgi(wsgi_app)
 
-    def get(self, rest_url, query={}):
-        """ GET from REST API Endpoint.
+    def mount_wsgi(self, wsgi_app, raise_errors=False):
+        """ Mount WSGI App.
 
-        :param rest_url: a relative URL on the API
-        :param query: query string params as dict
-        returns: an HTTP response
+        Send the host's requests to a WSGI application in-process.
+
+        :param wsgi_app: a WSGI application, or its import path "package.module:attribute"
+        :param bool raise_errors: raise the app's exceptions instead of answering 500
+        :returns: the mounted WSGIAdapter
         """
 
-        full_url = self.get_url(rest_url, query=query)
-        resp = requests.get(full_url, headers=self._add_rest_headers(),
-                            timeout=self.response_timeout)
-        return resp
+        adapter = WSGIAdapter(wsgi_app, raise_errors=raise_errors)
+        self.session.mount(self.host_url, adapter)
+        return adapter
+
+    def close(self):
+        """ Close the session and its pooled connections. """
+        self.session.close()
+
+    # =================================================
+    # REST API: Batch Requests
+    # =================================================
+
+    def batch(self, batch_requests, max_workers=None):
+        """ Batch of REST API Requests.
 
-    def post(self, rest_url, payload_dict):
-        """ POST to REST API Endpoint with payload.
+        Send the requests concurrently through the connection pool.
 
-        :param rest_url: a relative URL on the API
-        :param payload_dict: JSON payload to post
-        returns: an HTTP response
+        :param batch_requests: list of tuples (method, rest_url, args)
+        :param max_workers: maximum concurrent requests (default: pool size)
+        :returns: list of BatchResult in input order
         """
 
-        (full_url, payload_dict) = self.post_url(rest_url, payload_dict)
-        resp = requests.post(
-            full_url,
-            json=payload_dict,
-            headers=self._add_rest_headers(),
-            timeout=self.response_timeout)
-        return resp
+        batch_requests = list(batch_requests)
+        if not batch_requests:
+            return []
+
+        max_workers = min(max_workers or self.pool_maxsize, len(batch_requests))
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix='RestApiClient.batch') as executor:
+            return list(executor.map(self._batch_call, batch_requests))
 
 
 if __name__ == '__main__':  # pragma: no cover
@@ -88,3 +307,7 @@ if __name__ == '__main__':  # pragma: no cover
     print('POST: "{}" status={}'.format(
         response.content.decode('utf8'), response.status_code))
     print()
+
+    print('Connections: opened={} reused={}'.format(
+        client.connections_opened, client.connections_reused))
+    client.close()
@@ -0,0 +1,346 @@
+""" Multi-Host REST API Client
+
+Send each request to several hosts at once, and compare the answers.
+
+During a rollout, a MultiHostRestApiClient sends the same request to the
+baseline and canary hosts concurrently, so a comparison run costs about
+the wall time of the slowest host. Each host's client records its own
+latency histograms, side by side. The MultiResponse diffs every host's
+status code, headers and JSON body against the baseline's.
+"""
+
+import logging
+
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from ..pagination import response_json
+from .live import RestApiClient
+
+# log package name.
+log = logging.getLogger('.'.join(__name__.split('.')[:-1]))
+
+# Headers that differ between hosts without any functional divergence.
+IGNORED_HEADERS = frozenset([
+    'age', 'connection', 'content-length', 'date', 'expires', 'keep-alive',
+    'server', 'set-cookie', 'transfer-encoding', 'x-request-id',
+])
+
+# One difference from the baseline's response.
+#   field: "status_code", "header", "body" or "error"
+#   path: the header name, or the JSON path in the body ("$.items[0].id")
+Divergence = namedtuple('Divergence', ['host', 'field', 'path', 'baseline', 'value'])
+
+# One host's latency compared with the baseline's, in milliseconds.
+LatencyComparison = namedtuple('LatencyComparison', [
+    'endpoint', 'host', 'baseline_ms', 'host_ms', 'ratio'])
+
+
+def diff_json(baseline, value, path='$', ignore_paths=()):
+    """ Diff JSON.
+
+    :param baseline: the baseline's decoded JSON
+    :param value: another host's decoded JSON
+    :param str path: JSON path of the values
+    :param ignore_paths: JSON paths to skip, e.g. "$.generated_at"
+    :returns: list of tuples (path, baseline value, value)
+    """
+
+    if path in ignore_paths:
+        return []
+    if isinstance(baseline, dict) and isinstance(value, dict):
+        found = []
+        for key in sorted(set(baseline) | set(value), key=str):
+            key_path = '{}.{}'.format(path, key)
+            if key not in value or key not in baseline:
+                if key_path not in ignore_paths:
+                    found.append((key_path, baseline.get(key), value.get(key)))
+            else:
+                found.extend(diff_json(baseline[key], value[key], key_path, ignore_paths))
+        return found
+    if isinstance(baseline, list) and isinstance(value, list):
+        found = []
+        for (index, (left, right)) in enumerate(zip(baseline, value)):
+            found.extend(diff_json(left, right, '{}[{}]'.format(path, index), ignore_paths))
+        if len(baseline) != len(value):
+            found.append(('{}.length'.format(path), len(baseline), len(value)))
+        return found
+    if baseline != value or type(baseline) is not type(value):
+        return [(path, baseline, value)]
+    return []
+
+
+def _body(resp, decode=response_json):
+    """ the decoded JSON body, else the raw body bytes """
+    try:
+        return decode(resp)
+    except ValueError:
+        return getattr(resp, 'content', None)
+
+
+class MultiResponse(object):
+    """ Multi-Host Response.
+
+    The responses of every host to one request, in host order.
+    A host whose request raised has no response and an error.
+    """
+
+    def __init__(self, baseline, responses, errors, ignore_headers=IGNORED_HEADERS,
+                 ignore_paths=(), decoders=None):
+        """ Init MultiResponse.
+
+        :param str baseline: name of the baseline host
+        :param responses: OrderedDict of responses (or None) by host name
+        :param errors: dict of exceptions by host name
+        :param ignore_headers: lower case header names not compared
+        :param ignore_paths: JSON body paths not compared
+        :param decoders: dict of JSON body decode functions by host name,
+            e.g. each client's "json" (default: the response's own)
+        """
+
+        self.baseline = baseline
+        self.responses = responses
+        self.errors = errors
+        self.ignore_headers = ignore_headers
+        self.ignore_paths = tuple(ignore_paths)
+        self.decoders = decoders or {}
+        self._divergences = None
+
+    def __getitem__(self, host):
+        return self.responses[host]
+
+    @property
+    def timings(self):
+        """ RequestTiming by host name (None for a host without a response) """
+        return OrderedDict((host, getattr(resp, 'timing', None))
+                           for (host, resp) in self.responses.items())
+
+    def _body(self, host, resp):
+        return _body(resp, self.decoders.get(host, response_json))
+
+    def _headers(self, resp):
+        return {name.lower(): value for (name, value) in resp.headers.items()
+                if name.lower() not in self.ignore_headers}
+
+    def divergences(self):
+        """ Divergences.
+
+        :returns: list of Divergence of every host from the baseline
+        """
+
+        if self._divergences is not None:
+            return self._divergences
+
+        found = []
+        base_resp = self.responses[self.baseline]
+        base_error = self.errors.get(self.baseline)
+        base_headers = self._headers(base_resp) if base_resp is not None else None
+        base_body = self._body(self.baseline, base_resp) if base_resp is not None else None
+
+        for (host, resp) in self.responses.items():
+            if host == self.baseline:
+                continue
+            error = self.errors.get(host)
+            if resp is None or base_resp is None:
+                if repr(error) != repr(base_error):
+                    found.append(Divergence(host, 'error', None, base_error, error))
+                continue
+
+            if resp.status_code != base_resp.status_code:
+                found.append(Divergence(host, 'status_code', None, base_resp.status_code,
+                                        resp.status_code))
+
+            headers = self._headers(resp)
+            for name in sorted(set(base_headers) | set(headers)):
+                if base_headers.get(name) != headers.get(name):
+                    found.append(Divergence(host, 'header', name, base_headers.get(name),
+                                            headers.get(name)))
+
+            for (path, baseline, value) in diff_json(base_body, self._body(host, resp),
+                                                     ignore_paths=self.ignore_paths):
+                found.append(Divergence(host, 'body', path, baseline, value))
+
+        self._divergences = found
+        return found
+
+    @property
+    def diverged(self):
+        """ some host answered differently from the baseline """
+        return bool(self.divergences())
+
+    def __repr__(self):
+        return '<MultiResponse {}>'.format(' '.join(
+            '{}={}'.format(host, getattr(resp, 'status_code', 'error'))
+            for (host, resp) in self.responses.items()))
+
+
+class MultiHostRestApiClient(object):
+    """ Multi-Host REST API Client.
+
+    This HTTP client fans each request out to every host concurrently.
+
+    Example:
+        client = MultiHostRestApiClient.from_urls(OrderedDict([
+            ('baseline', 'http://api-blue.example.com'),
+            ('canary', 'http://api-green.example.com:8080'),
+        ]))
+        multi = client.get('/v1/things', {'type': 'x'})
+        assert not multi.diverged, multi.divergences()
+    """
+
+    def __init__(self, clients, baseline=None, ignore_headers=IGNORED_HEADERS,
+                 ignore_paths=(), max_workers=None):
+        """ Init MultiHostRestApiClient.
+
+        :param clients: OrderedDict of REST API clients by host name
+        :param str baseline: name of the baseline host (default: the first)
+        :param ignore_headers: lower case header names not compared
+        :param ignore_paths: JSON body paths not compared, e.g. "$.generated_at"
+        :param int max_workers: threads sending to the other hosts
+            (default: 4 per other host, for concurrent callers)
+        """
+
+        self.clients = OrderedDict(clients)
+        if not self.clients:
+            raise ValueError('Multi-host client needs at least one host')
+        self.baseline = baseline if baseline is not None else next(iter(self.clients))
+        if self.baseline not in self.clients:
+            raise ValueError('Baseline {} is not one of the hosts: {}'.format(
+                self.baseline, ', '.join(self.clients)))
+
+        self.ignore_headers = frozenset(name.lower() for name in ignore_headers)
+        self.ignore_paths = tuple(ignore_paths)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(4 * (len(self.clients) - 1), 1),
+            thread_name_prefix='MultiHostRestApiClient')
+
+    @classmethod
+    def from_urls(cls, host_urls, baseline=None, ignore_headers=IGNORED_HEADERS,
+                  ignore_paths=(), max_workers=None, **options):
+        """ Multi-host client of RestApiClients.
+
+        :param host_urls: OrderedDict of "scheme://hostname:port" URLs by host name
+        :param str baseline: name of the baseline host (default: the first)
+        :param options: RestApiClient options (response_timeout, pool_maxsize, ..etc.)
+        :returns: a MultiHostRestApiClient
+        """
+
+        clients = OrderedDict()
+        for (name, host_url) in host_urls.items():
+            parts = urlsplit(host_url if '//' in host_url else '//' + host_url)
+            scheme = parts.scheme or 'http'
+            clients[name] = RestApiClient(
+                parts.hostname, port=parts.port or (443 if scheme == 'https' else 80),
+                scheme=scheme, **options)
+        return cls(clients, baseline=baseline, ignore_headers=ignore_headers,
+                   ignore_paths=ignore_paths, max_workers=max_workers)
+
+    @property
+    def metrics(self):
+        """ the baseline client's metrics sink """
+        return self.clients[self.baseline].metrics
+
+    def close(self):
+        """ Close the worker threads and every host's client. """
+        self._executor.shutdown(wait=True)
+        for client in self.clients.values():
+            client.close()
+
+    # =================================================
+    # REST API: Dispatch
+    # =================================================
+
+    def request(self, method, rest_url, query=None, payload=None, object_key=None):
+        """ REST API Request to every host.
+
+        The baseline's request is sent on the calling thread, the others in
+        the worker threads, all at once.
+
+        :param str method: HTTP method
+        :param rest_url: a relative URL on the API
+        :param query: query string params as dict
+        :param payload: JSON payload to send
+        :param object_key: a key or id appended to the URL path
+        returns: a MultiResponse
+        """
+
+        def send(client):
+            return client.request(method, rest_url, query=query, payload=payload,
+                                  object_key=object_key)
+
+        pending = OrderedDict(
+            (host, self._executor.submit(send, client))
+            for (host, client) in self.clients.items() if host != self.baseline)
+
+        (responses, errors) = (OrderedDict(), {})
+        try:
+            responses[self.baseline] = send(self.clients[self.baseline])
+        except Exception as e:
+            (responses[self.baseline], errors[self.baseline]) = (None, e)
+
+        for (host, future) in pending.items():
+            try:
+                responses[host] = future.result()
+            except Exception as e:
+                (responses[host], errors[host]) = (None, e)
+
+        decoders = {host: client.json for (host, client) in self.clients.items()}
+        multi = MultiResponse(self.baseline, responses, errors,
+                              ignore_headers=self.ignore_headers,
+                              ignore_paths=self.ignore_paths, decoders=decoders)
+        if errors:
+            log.warning('Multi-host %s %s failed on %s', method, rest_url, ', '.join(
+                '{} ({!r})'.format(host, error) for (host, error) in errors.items()))
+        return multi
+
+    def delete(self, rest_url, object_key):
+        return self.request('DELETE', rest_url, object_key=object_key)
+
+    def get(self, rest_url, query={}):
+        return self.request('GET', rest_url, query=query)
+
+    def head(self, rest_url, query={}):
+        return self.request('HEAD', rest_url, query=query)
+
+    def options(self, rest_url):
+        return self.request('OPTIONS', rest_url)
+
+    def patch(self, rest_url, payload_dict, object_key=None):
+        return self.request('PATCH', rest_url, payload=payload_dict, object_key=object_key)
+
+    def post(self, rest_url, payload_dict):
+        return self.request('POST', rest_url, payload=payload_dict)
+
+    def put(self, rest_url, payload_dict, object_key=None):
+        return self.request('PUT', rest_url, payload=payload_dict, object_key=object_key)
+
+    # =================================================
+    # Latency Comparison
+    # =================================================
+
+    def compare_latency(self, endpoint=None, percentile=95):
+        """ Compare Latency.
+
+        :param str endpoint: "METHOD rest_url" or "rest_url" (default: every endpoint)
+        :param float percentile: the latency percentile to compare
+        :returns: list of LatencyComparison of each other host with the baseline
+        """
+
+        baseline_metrics = self.clients[self.baseline].metrics
+        if endpoint is not None:
+            endpoints = [endpoint]
+        else:
+            endpoints = ['{} {}'.format(summary.method, summary.rest_url)
+                         for summary in baseline_metrics.summary()]
+
+        comparisons = []
+        for name in endpoints:
+            baseline_ms = baseline_metrics.histogram(name).percentile(percentile)
+            for (host, client) in self.clients.items():
+                if host == self.baseline:
+                    continue
+                host_ms = client.metrics.histogram(name).percentile(percentile)
+                ratio = host_ms / baseline_ms if host_ms is not None and baseline_ms else None
+                comparisons.append(LatencyComparison(name, host, baseline_ms, host_ms, ratio))
+        return comparisons
@@ -0,0 +1,250 @@
+""" WSGI REST API Transport
+
+Send a live client's requests straight into a WSGI application, in-process.
+
+The WSGIAdapter is a requests transport adapter: mount it on the
+RestApiClient's session (pass "wsgi_app") and the client keeps its live
+semantics, with no sockets. Responses are requests.Response objects,
+headers go through requests as they would on the wire, and a response
+slower than the client's "response_timeout" raises requests' ReadTimeout.
+So the same LiveRestApiTestCase runs against the app in-process or
+against the deployed host, by configuration only.
+
+An exception in the app is logged and answered "500 Internal Server Error",
+as a WSGI server would, unless the adapter is made with "raise_errors".
+"""
+
+import importlib
+import io
+import itertools
+import logging
+import sys
+import time
+
+from urllib.parse import unquote, urlsplit
+
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.exceptions import ReadTimeout
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from ..compression import available, decompressor
+
+# log package name.
+log = logging.getLogger('.'.join(__name__.split('.')[:-1]))
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def load_wsgi_app(app):
+    """ Load WSGI App.
+
+    :param app: a WSGI application, or its import path "package.module:attribute"
+    :returns: the WSGI application
+    """
+
+    if not isinstance(app, str):
+        return app
+
+    (module_name, _, attribute) = app.partition(':')
+    if not attribute:
+        raise ValueError('WSGI app path must be "package.module:attribute": {}'.format(app))
+
+    target = importlib.import_module(module_name)
+    for name in attribute.split('.'):
+        target = getattr(target, name)
+    return target
+
+
+class WSGIResponseBody(object):
+    """ WSGI Response Body.
+
+    A file-like "raw" body over the app's response iterable, read on demand.
+    With "decode_content", a body in a Content-Encoding this process can
+    decode is read decompressed, as from a live response.
+    """
+
+    def __init__(self, app_iter, chunks=None, content_encoding=None):
+        """ Init WSGIResponseBody.
+
+        :param app_iter: the app's response iterable, closed with the body
+        :param chunks: iterator of the body's chunks (default: iterate app_iter)
+        :param str content_encoding: the response's Content-Encoding header
+        """
+
+        self._app_iter = app_iter
+        self._chunks = chunks if chunks is not None else iter(app_iter)
+        self._buffer = b''
+        self._decode = decompressor(content_encoding) if available(content_encoding) else None
+        self.closed = False
+
+    def read(self, amt=None, decode_content=None):
+        """ Read up to "amt" bytes, or the rest of the body. """
+        decode = self._decode if decode_content else None
+        while amt is None or len(self._buffer) < amt:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                break
+            self._buffer += decode(chunk) if decode is not None else chunk
+
+        if amt is None:
+            (data, self._buffer) = (self._buffer, b'')
+        else:
+            (data, self._buffer) = (self._buffer[:amt], self._buffer[amt:])
+        return data
+
+    def stream(self, amt=65536, decode_content=None):
+        """ Iterate the body in chunks of up to "amt" bytes. """
+        while True:
+            data = self.read(amt, decode_content=decode_content)
+            if not data:
+                break
+            yield data
+
+    def release_conn(self):
+        self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            close = getattr(self._app_iter, 'close', None)
+            if close is not None:
+                close()
+
+
+class WSGIAdapter(BaseAdapter):
+    """ WSGI Adapter.
+
+    This requests transport adapter calls a WSGI application in-process.
+    """
+
+    def __init__(self, app, raise_errors=False):
+        """ Init WSGIAdapter.
+
+        :param app: a WSGI application, or its import path "package.module:attribute"
+        :param bool raise_errors: raise the app's exceptions instead of answering 500
+        """
+
+        super().__init__()
+        self.app = load_wsgi_app(app)
+        self.raise_errors = raise_errors
+
+    def _environ(self, request):
+        """ WSGI Environ.
+
+        :param request: a requests.PreparedRequest
+        :returns: the WSGI environ dict
+        """
+
+        parts = urlsplit(request.url)
+        body = request.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf8')
+        elif not isinstance(body, bytes):
+            body = b''.join(body)
+
+        environ = {
+            'REQUEST_METHOD': request.method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote(parts.path, 'latin-1') or '/',
+            'QUERY_STRING': parts.query,
+            'SERVER_NAME': parts.hostname or 'localhost',
+            'SERVER_PORT': str(parts.port or DEFAULT_PORTS.get(parts.scheme, '80')),
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': parts.scheme,
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        environ['HTTP_HOST'] = parts.netloc
+        for (name, value) in request.headers.items():
+            key = name.upper().replace('-', '_')
+            if key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[key] = value
+            else:
+                environ['HTTP_' + key] = value
+        return environ
+
+    def _call_app(self, environ):
+        """ Call App.
+
+        An app may call start_response only when its iterable is first
+        iterated (PEP 3333), so the first body chunk is read before the status.
+
+        :returns: tuple (status line, header list, WSGIResponseBody)
+        """
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started['status'] = status
+            started['headers'] = headers
+            return lambda data: started.setdefault('written', []).append(data)
+
+        app_iter = None
+        try:
+            app_iter = self.app(environ, start_response)
+            chunks = iter(app_iter)
+            first = [] if 'status' in started else list(itertools.islice(chunks, 1))
+            if 'status' not in started:
+                raise RuntimeError('WSGI app did not call start_response')
+        except Exception:
+            if app_iter is not None and hasattr(app_iter, 'close'):
+                app_iter.close()
+            if self.raise_errors:
+                raise
+            log.exception('WSGI app failed: %s %s', environ['REQUEST_METHOD'],
+                          environ['PATH_INFO'])
+            return ('500 Internal Server Error', [('Content-Length', '0')],
+                    WSGIResponseBody([]))
+
+        chunks = itertools.chain(started.get('written', []), first, chunks)
+        encoding = CaseInsensitiveDict(started['headers']).get('Content-Encoding')
+        return (started['status'], started['headers'],
+                WSGIResponseBody(app_iter, chunks=chunks, content_encoding=encoding))
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        """ Send a PreparedRequest to the WSGI app.
+
+        :returns: a requests.Response
+        :raises ReadTimeout: the app answered slower than the read timeout
+        """
+
+        start = time.perf_counter()
+        (status, headers, body) = self._call_app(self._environ(request))
+
+        resp = Response()
+        (code, _, reason) = status.partition(' ')
+        resp.status_code = int(code)
+        resp.reason = reason
+        resp.headers = CaseInsensitiveDict(headers)
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        resp.raw = body
+
+        if not stream or request.method == 'HEAD':
+            resp._content = resp.raw.read(decode_content=True)
+            resp._content_consumed = True
+            resp.raw.close()
+
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        elapsed = time.perf_counter() - start
+        if read_timeout is not None and elapsed > read_timeout:
+            resp.close()
+            raise ReadTimeout('WSGI app answered {} {} in {:.3f}s, over the {}s timeout'.format(
+                request.method, request.url, elapsed, read_timeout), request=request)
+        return resp
+
+    def close(self):
+        pass
@@ -0,0 +1,175 @@
+""" REST API Compression
+
+Compress request bodies, negotiate compressed responses, and count
+the bytes on the wire next to the decoded bytes.
+
+gzip and deflate use the standard library. "br" needs the brotli package
+(pip install brotli) and "zstd" the zstandard package (pip install
+zstandard); the HTTP library decodes those responses only when the same
+package is installed, so they are only offered when it is.
+"""
+
+import gzip
+import logging
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+log = logging.getLogger(__name__)
+
+
+def _zstd_compress(body, level):
+    return zstandard.ZstdCompressor(level=level if level is not None else 3).compress(body)
+
+
+def _zstd_decompress(body):
+    return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+
+
+# Content-Encoding name -> tuple (compress(body, level), decompress(body), package)
+ENCODINGS = {
+    'gzip': (lambda body, level: gzip.compress(body, level if level is not None else 6),
+             gzip.decompress, None),
+    'deflate': (lambda body, level: zlib.compress(body, level if level is not None else 6),
+                zlib.decompress, None),
+    'br': (lambda body, level: brotli.compress(body, quality=level if level is not None else 5),
+           lambda body: brotli.decompress(body), 'brotli'),
+    'zstd': (_zstd_compress, _zstd_decompress, 'zstandard'),
+}
+
+# Preference order of the encodings to accept.
+PREFERENCE = ('zstd', 'br', 'gzip', 'deflate')
+
+
+def available(encoding):
+    """ the encoding's package is installed """
+    if encoding not in ENCODINGS:
+        return False
+    package = ENCODINGS[encoding][2]
+    return package is None or globals()[package] is not None
+
+
+def available_encodings():
+    """ Available Encodings.
+
+    :returns: list of the encodings this process can compress and decode, best first
+    """
+
+    return [encoding for encoding in PREFERENCE if available(encoding)]
+
+
+def _check(encoding):
+    if encoding not in ENCODINGS:
+        raise ValueError('Unknown content encoding: {}'.format(encoding))
+    if not available(encoding):
+        raise ValueError('Content encoding {} needs the "{}" package'.format(
+            encoding, ENCODINGS[encoding][2]))
+
+
+def compress(body, encoding, level=None):
+    """ Compress a body.
+
+    :param bytes body: the body
+    :param str encoding: "gzip", "deflate", "br" or "zstd"
+    :param int level: compression level (default: the encoding's balanced level)
+    :returns: the compressed bytes
+    """
+
+    _check(encoding)
+    return ENCODINGS[encoding][0](body, level)
+
+
+def decompress(body, encoding):
+    """ Decompress a body.
+
+    :param bytes body: the compressed body
+    :param str encoding: "gzip", "deflate", "br", "zstd" or "identity"
+    :returns: the decoded bytes
+    """
+
+    if encoding in (None, '', 'identity'):
+        return body
+    _check(encoding)
+    return ENCODINGS[encoding][1](body)
+
+
+def decompressor(encoding):
+    """ Decompressor.
+
+    :param str encoding: "gzip", "deflate", "br", "zstd" or "identity"
+    :returns: function decoding the compressed body's chunks, one after another
+    """
+
+    if encoding in (None, '', 'identity'):
+        return lambda chunk: chunk
+    _check(encoding)
+    if encoding == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+    if encoding == 'deflate':
+        return zlib.decompressobj().decompress
+    if encoding == 'br':
+        return brotli.Decompressor().process
+    return zstandard.ZstdDecompressor().decompressobj().decompress
+
+
+class Compression(object):
+    """ Compression.
+
+    The client's compression settings.
+
+    Example:
+        Compression(request_encoding='gzip', accept_encoding=['br', 'gzip'])
+    """
+
+    def __init__(self, request_encoding=None, accept_encoding=None, min_size=1024, level=None):
+        """ Init Compression.
+
+        :param str request_encoding: compress request bodies with "gzip", "deflate", "br"
+            or "zstd" (default: send them uncompressed)
+        :param accept_encoding: the encodings to accept in responses, best first;
+            "identity" alone asks for uncompressed responses
+            (default: every available encoding)
+        :param int min_size: smallest request body compressed (in bytes)
+        :param int level: compression level (default: the encoding's balanced level)
+        """
+
+        if request_encoding is not None:
+            _check(request_encoding)
+        accept_encoding = (list(accept_encoding) if accept_encoding is not None
+                           else available_encodings())
+        for encoding in accept_encoding:
+            if encoding != 'identity':
+                _check(encoding)
+
+        self.request_encoding = request_encoding
+        self.accept_encoding = accept_encoding
+        self.min_size = min_size
+        self.level = level
+
+    @property
+    def accept_header(self):
+        """ the Accept-Encoding header value """
+        return ', '.join(self.accept_encoding) or 'identity'
+
+    def encode(self, body):
+        """ Encode a request body.
+
+        :param bytes body: the encoded JSON payload
+        :returns: tuple (body to send, its Content-Encoding or None)
+        """
+
+        if self.request_encoding is None or len(body) < self.min_size:
+            return (body, None)
+        return (compress(body, self.request_encoding, self.level), self.request_encoding)
+
+    def __repr__(self):
+        return '<Compression request={} accept={}>'.format(
+            self.request_encoding, self.accept_header)
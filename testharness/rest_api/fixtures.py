@@ -0,0 +1,242 @@
+""" REST API Test Fixtures
+
+Create the objects a TestCase class needs once, before its tests run,
+and delete them all after.
+
+A Fixture declares the objects to POST to one rest_url: a payload, a list
+of payloads, or a function of the objects created so far, for payloads
+that refer to another fixture's keys. The FixtureRegistry creates the
+fixtures in stages of their "after" dependencies. The objects of a stage
+are POSTed concurrently, or in one request to the fixture's bulk_url.
+Every created key is tracked, so teardown() deletes them concurrently,
+dependents first, even when the setup failed halfway.
+
+Example:
+    class ThingsTests(LiveRestApiTestCase):
+        FIXTURES = {
+            'owner': Fixture('/v1/owners', {'name': 'test owner'}),
+            'things': Fixture('/v1/things', lambda created: [
+                {'owner': created['owner'][0]['id'], 'n': n} for n in range(100)],
+                bulk_url='/v1/things/bulk', after=['owner']),
+        }
+
+        def test_things(self):
+            self.assertEqual(len(self.fixtures['things']), 100)
+"""
+
+import logging
+import threading
+import time
+
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+log = logging.getLogger(__name__)
+
+# Wall time (in seconds) a TestCase class spent in each phase.
+PhaseTimes = namedtuple('PhaseTimes', ['setup', 'test', 'teardown'])
+
+
+class FixtureError(Exception):
+    """ A fixture object could not be created. """
+
+
+class Fixture(object):
+    """ Fixture.
+
+    The objects to create under one rest_url.
+    """
+
+    def __init__(self, rest_url, payload, key='id', bulk_url=None, delete_url=None, after=()):
+        """ Declare a Fixture.
+
+        :param rest_url: a relative URL on the API to POST each object to
+        :param payload: a JSON payload, a list of payloads, or a function of the
+            created objects (dict of lists by fixture name) returning either
+        :param key: the key field of a created object, or a function of its body;
+            else the last path segment of the response's Location header
+        :param bulk_url: a relative URL that creates a list of payloads in one POST
+            and answers the list of created objects, in order
+        :param delete_url: the URL template to delete an object (default: rest_url + "/{key}")
+        :param after: names of the fixtures to create first
+        """
+
+        self.rest_url = rest_url
+        self.payload = payload
+        self.key = key
+        self.bulk_url = bulk_url
+        self.delete_url = delete_url or rest_url.rstrip('/') + '/{key}'
+        self.after = (after,) if isinstance(after, str) else tuple(after)
+
+    def payloads(self, created):
+        """ the list of payloads to create, given the objects created so far """
+        payload = self.payload(created) if callable(self.payload) else self.payload
+        return list(payload) if isinstance(payload, (list, tuple)) else [payload]
+
+    def object_key(self, body, resp=None):
+        """ the key of a created object, or None """
+        if callable(self.key):
+            return self.key(body)
+        if isinstance(body, dict) and body.get(self.key) is not None:
+            return body[self.key]
+        location = resp.headers.get('Location') if resp is not None else None
+        if location:
+            return urlsplit(location).path.rstrip('/').rpartition('/')[2] or None
+        return None
+
+    def __repr__(self):
+        return 'Fixture({!r})'.format(self.rest_url)
+
+
+def fixture_stages(fixtures):
+    """ Fixture Stages.
+
+    :param fixtures: dict of Fixture by name
+    :returns: list of stages, each a list of the fixture names that only
+        depend on the earlier stages
+    """
+
+    remaining = OrderedDict((name, set(fixture.after)) for (name, fixture) in fixtures.items())
+    for (name, after) in remaining.items():
+        for other in sorted(after - set(remaining)):
+            raise ValueError('Fixture "{}" is after unknown fixture "{}"'.format(name, other))
+
+    (stages, done) = ([], set())
+    while remaining:
+        stage = [name for (name, after) in remaining.items() if after <= done]
+        if not stage:
+            raise ValueError('Fixtures depend on each other: {}'.format(', '.join(remaining)))
+        for name in stage:
+            del remaining[name]
+        done.update(stage)
+        stages.append(stage)
+    return stages
+
+
+class FixtureRegistry(object):
+    """ Fixture Registry.
+
+    Create fixtures through a client, keep the created objects by fixture
+    name, and delete them all on teardown.
+    """
+
+    def __init__(self, client, max_workers=10):
+        """ Create a Fixture Registry.
+
+        :param client: the REST API client to create and delete the objects with
+        :param int max_workers: maximum concurrent requests
+        """
+
+        self.client = client
+        self.max_workers = max_workers
+        self.objects = OrderedDict()
+        self.setup_time = 0.0
+        self.teardown_time = 0.0
+        self._created = []  # per stage, a list of (delete_url, key)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        return self.objects[name]
+
+    def __contains__(self, name):
+        return name in self.objects
+
+    def __len__(self):
+        return sum(len(stage) for stage in self._created)
+
+    def _map(self, func, jobs):
+        """ call func on every job, concurrently; re-raise the first failure """
+        if len(jobs) <= 1:
+            return [func(job) for job in jobs]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs)),
+                                thread_name_prefix='FixtureRegistry') as executor:
+            return list(executor.map(func, jobs))
+
+    def _body(self, resp):
+        content = resp.content if hasattr(resp, 'content') else resp.data
+        return self.client.json(resp) if content else None
+
+    def _create(self, job):
+        """ POST one payload, or one bulk list, and track the created keys """
+        (name, fixture, index, payloads, created) = job
+        bulk = index is None
+        rest_url = fixture.bulk_url if bulk else fixture.rest_url
+        resp = self.client.post(rest_url, payloads if bulk else payloads[0])
+        if not 200 <= resp.status_code < 300:
+            raise FixtureError('Fixture "{}": POST {} answered {}'.format(
+                name, rest_url, resp.status_code))
+
+        body = self._body(resp)
+        bodies = body if bulk else [body]
+        if not isinstance(bodies, list) or len(bodies) != len(payloads):
+            raise FixtureError('Fixture "{}": POST {} did not answer a list of {} objects'
+                               .format(name, rest_url, len(payloads)))
+
+        for (offset, body) in enumerate(bodies):
+            key = fixture.object_key(body, None if bulk else resp)
+            if key is None:
+                raise FixtureError('Fixture "{}": no key "{}" in the created object'.format(
+                    name, fixture.key))
+            with self._lock:
+                self.objects[name][(index or 0) + offset] = body
+                created.append((fixture.delete_url, key))
+
+    def create(self, fixtures):
+        """ Create Fixtures.
+
+        :param fixtures: dict of Fixture by name
+        :returns: this registry
+        :raises FixtureError: an object could not be created; the objects created
+            so far stay tracked for teardown()
+        """
+
+        start = time.perf_counter()
+        try:
+            for stage in fixture_stages(fixtures):
+                (jobs, created) = ([], [])
+                self._created.append(created)
+                for name in stage:
+                    fixture = fixtures[name]
+                    payloads = fixture.payloads(self.objects)
+                    self.objects[name] = [None] * len(payloads)
+                    if fixture.bulk_url and len(payloads) > 1:
+                        jobs.append((name, fixture, None, payloads, created))
+                    else:
+                        jobs.extend((name, fixture, index, [payload], created)
+                                    for (index, payload) in enumerate(payloads))
+                self._map(self._create, jobs)
+        finally:
+            self.setup_time += time.perf_counter() - start
+
+        log.debug('Created %d fixture objects in %.3fs', len(self), self.setup_time)
+        return self
+
+    def _delete(self, created):
+        """ DELETE one object; a 404 counts as deleted """
+        (delete_url, key) = created
+        try:
+            resp = self.client.route(delete_url).delete(key=key)
+        except Exception as e:
+            log.warning('Fixture DELETE %s (key %r) failed: %s', delete_url, key, e)
+            return False
+        if 200 <= resp.status_code < 300 or resp.status_code == 404:
+            return True
+        log.warning('Fixture DELETE %s (key %r) answered %d', delete_url, key,
+                    resp.status_code)
+        return False
+
+    def teardown(self):
+        """ Delete the created objects concurrently, the last stage first.
+
+        A failed DELETE is logged and does not stop the others.
+
+        :returns: the number of objects that could not be deleted
+        """
+
+        start = time.perf_counter()
+        failed = 0
+        while self._created:
+            failed += self._map(self._delete, self._created.pop()).count(False)
+        self.teardown_time += time.perf_counter() - start
+        return failed
@@ -0,0 +1,381 @@
+""" REST API Performance History
+
+Keep each run's latency histograms per endpoint in a local SQLite file,
+and flag the endpoints whose p95 or p99 regressed against earlier runs.
+
+A run is identified by its run key (TESTHARNESS_RUN_ID, else one key per
+process) and target host URL, and labelled with the git SHA under test
+(TESTHARNESS_GIT_SHA, else "git rev-parse HEAD"). The test classes of one
+run merge their histograms, so the percentiles are those of the whole run.
+
+The baseline of an endpoint is its last "window" runs on the same host.
+A percentile regressed when it is "z" standard deviations above the
+baseline mean (a one-sided z-test), and at least "min_ratio" times it,
+so a tiny but steady change does not fail the build.
+
+Example:
+    python -m testharness.rest_api.runner -w 8 --history perf.db tests
+    python -m testharness.rest_api compare --history perf.db --window 20 --z 3
+    python -m testharness.rest_api trend --history perf.db "GET /v1/things"
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from collections import namedtuple
+
+from .metrics import LatencyHistogram, endpoint_key
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_key TEXT NOT NULL,
+    host TEXT NOT NULL,
+    git_sha TEXT,
+    started REAL NOT NULL,
+    UNIQUE (run_key, host)
+);
+CREATE TABLE IF NOT EXISTS endpoints (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    host TEXT NOT NULL,
+    method TEXT NOT NULL,
+    rest_url TEXT NOT NULL,
+    started REAL NOT NULL,
+    requests INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    sum_ms REAL NOT NULL,
+    max_ms REAL NOT NULL,
+    p50 REAL,
+    p95 REAL,
+    p99 REAL,
+    buckets TEXT NOT NULL,
+    PRIMARY KEY (run_id, method, rest_url)
+);
+CREATE INDEX IF NOT EXISTS endpoints_trend ON endpoints (method, rest_url, started);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+"""
+
+METRICS = ('p95', 'p99')
+
+# One run's endpoint in the history; latencies are in milliseconds.
+TrendPoint = namedtuple('TrendPoint', [
+    'run_key', 'host', 'git_sha', 'started', 'requests', 'errors', 'mean', 'p50', 'p95', 'p99'])
+
+# One percentile of one endpoint against its baseline.
+#   baseline, stdev: mean and standard deviation of the baseline runs' values
+#   z: the z-score, or None when the baseline has fewer than "min_runs" runs
+Comparison = namedtuple('Comparison', [
+    'host', 'method', 'rest_url', 'metric', 'current', 'baseline', 'stdev', 'z', 'runs',
+    'regressed'])
+
+_run_key = None
+_git_sha = False
+
+
+def run_key():
+    """ the run key: TESTHARNESS_RUN_ID, else one random key per process """
+    global _run_key
+    if os.environ.get('TESTHARNESS_RUN_ID'):
+        return os.environ['TESTHARNESS_RUN_ID']
+    if _run_key is None:
+        _run_key = uuid.uuid4().hex
+    return _run_key
+
+
+def git_sha():
+    """ the git SHA under test: TESTHARNESS_GIT_SHA, else "git rev-parse HEAD", else None """
+    global _git_sha
+    if os.environ.get('TESTHARNESS_GIT_SHA'):
+        return os.environ['TESTHARNESS_GIT_SHA']
+    if _git_sha is False:
+        try:
+            _git_sha = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                check=True, timeout=5).stdout.decode('ascii').strip() or None
+        except (OSError, subprocess.SubprocessError):
+            _git_sha = None
+    return _git_sha
+
+
+def _histogram(row):
+    """ the LatencyHistogram of an endpoints row """
+    histogram = LatencyHistogram()
+    histogram.buckets = dict((int(bucket), count)
+                             for (bucket, count) in json.loads(row['buckets']).items())
+    (histogram.count, histogram.errors) = (row['requests'], row['errors'])
+    (histogram.sum, histogram.max) = (row['sum_ms'], row['max_ms'])
+    return histogram
+
+
+def _mean_stdev(values):
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return (mean, 0.0)
+    return (mean, math.sqrt(sum((value - mean) ** 2 for value in values) / (len(values) - 1)))
+
+
+class HistoryStore(object):
+    """ History Store.
+
+    The SQLite file of past runs' endpoint histograms; safe across threads,
+    and across processes through SQLite's file locks.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        """ Open a History Store.
+
+        :param str path: SQLite file path (created when missing)
+        :param float timeout: wait for another process's write lock (in seconds)
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        # Write-ahead logging: parallel workers append while a report reads.
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        with self._lock, self.db:
+            self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run_id(self, key, host, sha, started):
+        row = self.db.execute('SELECT id FROM runs WHERE run_key = ? AND host = ?',
+                              (key, host)).fetchone()
+        if row is not None:
+            return row['id']
+        return self.db.execute(
+            'INSERT INTO runs (run_key, host, git_sha, started) VALUES (?, ?, ?, ?)',
+            (key, host, sha, started)).lastrowid
+
+    def record(self, histograms, host, key=None, sha=None, started=None):
+        """ Record Histograms.
+
+        Merge endpoint histograms into the run, e.g. one test class's client metrics.
+
+        :param histograms: dict of LatencyHistogram by (method, rest_url)
+        :param str host: the target host URL
+        :param str key: the run key (default: run_key())
+        :param str sha: the git SHA (default: git_sha())
+        :param float started: the run's start time (default: now)
+        :returns: the run's id
+        """
+
+        key = key or run_key()
+        sha = sha or git_sha()
+        started = time.time() if started is None else started
+        with self._lock, self.db:
+            self.db.execute('BEGIN IMMEDIATE')
+            run_id = self._run_id(key, host, sha, started)
+            started = self.db.execute('SELECT started FROM runs WHERE id = ?',
+                                      (run_id,)).fetchone()['started']
+            for ((method, rest_url), histogram) in histograms.items():
+                if not histogram.count:
+                    continue
+                row = self.db.execute(
+                    'SELECT * FROM endpoints WHERE run_id = ? AND method = ? AND rest_url = ?',
+                    (run_id, method, rest_url)).fetchone()
+                if row is not None:
+                    histogram = _histogram(row).merge(histogram)
+                self.db.execute(
+                    'INSERT OR REPLACE INTO endpoints VALUES ({})'.format(', '.join('?' * 13)),
+                    (run_id, host, method, rest_url, started, histogram.count, histogram.errors,
+                     histogram.sum, histogram.max, histogram.percentile(50),
+                     histogram.percentile(95), histogram.percentile(99),
+                     json.dumps(histogram.buckets)))
+        return run_id
+
+    def runs(self, key=None, limit=None):
+        """ Runs.
+
+        :param str key: only this run key's runs (default: the latest run key)
+        :param int limit: the latest runs only
+        :returns: list of sqlite3.Row (id, run_key, host, git_sha, started), latest first
+        """
+
+        if key is None:
+            row = self.db.execute('SELECT run_key FROM runs ORDER BY started DESC LIMIT 1'
+                                  ).fetchone()
+            if row is None:
+                return []
+            key = row['run_key']
+        return self.db.execute(
+            'SELECT * FROM runs WHERE run_key = ? ORDER BY started DESC LIMIT ?',
+            (key, -1 if limit is None else limit)).fetchall()
+
+    def trend(self, endpoint, host=None, since=None, limit=None):
+        """ Endpoint Trend.
+
+        :param str endpoint: "METHOD rest_url"
+        :param str host: only this host URL's runs
+        :param float since: only the runs started since this time
+        :param int limit: the latest runs only
+        :returns: list of TrendPoint, latest first
+        """
+
+        (method, rest_url) = endpoint_key(endpoint)
+        sql = ('SELECT runs.run_key, runs.git_sha, endpoints.* FROM endpoints'
+               ' JOIN runs ON runs.id = endpoints.run_id'
+               ' WHERE endpoints.method = ? AND endpoints.rest_url = ?'
+               ' AND endpoints.started >= ?')
+        params = [method or 'GET', rest_url, since or 0.0]
+        if host is not None:
+            sql += ' AND endpoints.host = ?'
+            params.append(host)
+        sql += ' ORDER BY endpoints.started DESC LIMIT ?'
+        params.append(-1 if limit is None else limit)
+
+        return [TrendPoint(row['run_key'], row['host'], row['git_sha'], row['started'],
+                           row['requests'], row['errors'], row['sum_ms'] / row['requests'],
+                           row['p50'], row['p95'], row['p99'])
+                for row in self.db.execute(sql, params)]
+
+    def compare(self, run_id, window=20, z=3.0, min_ratio=1.1, min_runs=5):
+        """ Compare a Run with its Baseline.
+
+        :param int run_id: the run's id
+        :param int window: number of earlier runs in each endpoint's baseline
+        :param float z: z-score above which a percentile is significantly slower
+        :param float min_ratio: smallest current / baseline ratio counted as a regression
+        :param int min_runs: fewest baseline runs to test against
+        :returns: list of Comparison, one per endpoint and metric
+        """
+
+        comparisons = []
+        current = self.db.execute('SELECT * FROM endpoints WHERE run_id = ? '
+                                  'ORDER BY method, rest_url', (run_id,)).fetchall()
+        for row in current:
+            baseline = self.db.execute(
+                'SELECT p95, p99 FROM endpoints WHERE method = ? AND rest_url = ? '
+                'AND started < ? AND host = ? ORDER BY started DESC LIMIT ?',
+                (row['method'], row['rest_url'], row['started'], row['host'], window)
+            ).fetchall()
+            for metric in METRICS:
+                values = [past[metric] for past in baseline if past[metric] is not None]
+                if row[metric] is None or len(values) < max(min_runs, 1):
+                    comparisons.append(Comparison(row['host'], row['method'], row['rest_url'],
+                                                  metric, row[metric], None, None, None,
+                                                  len(values), False))
+                    continue
+                (mean, stdev) = _mean_stdev(values)
+                # The histogram buckets are 2% wide: never trust a spread below that.
+                stdev = max(stdev, mean * (LatencyHistogram.PRECISION - 1.0), 1e-9)
+                score = (row[metric] - mean) / stdev
+                comparisons.append(Comparison(
+                    row['host'], row['method'], row['rest_url'], metric, row[metric], mean,
+                    stdev, score, len(values),
+                    score >= z and row[metric] >= mean * min_ratio))
+        return comparisons
+
+
+def record_client(path, client):
+    """ Record a client's in-memory histograms in the history file; best effort.
+
+    :param str path: SQLite file path
+    :param client: a REST API client with the default HistogramMetricsSink
+    """
+
+    histograms = getattr(client.metrics, 'histograms', None)
+    if not histograms:
+        return
+    try:
+        with HistoryStore(path) as store:
+            store.record(histograms, client.host_url)
+    except Exception:
+        log.warning('History file %s not updated', path, exc_info=True)
+
+
+def format_comparison(comparison):
+    """ one line per Comparison, e.g. "REGRESSED  GET /v1/things p95 180.0 ms vs .." """
+    name = '{} {} {}'.format(comparison.method, comparison.rest_url, comparison.metric)
+    if comparison.z is None:
+        return '{:10} {} {} ms ({} baseline runs)'.format(
+            'NEW', name, _ms(comparison.current), comparison.runs)
+    return '{:10} {} {} ms vs {} +/- {} ms (z={:.1f}, {} runs)'.format(
+        'REGRESSED' if comparison.regressed else 'ok', name, _ms(comparison.current),
+        _ms(comparison.baseline), _ms(comparison.stdev), comparison.z, comparison.runs)
+
+
+def _ms(value):
+    return '-' if value is None else '{:.1f}'.format(value)
+
+
+def main(argv=None):
+    """ Run the performance history command line.
+
+    :param argv: command line arguments (default: sys.argv[1:])
+    :returns: process exit status; 1 when "compare" finds a regression
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m testharness.rest_api',
+                                     description='Compare REST API latencies across runs.')
+    commands = parser.add_subparsers(dest='command')
+
+    compare = commands.add_parser('compare', help='compare a run with its rolling baseline')
+    compare.add_argument('--history', required=True, help='SQLite history file')
+    compare.add_argument('--run', default=None, help='run key (default: the latest run)')
+    compare.add_argument('--window', type=int, default=20,
+                         help='earlier runs in the baseline (default: 20)')
+    compare.add_argument('--z', type=float, default=3.0,
+                         help='z-score of a significant regression (default: 3.0)')
+    compare.add_argument('--min-ratio', type=float, default=1.1,
+                         help='smallest slowdown ratio that fails (default: 1.1)')
+    compare.add_argument('--min-runs', type=int, default=5,
+                         help='fewest baseline runs to compare with (default: 5)')
+
+    trend = commands.add_parser('trend', help='print an endpoint\'s latencies across runs')
+    trend.add_argument('--history', required=True, help='SQLite history file')
+    trend.add_argument('endpoint', help='"METHOD rest_url"')
+    trend.add_argument('--host', default=None, help='only this host URL')
+    trend.add_argument('-n', '--limit', type=int, default=20,
+                       help='latest runs to print (default: 20)')
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        parser.error('a command is required')
+    if not os.path.exists(args.history):
+        parser.error('no history file: {}'.format(args.history))
+
+    with HistoryStore(args.history) as store:
+        if args.command == 'trend':
+            for point in store.trend(args.endpoint, host=args.host, limit=args.limit):
+                print('{}  {:10}  {}  requests={} p50={} p95={} p99={} ms'.format(
+                    time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(point.started)),
+                    (point.git_sha or '-')[:10], point.host, point.requests,
+                    _ms(point.p50), _ms(point.p95), _ms(point.p99)))
+            return 0
+
+        regressed = 0
+        for run in store.runs(key=args.run):
+            print('Run {} on {} (git {})'.format(run['run_key'], run['host'],
+                                                 run['git_sha'] or '-'))
+            for comparison in store.compare(run['id'], window=args.window, z=args.z,
+                                            min_ratio=args.min_ratio, min_runs=args.min_runs):
+                print('  ' + format_comparison(comparison))
+                regressed += comparison.regressed
+
+    print('{} regressions'.format(regressed))
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,102 @@
+""" REST API JSON Codecs
+
+Encode request payloads and decode response bodies with a pluggable JSON codec.
+
+The "auto" codec is orjson when it is installed (pip install orjson),
+else the stdlib json module. The stdlib codec hands the payload to the
+HTTP library's own "json=" argument, so its wire format is unchanged.
+"""
+
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+log = logging.getLogger(__name__)
+
+
+class JsonCodec(object):
+    """ JSON Codec.
+
+    Subclass it to plug in another JSON library.
+    """
+
+    name = None
+
+    def dumps(self, obj):
+        """ Encode an object as JSON bytes. """
+        raise NotImplementedError('JSON codec must encode')
+
+    def loads(self, data):
+        """ Decode JSON bytes (or str). """
+        raise NotImplementedError('JSON codec must decode')
+
+    def request_body(self, payload):
+        """ Request Body.
+
+        :param payload: JSON payload to send
+        :returns: dict of keyword arguments for the HTTP library's request call
+        """
+
+        return {'data': self.dumps(payload)}
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self).__name__, self.name)
+
+
+class StdlibJsonCodec(JsonCodec):
+    """ Stdlib JSON Codec: the json module. """
+
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(obj).encode('utf8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def request_body(self, payload):
+        return {'json': payload}
+
+
+class OrjsonCodec(JsonCodec):
+    """ orjson Codec: the fast, Rust based orjson library. """
+
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('The orjson codec needs "pip install orjson"')
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+CODECS = {
+    StdlibJsonCodec.name: StdlibJsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+}
+
+
+def get_codec(codec=None):
+    """ Get JSON Codec.
+
+    :param codec: a JsonCodec, a codec name ("json", "orjson") or "auto"/None
+        for orjson when it is installed, else stdlib json
+    :returns: a JsonCodec
+    """
+
+    if isinstance(codec, JsonCodec):
+        return codec
+    if codec in (None, 'auto'):
+        return OrjsonCodec() if orjson is not None else StdlibJsonCodec()
+    try:
+        return CODECS[codec]()
+    except KeyError:
+        raise ValueError('Unknown JSON codec: {}'.format(codec))
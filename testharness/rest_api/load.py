@@ -0,0 +1,371 @@
+""" REST API Load Generation
+
+Replay LiveRestApiTestCase test methods as a throughput and latency benchmark.
+
+The load runner prepares the TestCase class once (setUpClass), then worker
+threads run its test methods over and over, for a fixed duration or
+iteration count, at a target concurrency and optional request rate. Every client
+call is timed and reported per endpoint, keyed on the rest_url passed to
+the client, so the functional tests double as the load test.
+
+Example:
+    python -m testharness.rest_api.load tests.test_api.ThingsTests -c 16 -d 60 --rate 200
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import math
+import sys
+import threading
+import time
+import unittest
+
+from collections import OrderedDict, namedtuple
+
+log = logging.getLogger(__name__)
+
+# Latency percentiles reported per endpoint.
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Client methods timed per endpoint.
+TIMED_METHODS = ('delete', 'get', 'head', 'options', 'patch', 'post', 'put')
+
+# Summary of one endpoint's requests; latencies are in milliseconds.
+EndpointStats = namedtuple('EndpointStats', [
+    'endpoint', 'requests', 'errors', 'requests_per_sec', 'error_rate',
+    'p50', 'p90', 'p99', 'p999'])
+
+
+def percentile(sorted_values, pct):
+    """ Percentile by nearest rank.
+
+    :param sorted_values: a sorted list of numbers
+    :param float pct: percentile from 0 to 100
+    :returns: the percentile value or None when there are no values
+    """
+
+    if not sorted_values:
+        return None
+    rank = max(int(math.ceil(pct / 100.0 * len(sorted_values))), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LatencyRecorder(object):
+    """ Latency Recorder.
+
+    Collect request latencies and errors per endpoint; safe across threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = OrderedDict()
+        self.errors = {}
+
+    def record(self, endpoint, elapsed, error=False):
+        """ Record one request.
+
+        :param str endpoint: endpoint key, e.g. "GET /v1/things"
+        :param float elapsed: request latency (in seconds)
+        :param bool error: the request raised or the server answered 5xx
+        """
+
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(elapsed)
+            if error:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def stats(self, wall_time):
+        """ Endpoint Statistics.
+
+        :param float wall_time: load run wall time (in seconds)
+        :returns: list of EndpointStats
+        """
+
+        stats = []
+        with self._lock:
+            for (endpoint, latencies) in self.latencies.items():
+                latencies = sorted(latencies)
+                count = len(latencies)
+                errors = self.errors.get(endpoint, 0)
+                stats.append(EndpointStats(
+                    endpoint, count, errors,
+                    count / wall_time if wall_time else 0.0,
+                    errors / count,
+                    *[percentile(latencies, pct) * 1000.0 for pct in PERCENTILES]))
+        return stats
+
+
+class RequestPacer(object):
+    """ Request Pacer.
+
+    Hand out evenly spaced request start times at a target rate; safe across threads.
+    """
+
+    def __init__(self, rate):
+        """ Init RequestPacer.
+
+        :param float rate: target requests per second
+        """
+
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._start = None
+        self._slots = 0
+
+    def wait(self):
+        """ Wait for the next request's start time. """
+        with self._lock:
+            if self._start is None:
+                self._start = time.perf_counter()
+            slot = self._slots
+            self._slots += 1
+
+        delay = self._start + slot / self.rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _TimedClient(object):
+    """ Timed Client.
+
+    Proxy a REST API client and record the latency of each HTTP method call.
+    With a RequestPacer, each call first waits for its start time.
+    """
+
+    def __init__(self, client, recorder, pacer=None):
+        self._client = client
+        self._recorder = recorder
+        self._pacer = pacer
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in TIMED_METHODS:
+            return attr
+
+        endpoint_method = name.upper()
+
+        def timed(rest_url, *args, **kwargs):
+            endpoint = '{} {}'.format(endpoint_method, rest_url)
+            if self._pacer is not None:
+                self._pacer.wait()
+            start = time.perf_counter()
+            try:
+                resp = attr(rest_url, *args, **kwargs)
+            except Exception:
+                self._recorder.record(endpoint, time.perf_counter() - start, error=True)
+                raise
+            error = getattr(resp, 'status_code', 0) >= 500
+            self._recorder.record(endpoint, time.perf_counter() - start, error=error)
+            return resp
+
+        return timed
+
+
+class LoadReport(object):
+    """ Load Report.
+
+    The outcome of a load run: test iterations and per-endpoint statistics.
+    """
+
+    def __init__(self, test_class_name, concurrency, wall_time, iterations, failures,
+                 endpoints):
+        self.test_class_name = test_class_name
+        self.concurrency = concurrency
+        self.wall_time = wall_time
+        self.iterations = iterations
+        self.failures = failures
+        self.endpoints = endpoints
+
+    @property
+    def requests(self):
+        return sum(stats.requests for stats in self.endpoints)
+
+    @property
+    def requests_per_sec(self):
+        return self.requests / self.wall_time if self.wall_time else 0.0
+
+    def to_dict(self):
+        """ Report as a JSON-ready dict. """
+        return {
+            'test_class': self.test_class_name,
+            'concurrency': self.concurrency,
+            'wall_time': self.wall_time,
+            'iterations': self.iterations,
+            'failures': self.failures,
+            'requests': self.requests,
+            'requests_per_sec': self.requests_per_sec,
+            'endpoints': [stats._asdict() for stats in self.endpoints],
+        }
+
+    def format(self):
+        """ Report as a text table. """
+        header = '{:<40} {:>8} {:>8} {:>9} {:>9} {:>9} {:>9} {:>9}'
+        row = '{:<40} {:>8} {:>8.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}'
+
+        lines = [
+            '{}: {} iterations ({} failed), {} requests in {:.3f}s at concurrency {}'.format(
+                self.test_class_name, self.iterations, self.failures, self.requests,
+                self.wall_time, self.concurrency),
+            header.format('endpoint', 'requests', 'req/s', 'errors%',
+                          'p50 ms', 'p90 ms', 'p99 ms', 'p999 ms'),
+        ]
+        for stats in self.endpoints:
+            lines.append(row.format(
+                stats.endpoint, stats.requests, stats.requests_per_sec,
+                stats.error_rate * 100.0, stats.p50, stats.p90, stats.p99, stats.p999))
+        return '\n'.join(lines)
+
+
+class LoadRunner(object):
+    """ Load Runner.
+
+    Replay the test methods of a LiveRestApiTestCase class under load.
+    """
+
+    def __init__(self, test_class, test_names=None, concurrency=4, duration=None,
+                 iterations=None, rate=None):
+        """ Init LoadRunner.
+
+        :param test_class: a LiveRestApiTestCase subclass
+        :param test_names: test method names to replay (default: all tests)
+        :param int concurrency: number of worker threads
+        :param float duration: run time limit (in seconds)
+        :param int iterations: total number of test method runs
+        :param float rate: target client requests per second (default: unlimited)
+        """
+
+        if duration is None and iterations is None:
+            raise ValueError('Load run needs a duration or an iteration count')
+
+        self.test_class = test_class
+        self.test_names = test_names or unittest.TestLoader().getTestCaseNames(test_class)
+        self.concurrency = concurrency
+        self.duration = duration
+        self.iterations = iterations
+        self.rate = rate
+
+        self._lock = threading.Lock()
+        self._started = 0
+        self._completed = 0
+        self._failures = 0
+
+    def _load_class(self):
+        """ Load Class.
+
+        Subclass the test class, so its connection pool fits the concurrency.
+        """
+
+        attrs = {}
+        if getattr(self.test_class, 'POOL_MAXSIZE', self.concurrency) < self.concurrency:
+            attrs['POOL_MAXSIZE'] = self.concurrency
+        return type(self.test_class.__name__, (self.test_class,), attrs)
+
+    def _next_iteration(self, deadline):
+        """ Claim the next test iteration.
+
+        :returns: iteration number or None when the run is over
+        """
+
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+
+        with self._lock:
+            iteration = self._started
+            if self.iterations is not None and iteration >= self.iterations:
+                return None
+            self._started += 1
+        return iteration
+
+    def _worker(self, load_class, deadline):
+        while True:
+            iteration = self._next_iteration(deadline)
+            if iteration is None:
+                return
+
+            test = load_class(self.test_names[iteration % len(self.test_names)])
+            result = unittest.TestResult()
+            test.run(result)
+            with self._lock:
+                self._completed += 1
+                if not result.wasSuccessful():
+                    self._failures += 1
+                for (_, detail) in result.failures + result.errors:
+                    log.debug('Load iteration %d failed: %s', iteration, detail)
+
+    def run(self):
+        """ Run the load.
+
+        :returns: a LoadReport
+        """
+
+        load_class = self._load_class()
+        recorder = LatencyRecorder()
+
+        load_class.setUpClass()
+        client = load_class.client
+        pacer = RequestPacer(self.rate) if self.rate else None
+        load_class.client = _TimedClient(client, recorder, pacer=pacer)
+        try:
+            start = time.perf_counter()
+            deadline = start + self.duration if self.duration is not None else None
+            workers = [threading.Thread(target=self._worker, args=(load_class, deadline),
+                                        name='LoadRunner-{}'.format(n))
+                       for n in range(self.concurrency)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            wall_time = time.perf_counter() - start
+        finally:
+            load_class.client = client
+            load_class.tearDownClass()
+
+        return LoadReport(
+            '.'.join([self.test_class.__module__, self.test_class.__qualname__]),
+            self.concurrency, wall_time, self._completed, self._failures,
+            recorder.stats(wall_time))
+
+
+def main(argv=None):
+    """ Run the load generator command line.
+
+    :param argv: command line arguments (default: sys.argv[1:])
+    :returns: process exit status
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m testharness.rest_api.load',
+                                     description='Replay REST API test methods as a load test.')
+    parser.add_argument('test_class', help='dotted "module.Class" name of the TestCase')
+    parser.add_argument('tests', nargs='*', help='test method names (default: all)')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='worker threads')
+    parser.add_argument('-d', '--duration', type=float, default=None,
+                        help='run time in seconds')
+    parser.add_argument('-n', '--iterations', type=int, default=None,
+                        help='total test method runs')
+    parser.add_argument('-r', '--rate', type=float, default=None,
+                        help='target client requests per second (all endpoints)')
+    parser.add_argument('--json', default=None, help='write the report as JSON to a file')
+    args = parser.parse_args(argv)
+
+    if args.duration is None and args.iterations is None:
+        parser.error('one of --duration or --iterations is required')
+
+    (module_name, _, class_name) = args.test_class.rpartition('.')
+    test_class = getattr(importlib.import_module(module_name), class_name)
+
+    report = LoadRunner(test_class, test_names=args.tests, concurrency=args.concurrency,
+                        duration=args.duration, iterations=args.iterations,
+                        rate=args.rate).run()
+    print(report.format())
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report.to_dict(), f, indent=2)
+
+    return 0 if report.failures == 0 else 1
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,224 @@
+""" REST API Client Metrics
+
+Record the timing and size of each REST API request into a metrics sink.
+
+Every client call makes a RequestTiming. The client passes it to its
+metrics sink and attaches it to the response as "response.timing".
+The default HistogramMetricsSink keeps an in-memory latency histogram
+per endpoint, i.e. per (method, rest_url). The rest_url is the template
+given to the client, without the object key or query string.
+"""
+
+import logging
+import math
+import threading
+
+from collections import OrderedDict, namedtuple
+
+log = logging.getLogger(__name__)
+
+# The timing of one request; times are in seconds.
+#   connect: DNS lookup and TCP connect for a new connection (else 0.0)
+#   tls: TLS handshake for a new HTTPS connection (else 0.0)
+#   ttfb: time to the response headers
+#   total: time to the whole response
+#   request_bytes, response_bytes: decoded body sizes
+#   request_wire_bytes, response_wire_bytes: body sizes on the wire, compressed or not
+#       (None when unknown: the decoded size)
+RequestTiming = namedtuple('RequestTiming', [
+    'method', 'rest_url', 'url', 'status_code',
+    'connect', 'tls', 'ttfb', 'total',
+    'request_bytes', 'response_bytes',
+    'request_wire_bytes', 'response_wire_bytes'])
+RequestTiming.__new__.__defaults__ = (None, None)
+
+# Summary of one endpoint's requests; latencies are in milliseconds.
+EndpointSummary = namedtuple('EndpointSummary', [
+    'method', 'rest_url', 'requests', 'errors',
+    'mean', 'p50', 'p90', 'p95', 'p99', 'p999', 'max',
+    'request_bytes', 'response_bytes',
+    'request_wire_bytes', 'response_wire_bytes'])
+EndpointSummary.__new__.__defaults__ = (None, None)
+
+
+def is_error(timing):
+    """ the request raised (no status code) or the server answered 5xx """
+    status_code = timing.status_code
+    if status_code is None:
+        return True
+    return isinstance(status_code, int) and status_code >= 500
+
+
+def endpoint_key(endpoint):
+    """ Endpoint Key.
+
+    :param str endpoint: "METHOD rest_url" or just "rest_url" for any method
+    :returns: tuple (method or None, rest_url)
+    """
+
+    (method, _, rest_url) = endpoint.strip().rpartition(' ')
+    return (method.upper() or None, rest_url)
+
+
+class LatencyHistogram(object):
+    """ Latency Histogram.
+
+    Count latencies (in milliseconds) in log-scaled buckets 2% wide,
+    so memory stays constant however many requests are recorded.
+    """
+
+    PRECISION = 1.02
+    MIN_VALUE = 1e-3
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.errors = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.request_wire_bytes = 0
+        self.response_wire_bytes = 0
+
+    def add(self, value, error=False, request_bytes=0, response_bytes=0,
+            request_wire_bytes=None, response_wire_bytes=None):
+        """ Add one latency (in milliseconds).
+
+        The wire sizes default to the decoded sizes, for uncompressed bodies.
+        """
+        bucket = int(math.floor(math.log(max(value, self.MIN_VALUE), self.PRECISION)))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.errors += 1 if error else 0
+        self.sum += value
+        self.max = max(self.max, value)
+        self.request_bytes += request_bytes or 0
+        self.response_bytes += response_bytes or 0
+        self.request_wire_bytes += (request_wire_bytes if request_wire_bytes is not None
+                                    else request_bytes or 0)
+        self.response_wire_bytes += (response_wire_bytes if response_wire_bytes is not None
+                                     else response_bytes or 0)
+
+    def merge(self, other):
+        """ Add the counts of another LatencyHistogram. """
+        for (bucket, count) in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.errors += other.errors
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        self.request_bytes += other.request_bytes
+        self.response_bytes += other.response_bytes
+        self.request_wire_bytes += other.request_wire_bytes
+        self.response_wire_bytes += other.response_wire_bytes
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    @property
+    def response_savings(self):
+        """ fraction of the decoded response bytes compression kept off the wire """
+        if not self.response_bytes:
+            return None
+        return 1.0 - self.response_wire_bytes / float(self.response_bytes)
+
+    def percentile(self, pct):
+        """ Percentile by nearest rank, to the bucket's upper bound.
+
+        :param float pct: percentile from 0 to 100
+        :returns: the latency (in milliseconds) or None when there are no values
+        """
+
+        if not self.count:
+            return None
+
+        rank = max(int(math.ceil(pct / 100.0 * self.count)), 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.PRECISION ** (bucket + 1), self.max)
+        return self.max
+
+
+class MetricsSink(object):
+    """ Metrics Sink.
+
+    Receive the RequestTiming of each client request.
+    Subclass it to ship the timings somewhere else (statsd, a file, ..etc.).
+    """
+
+    def record(self, timing):
+        """ Record one RequestTiming. """
+        raise NotImplementedError('Metrics sink must record timings')
+
+
+class NullMetricsSink(MetricsSink):
+    """ Null Metrics Sink: drop every timing. """
+
+    def record(self, timing):
+        pass
+
+
+class HistogramMetricsSink(MetricsSink):
+    """ Histogram Metrics Sink.
+
+    Keep an in-memory LatencyHistogram per (method, rest_url); safe across threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = OrderedDict()
+
+    def record(self, timing):
+        key = (timing.method, timing.rest_url)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.add(timing.total * 1000.0, error=is_error(timing),
+                          request_bytes=timing.request_bytes,
+                          response_bytes=timing.response_bytes,
+                          request_wire_bytes=timing.request_wire_bytes,
+                          response_wire_bytes=timing.response_wire_bytes)
+
+    def reset(self):
+        """ Forget all recorded timings. """
+        with self._lock:
+            self.histograms.clear()
+
+    def histogram(self, endpoint):
+        """ Endpoint Histogram.
+
+        :param str endpoint: "METHOD rest_url" or just "rest_url" for all methods
+        :returns: a LatencyHistogram (empty when nothing was recorded)
+        """
+
+        (method, rest_url) = endpoint_key(endpoint)
+        merged = LatencyHistogram()
+        with self._lock:
+            for ((key_method, key_rest_url), histogram) in self.histograms.items():
+                if key_rest_url == rest_url and method in (None, key_method):
+                    merged.merge(histogram)
+        return merged
+
+    def summary(self):
+        """ Endpoint Summaries.
+
+        :returns: list of EndpointSummary
+        """
+
+        with self._lock:
+            return [
+                EndpointSummary(
+                    method, rest_url, histogram.count, histogram.errors, histogram.mean,
+                    histogram.percentile(50), histogram.percentile(90),
+                    histogram.percentile(95), histogram.percentile(99),
+                    histogram.percentile(99.9), histogram.max,
+                    histogram.request_bytes, histogram.response_bytes,
+                    histogram.request_wire_bytes, histogram.response_wire_bytes)
+                for ((method, rest_url), histogram) in self.histograms.items()
+            ]
@@ -0,0 +1,212 @@
+""" REST API Pagination
+
+Walk a paged collection endpoint item by item.
+
+A client's "paginate" asks its pagination strategy for each page request,
+and reads the page items out of each JSON response, decoded once with the
+client's codec. The next page is
+prefetched in the background while the test consumes the current one,
+so a long walk costs about one round trip per page.
+
+Strategies:
+    OffsetPagination: ?offset=0&limit=100, then ?offset=100&limit=100, ..etc.
+    PagePagination: ?page=1, then ?page=2, ..etc.
+    CursorPagination: ?cursor=<the "next_cursor" of the previous page>
+    LinkHeaderPagination: follow the "Link: <url>; rel=next" response header
+"""
+
+import logging
+
+from urllib.parse import parse_qsl, urlsplit
+
+log = logging.getLogger(__name__)
+
+
+def response_json(resp):
+    """ Response JSON.
+
+    :param resp: a requests or Flask (Werkzeug) response
+    :returns: the decoded JSON body
+    """
+
+    data = resp.json
+    return data() if callable(data) else data
+
+
+def _lookup(data, path):
+    """ value at the dotted "path" in nested dicts, or None """
+    for key in path.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+class PaginationStrategy(object):
+    """ Pagination Strategy.
+
+    Compose each page request and read its items.
+    A page request is a tuple (rest_url, query).
+    """
+
+    def __init__(self, items_key=None):
+        """ Init PaginationStrategy.
+
+        :param str items_key: dotted path to the page items in the JSON body
+            (default: the body is the list of items)
+        """
+
+        self.items_key = items_key
+
+    def first_page(self, rest_url, query):
+        """ First Page Request.
+
+        :returns: tuple (rest_url, query)
+        """
+
+        return (rest_url, dict(query))
+
+    def page_items(self, resp, data=None):
+        """ Page Items.
+
+        :param resp: the page's HTTP response
+        :param data: the page's decoded JSON body (default: decode the response)
+        :returns: list of items
+        """
+
+        if data is None:
+            data = response_json(resp)
+        items = _lookup(data, self.items_key) if self.items_key else data
+        if items is None:
+            return []
+        if not isinstance(items, list):
+            raise ValueError('Page items are not a list: set items_key to find them in {}'
+                             .format(type(data).__name__))
+        return items
+
+    def next_page(self, page, resp, items, data=None):
+        """ Next Page Request.
+
+        :param page: the current page request tuple (rest_url, query)
+        :param resp: the current page's HTTP response
+        :param items: the current page's items
+        :param data: the current page's decoded JSON body (default: decode the response)
+        :returns: tuple (rest_url, query) or None after the last page
+        """
+
+        raise NotImplementedError('Pagination strategy must compose the next page')
+
+
+class OffsetPagination(PaginationStrategy):
+    """ Offset Pagination: ?offset=N&limit=M """
+
+    def __init__(self, limit=100, offset_param='offset', limit_param='limit', items_key=None):
+        super().__init__(items_key=items_key)
+        self.limit = limit
+        self.offset_param = offset_param
+        self.limit_param = limit_param
+
+    def first_page(self, rest_url, query):
+        query = dict(query)
+        query.setdefault(self.offset_param, 0)
+        query.setdefault(self.limit_param, self.limit)
+        return (rest_url, query)
+
+    def next_page(self, page, resp, items, data=None):
+        (rest_url, query) = page
+        limit = int(query[self.limit_param])
+        if len(items) < limit:
+            return None
+
+        query = dict(query)
+        query[self.offset_param] = int(query[self.offset_param]) + len(items)
+        return (rest_url, query)
+
+
+class PagePagination(PaginationStrategy):
+    """ Page Number Pagination: ?page=N (and an optional page size) """
+
+    def __init__(self, page_param='page', first=1, size_param=None, page_size=None,
+                 items_key=None):
+        super().__init__(items_key=items_key)
+        self.page_param = page_param
+        self.first = first
+        self.size_param = size_param
+        self.page_size = page_size
+
+    def first_page(self, rest_url, query):
+        query = dict(query)
+        query.setdefault(self.page_param, self.first)
+        if self.size_param and self.page_size:
+            query.setdefault(self.size_param, self.page_size)
+        return (rest_url, query)
+
+    def next_page(self, page, resp, items, data=None):
+        (rest_url, query) = page
+        if not items:
+            return None
+        if self.size_param and len(items) < int(query.get(self.size_param, 0)):
+            return None
+
+        query = dict(query)
+        query[self.page_param] = int(query[self.page_param]) + 1
+        return (rest_url, query)
+
+
+class CursorPagination(PaginationStrategy):
+    """ Cursor Pagination: ?cursor=<the previous page's next cursor> """
+
+    def __init__(self, cursor_param='cursor', cursor_key='next_cursor', items_key='items'):
+        """ Init CursorPagination.
+
+        :param str cursor_param: query string parameter for the cursor
+        :param str cursor_key: dotted path to the next cursor in the JSON body
+        :param str items_key: dotted path to the page items in the JSON body
+        """
+
+        super().__init__(items_key=items_key)
+        self.cursor_param = cursor_param
+        self.cursor_key = cursor_key
+
+    def next_page(self, page, resp, items, data=None):
+        (rest_url, query) = page
+        if data is None:
+            data = response_json(resp)
+        cursor = _lookup(data, self.cursor_key)
+        if cursor in (None, '') or not items:
+            return None
+
+        query = dict(query)
+        query[self.cursor_param] = cursor
+        return (rest_url, query)
+
+
+class LinkHeaderPagination(PaginationStrategy):
+    """ Link Header Pagination.
+
+    Follow "Link: <url>; rel=next" (RFC 8288). The link's path and query
+    string are requested on the client's own host.
+    """
+
+    def __init__(self, rel='next', items_key=None):
+        """ Init LinkHeaderPagination.
+
+        :param str rel: link relation of the next page
+        :param str items_key: dotted path to the page items in the JSON body
+        """
+
+        super().__init__(items_key=items_key)
+        self.rel = rel
+
+    def next_page(self, page, resp, items, data=None):
+        header = resp.headers.get('Link')
+        if not header:
+            return None
+
+        from requests.utils import parse_header_links
+
+        for link in parse_header_links(header):
+            if self.rel in link.get('rel', '').split():
+                parts = urlsplit(link['url'])
+                return (parts.path, dict(parse_qsl(parts.query)))
+        return None
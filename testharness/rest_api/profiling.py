@@ -0,0 +1,359 @@
+""" REST API Test Profiling
+
+Profile each test method and each client request with cProfile and/or
+tracemalloc, to tell harness and JSON decoding time from server time.
+
+Profiling is off unless the TESTHARNESS_PROFILE environment variable
+(or the runner's --profile flag) names the profilers: "cpu", "memory",
+or "all". LiveRestApiTestCase then profiles its test methods and wraps
+its client's request(); when it is off, nothing is wrapped at all.
+
+The profiles add up per test id and per endpoint ("METHOD rest_url"),
+and each test class's tearDownClass writes them to TESTHARNESS_PROFILE_DIR
+(default: "profile"):
+
+    tests/<test id>.prof, .collapsed       pstats and collapsed stacks
+    endpoints/<endpoint>.<pid>.prof, ..    the same per endpoint
+    summary.<pid>.txt                      times, memory and top allocation sites
+
+The collapsed stacks are rebuilt from cProfile's caller graph, sharing
+each function's time among its callers in proportion, and feed
+flamegraph.pl or speedscope as they are. A client request's profile is
+also added to the test that sent it.
+
+cProfile profiles one thread; on Python 3.12 and newer only one thread
+profiles at a time, and the requests that find the profiler busy are
+counted as skipped. Run the parallel runner in process mode to profile
+every worker.
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cpu', 'memory')
+
+# Walking the caller graph into stacks stops at this depth and node count.
+MAX_STACK_DEPTH = 128
+MAX_STACK_NODES = 200000
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def profile_modes(value):
+    """ Profile Modes.
+
+    :param str value: comma separated "cpu" and "memory", or "all"/"1"/"true"
+        for both; empty, "0", "off" or "none" for neither
+    :returns: tuple of the profile modes
+    """
+
+    names = [name.strip().lower() for name in (value or '').split(',') if name.strip()]
+    if not names or names in (['0'], ['off'], ['none'], ['false']):
+        return ()
+    if names in (['1'], ['all'], ['true'], ['on']):
+        return PROFILE_MODES
+    for name in names:
+        if name not in PROFILE_MODES:
+            raise ValueError('Unknown profile mode: {}'.format(name))
+    return tuple(mode for mode in PROFILE_MODES if mode in names)
+
+
+def get_profiler():
+    """ the process's Profiler, as TESTHARNESS_PROFILE asks, or None when it is off """
+    global _profiler
+    modes = profile_modes(os.environ.get('TESTHARNESS_PROFILE'))
+    if not modes:
+        return None
+    with _profiler_lock:
+        if _profiler is None:
+            output_dir = os.environ.get('TESTHARNESS_PROFILE_DIR') or 'profile'
+            _profiler = Profiler(cpu='cpu' in modes, memory='memory' in modes,
+                                 output_dir=output_dir)
+        return _profiler
+
+
+def _frame_name(func):
+    (filename, line, name) = func
+    if filename == '~':
+        return name.replace(';', ':')
+    return '{}:{}:{}'.format(os.path.basename(filename), line, name).replace(';', ':')
+
+
+def collapsed_stacks(stats, min_us=1):
+    """ Collapsed Stacks.
+
+    :param stats: a pstats.Stats
+    :param int min_us: leave out the stacks with less self time (in microseconds)
+    :returns: Counter of microseconds of self time by "root;caller;function" stack
+    """
+
+    entries = stats.stats
+    children = {}
+    for (func, (_, _, _, _, callers)) in entries.items():
+        for (caller, edge) in callers.items():
+            edge_time = edge[3] if isinstance(edge, tuple) else 0.0
+            children.setdefault(caller, []).append((func, edge_time))
+
+    stacks = Counter()
+    nodes = [0]
+
+    def walk(func, share, stack, path):
+        nodes[0] += 1
+        (_, _, self_time, total_time, _) = entries[func]
+        fraction = min(share / total_time, 1.0) if total_time else 0.0
+        stack = stack + (_frame_name(func),)
+        micros = int(round(self_time * fraction * 1e6))
+        if micros >= min_us:
+            stacks[';'.join(stack)] += micros
+        if len(stack) >= MAX_STACK_DEPTH or nodes[0] >= MAX_STACK_NODES:
+            return
+        for (child, edge_time) in children.get(func, ()):
+            if child not in path and edge_time * fraction * 1e6 >= min_us:
+                walk(child, edge_time * fraction, stack, path | {child})
+
+    for (func, entry) in entries.items():
+        if not any(caller in entries for caller in entry[4]):
+            walk(func, entry[3], (), frozenset([func]))
+    return stacks
+
+
+class ProfileRecord(object):
+    """ Profile Record.
+
+    The profiles of one test or endpoint, added up.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.memory = 0
+        self.stats = None
+        self.allocations = Counter()
+
+    def add(self, wall, stats=None, memory=0, allocations=None):
+        self.calls += 1
+        self.wall += wall
+        self.memory += memory
+        if stats is not None:
+            if self.stats is None:
+                self.stats = pstats.Stats()
+            self.stats.add(stats)
+        if allocations:
+            self.allocations.update(allocations)
+
+    @property
+    def cpu(self):
+        """ CPU profiled time (in seconds), or None """
+        return self.stats.total_tt if self.stats is not None else None
+
+
+class Profiler(object):
+    """ Profiler.
+
+    Profile tests and client requests; safe across threads.
+    """
+
+    def __init__(self, cpu=True, memory=False, output_dir='profile', top=20, frames=1):
+        """ Init Profiler.
+
+        :param bool cpu: profile with cProfile
+        :param bool memory: trace allocations with tracemalloc
+        :param str output_dir: directory for the profile files
+        :param int top: allocation sites to keep per test
+        :param int frames: tracemalloc frames per allocation
+        """
+
+        self.cpu = cpu
+        self.memory = memory
+        self.output_dir = output_dir
+        self.top = top
+        self.tests = OrderedDict()
+        self.endpoints = OrderedDict()
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._dirty = set()
+        self._tracing = memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start(frames)
+
+    def stop(self):
+        """ Stop tracing allocations, if this profiler started it. """
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def _start(self):
+        """ a new enabled cProfile.Profile, or None """
+        if not self.cpu:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12 and newer: another thread's profile is active.
+            with self._lock:
+                self.skipped += 1
+            return None
+        return profile
+
+    def _add(self, records, kind, key, wall, stats=None, memory=0, allocations=None):
+        with self._lock:
+            record = records.get(key)
+            if record is None:
+                record = records[key] = ProfileRecord()
+            record.add(wall, stats=stats, memory=memory, allocations=allocations)
+            self._dirty.add((kind, key))
+
+    def _allocations(self, before):
+        """ the top allocation sites since a snapshot, as a dict of bytes by "file:line" """
+        # The profiler's own allocations are not the test's; skip them by file name,
+        # which is much cheaper than Snapshot.filter_traces().
+        own_files = set(module.__file__ for module in (cProfile, pstats, tracemalloc))
+        own_files.add(__file__)
+        sites = {}
+        for diff in tracemalloc.take_snapshot().compare_to(before, 'lineno'):
+            if diff.size_diff <= 0 or len(sites) >= self.top:
+                break
+            frame = diff.traceback[0]
+            if frame.filename not in own_files:
+                sites['{}:{}'.format(frame.filename, frame.lineno)] = diff.size_diff
+        return sites
+
+    @contextmanager
+    def profile_test(self, test_id):
+        """ Profile a test, with the client requests it sends from its thread. """
+        before = tracemalloc.take_snapshot() if self.memory else None
+        memory = tracemalloc.get_traced_memory()[0] if self.memory else 0
+        self._local.calls = []
+        self._local.test = profile = self._start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            (self._local.test, calls) = (None, self._local.calls)
+            stats = pstats.Stats(profile) if profile is not None else None
+            for call_stats in calls:
+                if stats is None:
+                    stats = pstats.Stats()
+                stats.add(call_stats)
+            allocations = None
+            if self.memory:
+                memory = tracemalloc.get_traced_memory()[0] - memory
+                allocations = self._allocations(before)
+            self._add(self.tests, 'tests', test_id, wall, stats=stats, memory=memory,
+                      allocations=allocations)
+
+    @contextmanager
+    def profile_call(self, endpoint):
+        """ Profile one client request; it pauses the test's own profile. """
+        outer = getattr(self._local, 'test', None)
+        if outer is not None:
+            outer.disable()
+        memory = tracemalloc.get_traced_memory()[0] if self.memory else 0
+        profile = self._start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            if self.memory:
+                memory = tracemalloc.get_traced_memory()[0] - memory
+            stats = pstats.Stats(profile) if profile is not None else None
+            self._add(self.endpoints, 'endpoints', endpoint, wall, stats=stats, memory=memory)
+            if outer is not None:
+                if stats is not None:
+                    self._local.calls.append(stats)
+                outer.enable()
+
+    def wrap_client(self, client):
+        """ Profile every request of a client, by "METHOD rest_url".
+
+        :param client: a REST API client
+        :returns: the client, with its request() wrapped
+        """
+
+        request = client.request
+
+        def profiled_request(method, rest_url, *args, **kwargs):
+            with self.profile_call('{} {}'.format(method.upper(), rest_url)):
+                return request(method, rest_url, *args, **kwargs)
+
+        client.request = profiled_request
+        return client
+
+    def _path(self, kind, key, suffix):
+        name = re.sub(r'[^\w.-]+', '_', key).strip('_') or 'root'
+        if kind == 'endpoints':
+            name = '{}.{}'.format(name, os.getpid())
+        return os.path.join(self.output_dir, kind, name + suffix)
+
+    def write(self):
+        """ Write the profiles changed since the last write, and the summary.
+
+        :returns: the summary file path
+        """
+
+        with self._lock:
+            (dirty, self._dirty) = (self._dirty, set())
+            for kind in ('tests', 'endpoints'):
+                os.makedirs(os.path.join(self.output_dir, kind), exist_ok=True)
+            for (kind, key) in sorted(dirty):
+                record = getattr(self, kind)[key]
+                if record.stats is None:
+                    continue
+                record.stats.dump_stats(self._path(kind, key, '.prof'))
+                with open(self._path(kind, key, '.collapsed'), 'w') as f:
+                    for (stack, micros) in sorted(collapsed_stacks(record.stats).items()):
+                        f.write('{} {}\n'.format(stack, micros))
+
+            path = os.path.join(self.output_dir, 'summary.{}.txt'.format(os.getpid()))
+            with open(path, 'w') as f:
+                f.write(self.format_summary())
+        return path
+
+    def format_summary(self):
+        """ the per-test and per-endpoint times, memory and top allocation sites """
+        lines = []
+        for (title, records) in (('Tests', self.tests), ('Endpoints', self.endpoints)):
+            lines.append('{}:'.format(title))
+            lines.append('  {:>6} {:>10} {:>10} {:>12}  {}'.format(
+                'calls', 'wall ms', 'cpu ms', 'memory B', 'name'))
+            ranked = sorted(records.items(), key=lambda item: item[1].wall, reverse=True)
+            for (key, record) in ranked:
+                lines.append('  {:>6} {:>10.1f} {:>10} {:>12}  {}'.format(
+                    record.calls, record.wall * 1000.0,
+                    '-' if record.cpu is None else '{:.1f}'.format(record.cpu * 1000.0),
+                    record.memory if self.memory else '-', key))
+            lines.append('')
+
+        if self.memory:
+            lines.append('Top allocation sites:')
+            for (key, record) in self.tests.items():
+                if record.allocations:
+                    lines.append('  {}'.format(key))
+                    for (site, size) in record.allocations.most_common(self.top):
+                        lines.append('    {:>12}  {}'.format(size, site))
+            lines.append('')
+
+        if self.skipped:
+            lines.append('{} profiles skipped: another thread was profiling'.format(
+                self.skipped))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,229 @@
+""" REST API Retry Policy
+
+Retry transient failures, and fail fast once the server is clearly down.
+
+A RetryPolicy on the client retries the idempotent methods on a connection
+error, a timeout or a 502/503/504 answer. Retries back off exponentially with
+full jitter, within a total time budget. Every host has one CircuitBreaker,
+shared by all of its clients: after "failure_threshold" failures in a row, it
+opens and every request raises CircuitOpenError at once, until a trial
+request after "reset_timeout" seconds succeeds again.
+
+Each retry and breaker trip is logged as a warning on this module's logger.
+"""
+
+import logging
+import random
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class CircuitOpenError(ConnectionError):
+    """ The host's circuit breaker is open: the request was not sent. """
+
+
+class CircuitBreaker(object):
+    """ Circuit Breaker.
+
+    Count consecutive failures for one host; safe across threads.
+    States: "closed" (send), "open" (fail fast) and "half-open" (one trial request).
+    """
+
+    def __init__(self, host_url, failure_threshold=5, reset_timeout=30.0,
+                 clock=time.monotonic):
+        """ Init CircuitBreaker.
+
+        :param str host_url: the host's URL base
+        :param int failure_threshold: consecutive failures that open the breaker
+        :param float reset_timeout: seconds open before a trial request
+        :param clock: monotonic time function
+        """
+
+        self.host_url = host_url
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.state = 'closed'
+        self.failures = 0
+        self.trips = 0
+        self._opened = None
+
+    def check(self, full_url):
+        """ Let a request through, or raise CircuitOpenError. """
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if self.state == 'open' and self._clock() - self._opened >= self.reset_timeout:
+                self.state = 'half-open'
+                log.warning('Circuit half-open for %s: sending a trial request', self.host_url)
+                return
+            raise CircuitOpenError('Circuit open for {} after {} failures: {} not sent'.format(
+                self.host_url, self.failures, full_url))
+
+    def record(self, failed):
+        """ Record a request outcome.
+
+        :param bool failed: the request failed (connection error, timeout or 5xx)
+        """
+
+        with self._lock:
+            if not failed:
+                if self.state != 'closed':
+                    log.warning('Circuit closed for %s', self.host_url)
+                self.state = 'closed'
+                self.failures = 0
+                return
+
+            self.failures += 1
+            if self.state == 'half-open' or (
+                    self.state == 'closed' and self.failures >= self.failure_threshold):
+                self.state = 'open'
+                self._opened = self._clock()
+                self.trips += 1
+                log.warning('Circuit open for %s after %d failures: failing fast for %.1fs',
+                            self.host_url, self.failures, self.reset_timeout)
+
+    def reset(self):
+        """ Close the breaker. """
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+
+# Circuit breakers by host URL, shared by all clients.
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(host_url, failure_threshold=5, reset_timeout=30.0):
+    """ Circuit Breaker for a host.
+
+    :param str host_url: the host's URL base
+    :returns: the host's shared CircuitBreaker
+    """
+
+    with _breakers_lock:
+        breaker = _breakers.get(host_url)
+        if breaker is None:
+            breaker = _breakers[host_url] = CircuitBreaker(
+                host_url, failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        return breaker
+
+
+class RetryPolicy(object):
+    """ Retry Policy.
+
+    Declare which requests are retried, how long to wait, and when the
+    host's circuit breaker trips.
+    """
+
+    def __init__(self, max_attempts=3, methods=('DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT'),
+                 statuses=(502, 503, 504), exceptions=(OSError,), backoff=0.1,
+                 backoff_max=5.0, jitter=True, budget=30.0,
+                 failure_threshold=5, reset_timeout=30.0):
+        """ Init RetryPolicy.
+
+        :param int max_attempts: most attempts per request, the first one included
+        :param methods: HTTP methods safe to retry
+        :param statuses: HTTP status codes to retry
+        :param exceptions: exception classes to retry (requests errors are OSError)
+        :param float backoff: first retry delay (in seconds), doubled on each retry
+        :param float backoff_max: longest retry delay (in seconds)
+        :param bool jitter: wait a random time up to the delay ("full jitter")
+        :param float budget: total seconds for a request and its retries
+        :param int failure_threshold: failures in a row that open the host's breaker
+            (0: no circuit breaker)
+        :param float reset_timeout: seconds the breaker stays open
+        """
+
+        self.max_attempts = max_attempts
+        self.methods = frozenset(m.upper() for m in methods)
+        self.statuses = frozenset(statuses)
+        self.exceptions = tuple(exceptions)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.budget = budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    def breaker(self, host_url):
+        """ the host's CircuitBreaker, or None without one """
+        if not self.failure_threshold:
+            return None
+        return circuit_breaker(host_url, failure_threshold=self.failure_threshold,
+                               reset_timeout=self.reset_timeout)
+
+    def is_failure(self, resp=None, error=None):
+        """ the request failed in a way worth retrying """
+        if error is not None:
+            return (isinstance(error, self.exceptions)
+                    and not isinstance(error, CircuitOpenError))
+        return getattr(resp, 'status_code', None) in self.statuses
+
+    def can_retry(self, method, attempt):
+        """ the method may be sent again after "attempt" attempts """
+        return method.upper() in self.methods and attempt < self.max_attempts
+
+    def delay(self, attempt):
+        """ Retry Delay.
+
+        :param int attempt: number of attempts made so far
+        :returns: seconds to wait before the next attempt
+        """
+
+        delay = min(self.backoff * (2 ** (attempt - 1)), self.backoff_max)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def send(self, method, full_url, host_url, send):
+        """ Send a request under the policy.
+
+        :param str method: HTTP method
+        :param full_url: the endpoint URL
+        :param host_url: the client's host URL, for its circuit breaker
+        :param send: callable that sends one attempt and returns the response
+        :returns: an HTTP response
+        """
+
+        breaker = self.breaker(host_url)
+        deadline = time.monotonic() + self.budget
+        attempt = 0
+
+        while True:
+            attempt += 1
+            if breaker is not None:
+                breaker.check(full_url)
+
+            (resp, error) = (None, None)
+            try:
+                resp = send()
+            except BaseException as e:
+                error = e
+
+            failed = self.is_failure(resp=resp, error=error)
+            if breaker is not None:
+                # Any error settles a half-open breaker's trial, retried or not.
+                breaker.record(failed or error is not None)
+            if not failed or not self.can_retry(method, attempt):
+                if error is not None:
+                    raise error
+                return resp
+
+            delay = self.delay(attempt)
+            reason = repr(error) if error is not None else 'status {}'.format(resp.status_code)
+            if time.monotonic() + delay > deadline:
+                log.warning('Retry budget of %.1fs spent on %s %s after %d attempts: %s',
+                            self.budget, method, full_url, attempt, reason)
+                if error is not None:
+                    raise error
+                return resp
+
+            log.warning('Retry %s %s in %.3fs (attempt %d of %d failed: %s)',
+                        method, full_url, delay, attempt, self.max_attempts, reason)
+            if resp is not None and hasattr(resp, 'close'):
+                resp.close()
+            time.sleep(delay)
@@ -0,0 +1,137 @@
+""" REST API Routes
+
+Precompiled URL templates for hot request loops.
+
+A client's "route" binds a URL template such as "/v1/things/{id}" to the
+client once: the host URL and the template's literal text are joined and
+parsed up front, so each request only appends the path parameters.
+Path parameters are percent-encoded unless they are ints or plain names;
+the query string is encoded only when there is one.
+
+Requests on a route are timed and cached under the template, so the
+metrics of "/v1/things/1" and "/v1/things/2" land on one endpoint.
+"""
+
+import logging
+
+from string import Formatter
+from urllib.parse import quote, urlencode
+
+log = logging.getLogger(__name__)
+
+# Route method arguments, so not path parameter names.
+_RESERVED = frozenset(['method', 'query', 'payload', 'payload_dict', 'stream'])
+
+# Characters left as they are in a path parameter (RFC 3986 unreserved).
+_UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~')
+
+
+def _quote_param(value):
+    """ percent-encode a path parameter; ints and plain names are used as they are """
+    if type(value) is int:
+        return str(value)
+    value = str(value)
+    return value if _UNRESERVED.issuperset(value) else quote(value, safe='')
+
+
+class Route(object):
+    """ Route.
+
+    A URL template bound to a client.
+
+    Example:
+        things = client.route('/v1/things/{id}')
+        things.get(id=7)
+        things.put({'name': 'new'}, id=7)
+    """
+
+    __slots__ = ('client', 'template', 'fields', '_prefix', '_literals')
+
+    def __init__(self, client, template):
+        """ Init Route.
+
+        :param client: the REST API client that sends the requests
+        :param str template: a relative URL with "{name}" path parameters
+        :raises ValueError: a path parameter is unnamed, formatted or reserved
+        """
+
+        self.client = client
+        self.template = template
+
+        # The URL is the prefix, then each field's value followed by its literal text.
+        literals = []
+        fields = []
+        for (literal, name, format_spec, conversion) in Formatter().parse(template):
+            literals.append(literal)
+            if name is None:
+                continue
+            if not name.isidentifier() or name in _RESERVED or format_spec or conversion:
+                raise ValueError('Route {} path parameter "{{{}}}" must be a plain, '
+                                 'unreserved name'.format(template, name))
+            fields.append(name)
+        literals.append('')
+
+        self.fields = tuple(fields)
+        self._prefix = client.host_url + literals[0]
+        self._literals = tuple(zip(fields, literals[1:]))
+
+    def url(self, query=None, **params):
+        """ Route URL.
+
+        :param query: query string params as dict
+        :param params: the path parameters by name
+        :returns: endpoint URL
+        """
+
+        full_url = self._prefix
+        try:
+            for (name, literal) in self._literals:
+                full_url += _quote_param(params[name]) + literal
+        except KeyError as e:
+            raise TypeError('Route {} needs path parameter {}'.format(
+                self.template, e.args[0])) from None
+        if query:
+            full_url = full_url + '?' + urlencode(query)
+        return full_url
+
+    # =================================================
+    # REST API: HTTP Methods
+    # =================================================
+
+    def request(self, method, query=None, payload=None, stream=False, **params):
+        """ REST API Request on the route.
+
+        :param str method: HTTP method
+        :param query: query string params as dict
+        :param payload: JSON payload to send
+        :param bool stream: leave the response body unread
+        :param params: the path parameters by name
+        returns: an HTTP response
+        """
+
+        return self.client.request(method, self.template, payload=payload, stream=stream,
+                                   full_url=self.url(query, **params))
+
+    def delete(self, **params):
+        return self.request('DELETE', **params)
+
+    def get(self, query=None, **params):
+        return self.request('GET', query=query, **params)
+
+    def head(self, query=None, **params):
+        return self.request('HEAD', query=query, **params)
+
+    def options(self, **params):
+        return self.request('OPTIONS', **params)
+
+    def patch(self, payload_dict, **params):
+        return self.request('PATCH', payload=payload_dict, **params)
+
+    def post(self, payload_dict, **params):
+        return self.request('POST', payload=payload_dict, **params)
+
+    def put(self, payload_dict, **params):
+        return self.request('PUT', payload=payload_dict, **params)
+
+    def __repr__(self):
+        return '<Route {}>'.format(self.template)
@@ -0,0 +1,490 @@
+""" Parallel REST API Test Runner
+
+Run unittest.TestCase classes concurrently, one class per worker task.
+
+Live REST API suites are I/O-bound, so the TestCase classes run in a
+thread or process pool. Each class runs whole in one worker, so its
+setUpClass() client (and connection pool) is shared by its test methods.
+The classes of a module with setUpModule() or tearDownModule() run
+together in one worker, so module fixtures run once per module.
+The worker results merge into one unittest.TestResult, optionally written
+as JUnit XML, with the wall time per class to help rebalance the suite.
+
+Example:
+    python -m testharness.rest_api.runner -w 8 -s tests --junit-xml junit.xml
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+import unittest
+import uuid
+
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from xml.etree import ElementTree
+
+log = logging.getLogger(__name__)
+
+# One test outcome; "outcome" is success, failure, error, skipped,
+# expected_failure or unexpected_success.
+TestRecord = namedtuple('TestRecord', ['test_id', 'outcome', 'detail', 'elapsed'])
+
+# The outcomes of one TestCase class run by a worker; "phases" is the
+# PhaseTimes of a LiveRestApiTestCase unit, else None.
+ClassReport = namedtuple('ClassReport', ['name', 'tests_run', 'wall_time', 'records', 'phases'])
+ClassReport.__new__.__defaults__ = (None,)
+
+
+class _WorkerResult(unittest.TestResult):
+    """ Worker Result.
+
+    Record every test outcome as plain data, so it can leave the worker.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = OrderedDict()
+        self._started = {}
+
+    def _record(self, test, outcome, detail=''):
+        record = self.records.get(test.id(), [outcome, detail, 0.0])
+        record[0:2] = [outcome, detail]
+        self.records[test.id()] = record
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._started[test.id()] = time.perf_counter()
+        self._record(test, 'success')
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        start = self._started.pop(test.id(), None)
+        if start is not None:
+            self.records[test.id()][2] = time.perf_counter() - start
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record(test, 'error', self.errors[-1][1])
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record(test, 'failure', self.failures[-1][1])
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._record(test, 'skipped', reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._record(test, 'expected_failure', self.expectedFailures[-1][1])
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._record(test, 'unexpected_success')
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            outcome = 'failure' if issubclass(err[0], test.failureException) else 'error'
+            detail = (self.failures if outcome == 'failure' else self.errors)[-1][1]
+            self._record(subtest, outcome, detail)
+
+    def report(self, name, wall_time, phases=None):
+        """ Report the recorded outcomes as a ClassReport. """
+        records = [TestRecord(test_id, *record) for (test_id, record) in self.records.items()]
+        return ClassReport(name, self.testsRun, wall_time, records, phases)
+
+
+class _TestRecordCase(object):
+    """ Test Record Case.
+
+    Stand in for a TestCase in the merged result lists.
+    """
+
+    def __init__(self, record):
+        self.record = record
+
+    def id(self):
+        return self.record.test_id
+
+    def shortDescription(self):
+        return None
+
+    def __str__(self):
+        return self.record.test_id
+
+
+class ParallelTestResult(unittest.TestResult):
+    """ Parallel Test Result.
+
+    The merged unittest.TestResult of all worker ClassReports.
+    """
+
+    _OUTCOME_LISTS = {
+        'error': 'errors',
+        'failure': 'failures',
+        'skipped': 'skipped',
+        'expected_failure': 'expectedFailures',
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.reports = []
+        self.wall_time = 0.0
+
+    def add_report(self, report):
+        """ Merge one worker ClassReport into the result. """
+        self.reports.append(report)
+        self.testsRun += report.tests_run
+
+        for record in report.records:
+            case = _TestRecordCase(record)
+            if record.outcome == 'unexpected_success':
+                self.unexpectedSuccesses.append(case)
+            elif record.outcome in self._OUTCOME_LISTS:
+                getattr(self, self._OUTCOME_LISTS[record.outcome]).append((case, record.detail))
+
+    @property
+    def class_times(self):
+        """ wall time per TestCase class (in seconds), slowest first """
+        times = [(report.name, report.wall_time) for report in self.reports]
+        return OrderedDict(sorted(times, key=lambda item: item[1], reverse=True))
+
+
+# =================================================
+# Workers
+# =================================================
+
+def _load_class(class_name):
+    (module_name, _, attr_name) = class_name.rpartition('.')
+    return getattr(importlib.import_module(module_name), attr_name)
+
+
+def _class_name(test):
+    test_class = type(test)
+    return '.'.join([test_class.__module__, test_class.__qualname__])
+
+
+def _error_report(name):
+    """ a ClassReport of the exception being handled, as the unit's only record """
+    return ClassReport(name, 0, 0.0, [TestRecord(name, 'error', traceback.format_exc(), 0.0)])
+
+
+def _phase_times(tests):
+    """ the summed PhaseTimes of the tests' classes, or None """
+    classes = OrderedDict((type(test), None) for test in tests)
+    phases = [test_class.__dict__.get('phase_times') for test_class in classes]
+    phases = [times for times in phases if times is not None]
+    if not phases:
+        return None
+    return type(phases[0])(*(sum(values) for values in zip(*phases)))
+
+
+def run_tests(name, tests):
+    """ Run Tests.
+
+    Run one work unit's tests in a single suite, so the class (and module)
+    fixtures run once for the unit. A crash in the suite itself becomes
+    an error record for the unit, so one bad unit cannot abort the run.
+
+    :param str name: work unit name, "module.Class" or "module"
+    :param tests: list of TestCase instances
+    :returns: a ClassReport
+    """
+
+    result = _WorkerResult()
+    start = time.perf_counter()
+    try:
+        unittest.TestSuite(tests).run(result)
+    except Exception:
+        result.records[name] = ['error', traceback.format_exc(), 0.0]
+    return result.report(name, time.perf_counter() - start, _phase_times(tests))
+
+
+def run_test_names(name, test_names):
+    """ Run Test Names.
+
+    Rebuild one work unit's tests by name in a worker process and run them.
+
+    :param str name: work unit name, "module.Class" or "module"
+    :param test_names: list of tuples ("module.Class", test method name)
+    :returns: a ClassReport
+    """
+
+    try:
+        tests = [_load_class(class_name)(method_name)
+                 for (class_name, method_name) in test_names]
+    except Exception:
+        return _error_report(name)
+    return run_tests(name, tests)
+
+
+def _rebuildable(test):
+    """ the test can be rebuilt by class and method name in another process """
+    try:
+        return (_load_class(_class_name(test)) is type(test)
+                and hasattr(type(test), test._testMethodName))
+    except Exception:
+        return False
+
+
+# =================================================
+# Runner
+# =================================================
+
+def _iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_tests(test)
+        else:
+            yield test
+
+
+def _has_module_fixtures(test):
+    module = sys.modules.get(type(test).__module__)
+    return (getattr(module, 'setUpModule', None) is not None
+            or getattr(module, 'tearDownModule', None) is not None)
+
+
+def group_test_classes(suite):
+    """ Group Test Classes.
+
+    Group the tests into work units, one per TestCase class. The classes
+    of a module with setUpModule() or tearDownModule() share one unit,
+    so the module fixtures run once and never overlap the module's tests.
+
+    :param suite: a unittest.TestSuite
+    :returns: OrderedDict of unit name ("module.Class" or "module") to list of tests
+    """
+
+    units = OrderedDict()
+    for test in _iter_tests(suite):
+        if _has_module_fixtures(test):
+            name = type(test).__module__
+        else:
+            name = _class_name(test)
+        units.setdefault(name, []).append(test)
+    return units
+
+
+class ParallelTestRunner(object):
+    """ Parallel Test Runner.
+
+    Distribute the TestCase classes of a suite across a worker pool.
+    """
+
+    def __init__(self, workers=4, mode='thread', stream=None, durations=None):
+        """ Init ParallelTestRunner.
+
+        :param int workers: number of worker threads or processes
+        :param str mode: "thread" or "process" worker pool
+        :param stream: text stream for the summary (default: sys.stderr)
+        :param durations: dict of "module.Class" wall times from an earlier
+            run; the slowest classes are scheduled first
+        """
+
+        if mode not in ('thread', 'process'):
+            raise ValueError('Unknown worker mode: {}'.format(mode))
+
+        self.workers = workers
+        self.mode = mode
+        self.stream = stream or sys.stderr
+        self.durations = durations or {}
+
+    def _executor(self):
+        if self.mode == 'process':
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers,
+                                  thread_name_prefix='ParallelTestRunner')
+
+    def _submit(self, executor, local_executor, name, tests):
+        """ Submit one work unit to the executor.
+
+        Processes rebuild the tests by name; units that cannot be rebuilt
+        (e.g. a module that failed to import) run in a parent thread.
+        """
+
+        if self.mode == 'process':
+            if all(_rebuildable(test) for test in tests):
+                test_names = [(_class_name(test), test._testMethodName) for test in tests]
+                return executor.submit(run_test_names, name, test_names)
+            return local_executor.submit(run_tests, name, tests)
+        return executor.submit(run_tests, name, tests)
+
+    def run(self, suite):
+        """ Run the suite.
+
+        :param suite: a unittest.TestSuite
+        :returns: a ParallelTestResult
+        """
+
+        units = group_test_classes(suite)
+        names = sorted(units, key=lambda name: self.durations.get(name, 0.0), reverse=True)
+
+        result = ParallelTestResult()
+        start = time.perf_counter()
+        with self._executor() as executor, ThreadPoolExecutor(max_workers=1) as local_executor:
+            futures = [(name, self._submit(executor, local_executor, name, units[name]))
+                       for name in names]
+            for (name, future) in futures:
+                try:
+                    report = future.result()
+                except Exception:
+                    report = _error_report(name)
+                result.add_report(report)
+        result.wall_time = time.perf_counter() - start
+
+        self.print_summary(result)
+        return result
+
+    def print_summary(self, result):
+        """ Print failures, per-unit wall times and totals to the stream. """
+        write = self.stream.write
+
+        for (flavour, errors) in (('ERROR', result.errors), ('FAIL', result.failures)):
+            for (case, detail) in errors:
+                write('=' * 70 + '\n')
+                write('{}: {}\n'.format(flavour, case))
+                write('-' * 70 + '\n')
+                write('{}\n'.format(detail))
+
+        write('Wall time per class:\n')
+        phases = dict((report.name, report.phases) for report in result.reports)
+        for (name, wall_time) in result.class_times.items():
+            write('  {:9.3f}s  {}\n'.format(wall_time, name))
+            if phases.get(name) is not None:
+                write('             setup {:.3f}s, test {:.3f}s, teardown {:.3f}s\n'.format(
+                    *phases[name]))
+
+        write('-' * 70 + '\n')
+        write('Ran {} test{} in {:.3f}s with {} {} workers\n\n'.format(
+            result.testsRun, '' if result.testsRun == 1 else 's',
+            result.wall_time, self.workers, self.mode))
+
+        if result.wasSuccessful():
+            write('OK\n')
+        else:
+            write('FAILED (failures={}, errors={})\n'.format(
+                len(result.failures), len(result.errors)))
+
+
+def write_junit_xml(result, path):
+    """ Write JUnit XML.
+
+    :param ParallelTestResult result: merged result
+    :param str path: output XML file path
+    """
+
+    root = ElementTree.Element('testsuites', tests=str(result.testsRun),
+                               failures=str(len(result.failures)),
+                               errors=str(len(result.errors)),
+                               time='{:.3f}'.format(result.wall_time))
+
+    for report in result.reports:
+        counts = {'failure': 0, 'error': 0, 'skipped': 0}
+        for record in report.records:
+            if record.outcome in counts:
+                counts[record.outcome] += 1
+
+        testsuite = ElementTree.SubElement(
+            root, 'testsuite', name=report.name, tests=str(len(report.records)),
+            failures=str(counts['failure']), errors=str(counts['error']),
+            skipped=str(counts['skipped']), time='{:.3f}'.format(report.wall_time))
+
+        for record in report.records:
+            (classname, _, name) = record.test_id.partition(' ')[0].rpartition('.')
+            classname = classname or report.name
+            testcase = ElementTree.SubElement(testsuite, 'testcase', classname=classname,
+                                              name=name, time='{:.3f}'.format(record.elapsed))
+            if record.outcome in ('failure', 'error'):
+                element = ElementTree.SubElement(testcase, record.outcome,
+                                                 message=record.detail.strip().split('\n')[-1])
+                element.text = record.detail
+            elif record.outcome == 'skipped':
+                ElementTree.SubElement(testcase, 'skipped', message=record.detail)
+
+    ElementTree.ElementTree(root).write(path, encoding='utf-8', xml_declaration=True)
+
+
+def _load_suite(args):
+    loader = unittest.TestLoader()
+    if args.tests:
+        return loader.loadTestsFromNames(args.tests)
+    return loader.discover(args.start_directory, pattern=args.pattern,
+                           top_level_dir=args.top_level_directory)
+
+
+def main(argv=None):
+    """ Run the parallel test runner command line.
+
+    :param argv: command line arguments (default: sys.argv[1:])
+    :returns: process exit status
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m testharness.rest_api.runner',
+                                     description='Run unittest TestCase classes in parallel.')
+    parser.add_argument('tests', nargs='*', help='test modules, classes or methods')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 4,
+                        help='number of workers')
+    parser.add_argument('-m', '--mode', choices=['thread', 'process'], default='thread',
+                        help='worker pool type (default: thread)')
+    parser.add_argument('-s', '--start-directory', default='.',
+                        help='directory to start discovery (default: .)')
+    parser.add_argument('-p', '--pattern', default='test*.py',
+                        help='pattern to match test files (default: test*.py)')
+    parser.add_argument('-t', '--top-level-directory', default=None,
+                        help='top level directory of the project')
+    parser.add_argument('--junit-xml', default=None, help='write JUnit XML results to a file')
+    parser.add_argument('--durations', default=None,
+                        help='JSON file of class wall times: read to schedule the '
+                             'slowest classes first, then updated')
+    parser.add_argument('--history', default=None,
+                        help='SQLite performance history file to append the run to')
+    parser.add_argument('--profile', default=None, metavar='MODES',
+                        help='profile tests and requests: "cpu", "memory" or "all"')
+    parser.add_argument('--profile-dir', default=None,
+                        help='directory for the profiles (default: profile)')
+    args = parser.parse_args(argv)
+
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    if args.history:
+        # Every worker, thread or process, records into the same run.
+        os.environ['TESTHARNESS_HISTORY'] = args.history
+        os.environ.setdefault('TESTHARNESS_RUN_ID', uuid.uuid4().hex)
+    if args.profile:
+        from .profiling import profile_modes
+        try:
+            profile_modes(args.profile)
+        except ValueError as e:
+            parser.error(str(e))
+        os.environ['TESTHARNESS_PROFILE'] = args.profile
+    if args.profile_dir:
+        os.environ['TESTHARNESS_PROFILE_DIR'] = args.profile_dir
+
+    durations = {}
+    if args.durations and os.path.exists(args.durations):
+        with open(args.durations) as f:
+            durations = json.load(f)
+
+    runner = ParallelTestRunner(workers=args.workers, mode=args.mode, durations=durations)
+    result = runner.run(_load_suite(args))
+
+    if args.junit_xml:
+        write_junit_xml(result, args.junit_xml)
+    if args.durations:
+        durations.update(result.class_times)
+        with open(args.durations, 'w') as f:
+            json.dump(durations, f, indent=2, sort_keys=True)
+
+    return 0 if result.wasSuccessful() else 1
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,547 @@
+""" REST API Schema Validation
+
+Check responses against the service's OpenAPI (or Swagger 2.0) document.
+
+An OpenApiSpec compiles the JSON schema of each operation's response into
+nested closures the first time a response of that operation is checked,
+and caches it. A compiled validator does no schema lookups per value and
+formats no JSON paths unless a value is wrong, so it is cheap enough to
+run on every response, big list payloads included. Streamed responses are
+checked item by item with the schema of the array's items.
+
+The supported JSON schema keywords are the ones OpenAPI documents use:
+type, nullable (and "x-nullable"), enum, properties, required,
+additionalProperties, items, allOf/anyOf/oneOf, $ref, string lengths and
+patterns, numeric bounds and array lengths. Formats are not checked.
+
+Example:
+    spec = client.load_openapi('/v1/swagger.json')
+    spec.validate(client.get('/v1/things'))
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+
+from urllib.parse import unquote, urlsplit
+
+log = logging.getLogger(__name__)
+
+# Python types of the JSON schema types; bool is not a JSON integer or number.
+JSON_TYPES = {
+    'array': (list, tuple),
+    'boolean': (bool,),
+    'integer': (int,),
+    'null': (type(None),),
+    'number': (int, float),
+    'object': (dict,),
+    'string': (str,),
+}
+
+_PATH_PARAM = re.compile(r'\{[^}/]+\}')
+
+
+class SchemaError(AssertionError):
+    """ A value does not match its schema.
+
+    A test that validates a response fails, rather than errors, on it.
+    """
+
+    def __init__(self, reason, parts=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.parts = parts if parts is not None else []
+
+    @property
+    def path(self):
+        """ the JSON path of the wrong value, e.g. "$.items[3].id" """
+        return '$' + ''.join(self.parts)
+
+    def __str__(self):
+        return '{}: {}'.format(self.path, self.reason)
+
+
+def _accept_any(value):
+    pass
+
+
+def _type_name(value):
+    for (name, types) in JSON_TYPES.items():
+        if isinstance(value, types) and not (name in ('integer', 'number')
+                                             and isinstance(value, bool)):
+            return name
+    return type(value).__name__
+
+
+class SchemaCompiler(object):
+    """ Schema Compiler.
+
+    Compile the JSON schemas of one document into validators: callables
+    that take a decoded JSON value and raise SchemaError when it is wrong.
+    Each "$ref" is compiled once, recursive schemas included.
+    """
+
+    def __init__(self, document=None):
+        """ Init SchemaCompiler.
+
+        :param document: the OpenAPI document that "$ref" pointers resolve in
+        """
+
+        self.document = document or {}
+        self._refs = {}
+
+    def resolve(self, ref):
+        """ the schema at a local "$ref" pointer, e.g. "#/definitions/Thing" """
+        if not ref.startswith('#'):
+            raise ValueError('Only local schema references are supported: {}'.format(ref))
+
+        node = self.document
+        for part in ref[1:].split('/')[1:]:
+            part = unquote(part).replace('~1', '/').replace('~0', '~')
+            try:
+                node = node[int(part)] if isinstance(node, list) else node[part]
+            except (KeyError, IndexError, ValueError):
+                raise ValueError('Unknown schema reference: {}'.format(ref))
+        return node
+
+    def compile(self, schema):
+        """ Compile Schema.
+
+        :param dict schema: a JSON schema
+        :returns: a validator callable(value)
+        """
+
+        if not schema:
+            return _accept_any
+        if '$ref' in schema:
+            return self._compile_ref(schema['$ref'])
+
+        checks = []
+        nullable = schema.get('nullable') or schema.get('x-nullable')
+        types = schema.get('type')
+        if types is not None:
+            checks.append(self._compile_type(types, nullable))
+        if 'enum' in schema:
+            checks.append(self._compile_enum(schema['enum'], nullable))
+
+        if types in ('object', None) and ('properties' in schema or 'required' in schema
+                                          or 'additionalProperties' in schema):
+            checks.append(self._compile_object(schema))
+        if types in ('array', None) and ('items' in schema or 'minItems' in schema
+                                         or 'maxItems' in schema):
+            checks.append(self._compile_array(schema))
+        if types in ('string', None) and ('minLength' in schema or 'maxLength' in schema
+                                          or 'pattern' in schema):
+            checks.append(self._compile_string(schema))
+        if any(key in schema for key in ('minimum', 'maximum',
+                                         'exclusiveMinimum', 'exclusiveMaximum')):
+            checks.append(self._compile_bounds(schema))
+
+        for key in ('allOf', 'anyOf', 'oneOf'):
+            if key in schema:
+                checks.append(self._compile_combined(key, schema[key]))
+
+        if not checks:
+            return _accept_any
+        if nullable and types is None:
+            checks = [self._skip_null(check) for check in checks]
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value):
+            for check in checks:
+                check(value)
+        return check_all
+
+    def _compile_ref(self, ref):
+        """ compile a "$ref" once; a recursive reference calls the validator late """
+        check = self._refs.get(ref)
+        if check is not None:
+            return check
+
+        compiled = []
+        self._refs[ref] = lambda value: compiled[0](value)
+        compiled.append(self.compile(self.resolve(ref)))
+        self._refs[ref] = compiled[0]
+        return compiled[0]
+
+    @staticmethod
+    def _skip_null(check):
+        def check_unless_null(value):
+            if value is not None:
+                check(value)
+        return check_unless_null
+
+    @staticmethod
+    def _compile_type(types, nullable):
+        names = [types] if isinstance(types, str) else list(types)
+        if nullable and 'null' not in names:
+            names.append('null')
+        python_types = tuple(t for name in names for t in JSON_TYPES.get(name, ()))
+        allow_bool = 'boolean' in names
+        expected = ' or '.join(names)
+
+        def check_type(value):
+            if not isinstance(value, python_types) or (
+                    not allow_bool and (value is True or value is False)):
+                raise SchemaError('expected {}, not {}'.format(expected, _type_name(value)))
+        return check_type
+
+    @staticmethod
+    def _compile_enum(values, nullable):
+        values = list(values) + ([None] if nullable else [])
+
+        def check_enum(value):
+            if value not in values:
+                raise SchemaError('{!r} is not one of {!r}'.format(value, values))
+        return check_enum
+
+    def _compile_object(self, schema):
+        properties = [(name, '.' + name, self.compile(prop_schema))
+                      for (name, prop_schema) in (schema.get('properties') or {}).items()]
+        properties = [prop for prop in properties if prop[2] is not _accept_any]
+        required = list(schema.get('required') or [])
+        known = frozenset(schema.get('properties') or {})
+
+        check_additional = self._compile_additional(schema.get('additionalProperties', True))
+
+        def check_object(value):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    raise SchemaError('missing required property "{}"'.format(name))
+            for (name, part, check) in properties:
+                if name in value:
+                    try:
+                        check(value[name])
+                    except SchemaError as e:
+                        e.parts.insert(0, part)
+                        raise
+            if check_additional is not None:
+                for name in value:
+                    if name not in known:
+                        check_additional(name, value[name])
+        return check_object
+
+    def _compile_additional(self, additional):
+        """ the check of an object's unknown properties, or None to accept them """
+        if additional is False:
+            def reject_additional(name, value):
+                raise SchemaError('unexpected property "{}"'.format(name))
+            return reject_additional
+        if not isinstance(additional, dict):
+            return None
+
+        check_extra = self.compile(additional)
+        if check_extra is _accept_any:
+            return None
+
+        def check_additional(name, value):
+            try:
+                check_extra(value)
+            except SchemaError as e:
+                e.parts.insert(0, '.' + name)
+                raise
+        return check_additional
+
+    def _compile_array(self, schema):
+        check_item = self.compile(schema.get('items') or {})
+        min_items = schema.get('minItems')
+        max_items = schema.get('maxItems')
+
+        def check_array(value):
+            if not isinstance(value, (list, tuple)):
+                return
+            if min_items is not None and len(value) < min_items:
+                raise SchemaError('{} items, fewer than {}'.format(len(value), min_items))
+            if max_items is not None and len(value) > max_items:
+                raise SchemaError('{} items, more than {}'.format(len(value), max_items))
+            if check_item is _accept_any:
+                return
+            index = 0
+            try:
+                for item in value:
+                    check_item(item)
+                    index += 1
+            except SchemaError as e:
+                e.parts.insert(0, '[{}]'.format(index))
+                raise
+        return check_array
+
+    @staticmethod
+    def _compile_string(schema):
+        min_length = schema.get('minLength')
+        max_length = schema.get('maxLength')
+        pattern = re.compile(schema['pattern']) if 'pattern' in schema else None
+
+        def check_string(value):
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                raise SchemaError('{!r} is shorter than {}'.format(value, min_length))
+            if max_length is not None and len(value) > max_length:
+                raise SchemaError('{!r} is longer than {}'.format(value, max_length))
+            if pattern is not None and not pattern.search(value):
+                raise SchemaError('{!r} does not match {!r}'.format(value, pattern.pattern))
+        return check_string
+
+    @staticmethod
+    def _compile_bounds(schema):
+        # OpenAPI 3.0 and Swagger flag the bound exclusive; JSON schema 2019+ gives the bound.
+        (minimum, maximum) = (schema.get('minimum'), schema.get('maximum'))
+        (exclusive_min, exclusive_max) = (schema.get('exclusiveMinimum'),
+                                          schema.get('exclusiveMaximum'))
+        if exclusive_min is True or exclusive_min is False:
+            (exclusive_min, minimum) = (minimum if exclusive_min else None,
+                                        None if exclusive_min else minimum)
+        if exclusive_max is True or exclusive_max is False:
+            (exclusive_max, maximum) = (maximum if exclusive_max else None,
+                                        None if exclusive_max else maximum)
+
+        def check_bounds(value):
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                return
+            if minimum is not None and value < minimum:
+                raise SchemaError('{} is less than {}'.format(value, minimum))
+            if exclusive_min is not None and value <= exclusive_min:
+                raise SchemaError('{} is not more than {}'.format(value, exclusive_min))
+            if maximum is not None and value > maximum:
+                raise SchemaError('{} is more than {}'.format(value, maximum))
+            if exclusive_max is not None and value >= exclusive_max:
+                raise SchemaError('{} is not less than {}'.format(value, exclusive_max))
+        return check_bounds
+
+    def _compile_combined(self, key, schemas):
+        checks = [self.compile(schema) for schema in schemas]
+
+        def matches(value):
+            for check in checks:
+                try:
+                    check(value)
+                    yield True
+                except SchemaError:
+                    yield False
+
+        if key == 'allOf':
+            def check_all_of(value):
+                for check in checks:
+                    check(value)
+            return check_all_of
+
+        if key == 'anyOf':
+            def check_any_of(value):
+                if not any(matches(value)):
+                    raise SchemaError('matches none of the anyOf schemas')
+            return check_any_of
+
+        def check_one_of(value):
+            count = sum(matches(value))
+            if count != 1:
+                raise SchemaError('matches {} of the oneOf schemas, not 1'.format(count))
+        return check_one_of
+
+
+def _template_regex(template):
+    """ a regex matching the concrete paths of a path template, e.g. "/things/{id}" """
+    parts = _PATH_PARAM.split(template)
+    return re.compile('[^/]+'.join(re.escape(part) for part in parts) + '/?$')
+
+
+class OpenApiSpec(object):
+    """ OpenAPI Spec.
+
+    An OpenAPI 3 or Swagger 2.0 document and its compiled response validators;
+    safe to share across threads and test classes.
+    """
+
+    def __init__(self, document):
+        """ Init OpenApiSpec.
+
+        :param dict document: the decoded OpenAPI or Swagger document
+        """
+
+        self.document = document
+        self.swagger = 'swagger' in document
+        if self.swagger:
+            base_path = document.get('basePath') or ''
+        else:
+            servers = document.get('servers') or [{}]
+            base_path = urlsplit(servers[0].get('url') or '').path
+        self.base_path = base_path.rstrip('/')
+
+        self._compiler = SchemaCompiler(document)
+        self._lock = threading.Lock()
+        self._validators = {}
+
+        # Literal paths match before templates, then the templates with more literal text.
+        templates = sorted(document.get('paths') or {}, key=lambda template: (
+            '{' in template, -len(_PATH_PARAM.sub('', template))))
+        self._paths = [(_template_regex(template), template) for template in templates]
+
+    @classmethod
+    def from_file(cls, path):
+        """ OpenApiSpec from a JSON (or YAML, with PyYAML installed) file. """
+        with open(path, 'rb') as f:
+            content = f.read()
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            return cls(yaml.safe_load(content))
+        return cls(json.loads(content.decode('utf8')))
+
+    def resolve(self, ref):
+        """ the document's node at a local "$ref" pointer """
+        return self._compiler.resolve(ref)
+
+    def match(self, method, url):
+        """ Match Operation.
+
+        :param str method: HTTP method
+        :param str url: the request URL or path
+        :returns: tuple (path template, operation dict)
+        :raises LookupError: the document has no such operation
+        """
+
+        path = urlsplit(url).path
+        if self.base_path and path.startswith(self.base_path):
+            path = path[len(self.base_path):] or '/'
+
+        for (regex, template) in self._paths:
+            if regex.match(path):
+                operation = self.document['paths'][template].get(method.lower())
+                if operation is not None:
+                    return (template, operation)
+        raise LookupError('No OpenAPI operation for {} {}'.format(method.upper(), path))
+
+    def _response_schema(self, operation, status_code):
+        """ the operation's response schema for the status code, or None """
+        responses = operation.get('responses') or {}
+        for key in (str(status_code), '{}XX'.format(str(status_code)[0]), 'default'):
+            if key in responses:
+                response = responses[key]
+                if '$ref' in response:
+                    response = self.resolve(response['$ref'])
+                break
+        else:
+            raise LookupError('No OpenAPI response {} documented'.format(status_code))
+
+        if self.swagger:
+            return response.get('schema')
+        content = response.get('content') or {}
+        for (media_type, media) in content.items():
+            if 'json' in media_type:
+                return media.get('schema')
+        return None
+
+    def validator(self, method, url, status_code=200, items=False):
+        """ Validator.
+
+        Compile the response schema on first use, then reuse it.
+
+        :param str method: HTTP method
+        :param str url: the request URL or path
+        :param int status_code: the response status code
+        :param bool items: validate the items of the array body instead (streaming)
+        :returns: a validator callable(value) that raises SchemaError
+        :raises LookupError: the document has no such operation or response
+        """
+
+        (template, operation) = self.match(method, url)
+        key = (method.upper(), template, status_code, items)
+        check = self._validators.get(key)
+        if check is not None:
+            return check
+
+        try:
+            schema = self._response_schema(operation, status_code)
+        except LookupError as e:
+            raise LookupError('{} for {} {}'.format(e, method.upper(), template))
+        if items:
+            if schema is not None and '$ref' in schema:
+                schema = self.resolve(schema['$ref'])
+            schema = (schema or {}).get('items')
+
+        with self._lock:
+            check = self._validators.get(key)
+            if check is None:
+                check = self._validators[key] = self._compiler.compile(schema or {})
+                log.debug('OpenAPI validator compiled for %s %s %s', method, template,
+                          status_code)
+        return check
+
+    def validate(self, resp, loads=json.loads):
+        """ Validate Response.
+
+        :param resp: an HTTP response from a client (it has a "timing")
+        :param loads: the JSON decoder of the response body
+        :raises LookupError: the document has no such operation or response
+        :raises SchemaError: the body does not match the schema
+        """
+
+        (method, url) = request_of(resp)
+        check = self.validator(method, url, resp.status_code)
+        if check is _accept_any:
+            return
+        content = resp.content if hasattr(resp, 'content') else resp.data
+        check(loads(content) if content else None)
+
+
+def request_of(resp):
+    """ Request of a response.
+
+    :param resp: an HTTP response (or StreamedResponse) from a client
+    :returns: tuple (method, URL) of its request
+    """
+
+    timing = getattr(resp, 'timing', None)
+    if timing is not None:
+        return (timing.method, timing.url)
+    request = getattr(resp, 'request', None)
+    if request is not None:
+        return (request.method, getattr(request, 'url', None) or request.path)
+    raise LookupError('Response has no request to match: {!r}'.format(resp))
+
+
+# Shared specs by (host URL, source), so every client and test class loads a spec once.
+_specs = {}
+_specs_lock = threading.Lock()
+
+
+def is_spec_url(source):
+    """ whether a spec source is a rest_url on the host, rather than a file path """
+    return isinstance(source, str) and source.startswith('/') and not os.path.isfile(source)
+
+
+def load_spec(source, client=None):
+    """ Load OpenAPI Spec.
+
+    :param source: an OpenApiSpec, a document dict, a file path, or the
+        spec's rest_url on the client's host (e.g. "/v1/swagger.json");
+        an absolute path to an existing file is a file path
+    :param client: the REST API client serving a rest_url source
+    :returns: an OpenApiSpec
+    """
+
+    if isinstance(source, OpenApiSpec):
+        return source
+    if isinstance(source, dict):
+        return OpenApiSpec(source)
+
+    key = (client.host_url if client is not None and is_spec_url(source) else None, source)
+    with _specs_lock:
+        spec = _specs.get(key)
+        if spec is None:
+            if key[0] is None:
+                spec = OpenApiSpec.from_file(source)
+            else:
+                # Fetch it off the books: the spec is not an endpoint under test.
+                resp = client._send('GET', client.host_url + source,
+                                    client._add_rest_headers({}))
+                if resp.status_code != 200:
+                    raise LookupError('OpenAPI spec {} answered {}'.format(
+                        source, resp.status_code))
+                spec = OpenApiSpec(client.json(resp))
+            _specs[key] = spec
+    return spec
@@ -0,0 +1,168 @@
+""" REST API Streaming Responses
+
+Read large GET responses chunk by chunk, so memory stays flat.
+
+A client's "get_stream" returns a StreamedResponse. Its body is read only
+as the test iterates over it: raw byte chunks with "iter_chunks", or the
+items of a top-level JSON array with "iter_items". The JSON array items are
+parsed as their bytes arrive, and each parsed item's text is dropped, so a
+200 MB array costs no more memory than its largest item.
+"""
+
+import codecs
+import json
+import logging
+
+log = logging.getLogger(__name__)
+
+# Bytes read from the socket per chunk.
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+class StreamError(ValueError):
+    """ The streamed body is not a well-formed JSON array. """
+
+
+def iter_json_array(chunks, encoding='utf-8'):
+    """ Iterate JSON Array Items.
+
+    Parse the items of a top-level JSON array incrementally.
+
+    :param chunks: iterable of bytes (or str) chunks of the array text
+    :param str encoding: text encoding of byte chunks
+    :returns: generator of the parsed items, in order
+    :raises StreamError: when the body is not a JSON array
+    """
+
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ''
+    pos = 0
+    started = False
+    finished = False
+    expect_item = True
+    count = 0
+    chunks = iter(chunks)
+    eof = False
+
+    while not finished:
+        # Skip whitespace and delimiters, then parse as many items as the buffer holds.
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos == len(buffer):
+                break
+
+            if not started:
+                if buffer[pos] != '[':
+                    raise StreamError('Stream is not a JSON array: {!r}'.format(
+                        buffer[pos:][:20]))
+                started = True
+                pos += 1
+            elif buffer[pos] == ']' and not (expect_item and count):
+                finished = True
+                pos += 1
+                break
+            elif not expect_item:
+                if buffer[pos] != ',':
+                    raise StreamError('Expected "," in JSON array: {!r}'.format(
+                        buffer[pos:][:20]))
+                expect_item = True
+                pos += 1
+            else:
+                try:
+                    (item, end) = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    break  # partial item: read more
+                if (isinstance(item, (int, float)) and not eof
+                        and (end == len(buffer) or buffer[end] in _NUMBER_CHARS)):
+                    break  # the number may continue in the next chunk
+                yield item
+                count += 1
+                pos = end
+                expect_item = False
+
+        if finished:
+            break
+        if eof:
+            raise StreamError('JSON array stream ended early: {!r}'.format(buffer[pos:][:20]))
+
+        # Drop the parsed text before reading more.
+        buffer = buffer[pos:]
+        pos = 0
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            eof = True
+            buffer += text_decoder.decode(b'', final=True)
+            continue
+        buffer += text_decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+    if buffer[pos:].strip():
+        raise StreamError('Extra data after JSON array: {!r}'.format(buffer[pos:][:20]))
+
+
+class StreamedResponse(object):
+    """ Streamed Response.
+
+    An HTTP response whose body is read on demand; close it when done,
+    or use it as a context manager.
+    """
+
+    def __init__(self, response, chunks, close=None):
+        """ Init StreamedResponse.
+
+        :param response: the client's HTTP response with unread body
+        :param chunks: iterable of the body's bytes chunks
+        :param close: callable to release the connection
+        """
+
+        self.response = response
+        self._chunks = chunks
+        self._close = close
+        self.bytes_read = 0
+
+    @property
+    def status_code(self):
+        return self.response.status_code
+
+    @property
+    def headers(self):
+        return self.response.headers
+
+    @property
+    def timing(self):
+        """ RequestTiming up to the response headers """
+        return getattr(self.response, 'timing', None)
+
+    def iter_chunks(self):
+        """ Iterate the body's bytes chunks. """
+        for chunk in self._chunks:
+            if chunk:
+                self.bytes_read += len(chunk)
+                yield chunk
+
+    def iter_items(self):
+        """ Iterate the items of the body's top-level JSON array. """
+        return iter_json_array(self.iter_chunks())
+
+    def close(self):
+        """ Release the connection, unread body and all. """
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return self.iter_items()
+
+    def __repr__(self):
+        return '<StreamedResponse [{}]>'.format(self.status_code)
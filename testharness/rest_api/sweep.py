@@ -0,0 +1,270 @@
+""" REST API Endpoint Sweep
+
+Generate test cases for every operation of an OpenAPI (or Swagger) document.
+
+A sweep is a whole-API smoke and latency pass: one test method per route
+and method, which sends the request and checks that the status code is
+documented, the body matches its schema and, optionally, the response is
+fast enough. The methods are split into "shards" TestCase classes by a
+stable hash, so the parallel runner sends the shards concurrently, and a
+shard keeps its methods from run to run for the durations file.
+
+Only the safe methods are swept by default. Path parameters take their
+values from "params", else the document's example, default or first enum
+value; an operation with a missing value is generated as a skipped test.
+
+Example (tests/test_sweep.py):
+    from testharness.rest_api.sweep import sweep_test_cases
+    from tests.test_api import ThingsTests
+
+    globals().update(sweep_test_cases('/v1/swagger.json', base=ThingsTests, shards=8,
+                                      params={'id': 7}, max_ms=500))
+
+    python -m testharness.rest_api.runner -w 8 tests.test_sweep
+"""
+
+import logging
+import re
+import sys
+import zlib
+
+from collections import OrderedDict, namedtuple
+from urllib.parse import quote, urlencode
+
+from .schema import is_spec_url, load_spec
+
+log = logging.getLogger(__name__)
+
+# Methods swept unless told otherwise: they do not change the service.
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch')
+
+# One operation to sweep.
+#   template: the rest_url path template with the base path, e.g. "/v1/things/{id}"
+#   rest_url: the concrete rest_url, or None when skipped
+#   statuses: the documented status codes ("200", "2XX" or "default")
+#   skip: the reason the operation cannot be sent, else None
+SweepOperation = namedtuple('SweepOperation', [
+    'method', 'template', 'rest_url', 'query', 'payload', 'statuses', 'skip'])
+
+_PATH_PARAM = re.compile(r'\{([^}/]+)\}')
+
+
+def _sample(parameter, spec):
+    """ a parameter's example, default or first enum value, else None """
+    schema = parameter.get('schema') or parameter
+    if '$ref' in schema:
+        schema = spec.resolve(schema['$ref'])
+    for source in (parameter, schema):
+        for key in ('example', 'default', 'x-example'):
+            if source.get(key) is not None:
+                return source[key]
+        if source.get('enum'):
+            return source['enum'][0]
+    return None
+
+
+def _parameters(path_item, operation, spec):
+    """ the parameters of an operation, by (location, name), path level first """
+    parameters = OrderedDict()
+    for parameter in list(path_item.get('parameters') or []) + list(
+            operation.get('parameters') or []):
+        if '$ref' in parameter:
+            parameter = spec.resolve(parameter['$ref'])
+        parameters[(parameter.get('in'), parameter.get('name'))] = parameter
+    return parameters
+
+
+def _request_payload(parameters, operation, spec):
+    """ the operation's example request body, or None """
+    for parameter in parameters.values():
+        if parameter.get('in') == 'body':
+            return _sample(parameter, spec)
+    content = (operation.get('requestBody') or {}).get('content') or {}
+    for (media_type, media) in content.items():
+        if 'json' in media_type:
+            return _sample(media, spec)
+    return None
+
+
+def sweep_operations(spec, methods=SAFE_METHODS, params=None, include=None, exclude=None):
+    """ Sweep Operations.
+
+    :param spec: an OpenApiSpec
+    :param methods: the HTTP methods to sweep
+    :param params: dict of values by parameter name, for path (and required query) parameters
+    :param include: regex of "METHOD template" to sweep (default: all)
+    :param exclude: regex of "METHOD template" to leave out
+    :returns: list of SweepOperation, in document order
+    """
+
+    methods = [method.upper() for method in methods]
+    params = params or {}
+    include = re.compile(include) if include else None
+    exclude = re.compile(exclude) if exclude else None
+
+    found = []
+    for (path, path_item) in (spec.document.get('paths') or {}).items():
+        for method in HTTP_METHODS:
+            operation = path_item.get(method)
+            if operation is None or method.upper() not in methods:
+                continue
+
+            template = spec.base_path + path
+            name = '{} {}'.format(method.upper(), template)
+            if (include and not include.search(name)) or (exclude and exclude.search(name)):
+                continue
+
+            parameters = _parameters(path_item, operation, spec)
+            (values, query, skip) = ({}, {}, None)
+            for ((location, param_name), parameter) in parameters.items():
+                value = params.get(param_name)
+                if value is None:
+                    value = _sample(parameter, spec)
+                if location == 'path':
+                    if value is None:
+                        skip = 'No value for path parameter "{}"'.format(param_name)
+                    values[param_name] = value
+                elif location == 'query' and value is not None and (
+                        parameter.get('required') or param_name in params):
+                    query[param_name] = value
+
+            payload = None
+            if method.upper() in ('PATCH', 'POST', 'PUT'):
+                payload = _request_payload(parameters, operation, spec)
+                if payload is None and skip is None:
+                    skip = 'No example request body'
+
+            rest_url = None
+            if skip is None:
+                rest_url = _PATH_PARAM.sub(
+                    lambda m: quote(str(values.get(m.group(1), '')), safe=''), template)
+            statuses = tuple(str(status) for status in operation.get('responses') or {})
+            found.append(SweepOperation(method.upper(), template, rest_url, query, payload,
+                                        statuses, skip))
+    return found
+
+
+def _status_documented(status_code, statuses):
+    """ the status code is one of the documented responses """
+    if not statuses:
+        return True
+    status = str(status_code)
+    return (status in statuses or '{}XX'.format(status[0]) in statuses
+            or ('default' in statuses and status_code < 500))
+
+
+def _test_name(operation, taken):
+    slug = re.sub(r'\W+', '_', operation.template).strip('_').lower() or 'root'
+    name = 'test_{}_{}'.format(operation.method.lower(), slug)
+    (unique, n) = (name, 2)
+    while unique in taken:
+        (unique, n) = ('{}_{}'.format(name, n), n + 1)
+    taken.add(unique)
+    return unique
+
+
+def make_sweep_test(operation, validate_schema=True, max_ms=None):
+    """ Make Sweep Test.
+
+    :param operation: a SweepOperation
+    :param bool validate_schema: check the body against the documented schema
+    :param float max_ms: latency limit per request (in milliseconds), if any
+    :returns: a test method
+    """
+
+    def test(self):
+        if operation.skip:
+            self.skipTest(operation.skip)
+
+        full_url = self.client.host_url + operation.rest_url
+        if operation.query:
+            full_url += '?' + urlencode(operation.query)
+        resp = self.client.request(operation.method, operation.template,
+                                   payload=operation.payload, full_url=full_url)
+
+        if not _status_documented(resp.status_code, operation.statuses):
+            self.fail('{} {} answered {}, not one of the documented {}'.format(
+                operation.method, operation.rest_url, resp.status_code,
+                ', '.join(operation.statuses)))
+        has_body = operation.method not in ('HEAD', 'OPTIONS')
+        if validate_schema and has_body and getattr(self.client, 'openapi', None) is not None:
+            self.assertMatchesSchema(resp)
+        if max_ms is not None:
+            self.assertResponseFasterThan(resp, max_ms)
+
+    test.__doc__ = '{} {}'.format(operation.method, operation.template)
+    return test
+
+
+def sweep_test_cases(spec, base=None, shards=4, name='Sweep', module=None,
+                     methods=SAFE_METHODS, params=None, include=None, exclude=None,
+                     validate_schema=True, max_ms=None, **attributes):
+    """ Sweep Test Cases.
+
+    Put the classes in the test module's globals, so unittest discovery and
+    the runner's process workers find them by name.
+
+    :param spec: an OpenApiSpec, a document dict, a file path, or the
+        spec's rest_url on the base class's HOST
+    :param base: the TestCase class to subclass (default: LiveRestApiTestCase)
+    :param int shards: number of TestCase classes to split the operations into
+    :param str name: class name prefix, e.g. "Sweep" makes "SweepShard0", "SweepShard1", ..
+    :param str module: the classes' module name (default: the caller's module)
+    :param methods: the HTTP methods to sweep
+    :param params: dict of values by parameter name
+    :param include: regex of "METHOD template" to sweep (default: all)
+    :param exclude: regex of "METHOD template" to leave out
+    :param bool validate_schema: check each body against the documented schema
+    :param float max_ms: latency limit per request (in milliseconds), if any
+    :param attributes: more class attributes (HOST, PORT, THROTTLE, ..etc.)
+    :returns: OrderedDict of TestCase classes by name
+    """
+
+    if base is None:
+        from .testcases import LiveRestApiTestCase as base
+    if module is None:
+        module = sys._getframe(1).f_globals.get('__name__', __name__)
+    if is_spec_url(spec):
+        spec = _fetch_spec(spec, base, attributes)
+    spec = load_spec(spec)
+
+    operations = sweep_operations(spec, methods=methods, params=params,
+                                  include=include, exclude=exclude)
+    shard_methods = [OrderedDict() for n in range(max(shards, 1))]
+    taken = set()
+    for operation in operations:
+        key = '{} {}'.format(operation.method, operation.template).encode('utf8')
+        shard = shard_methods[zlib.crc32(key) % len(shard_methods)]
+        shard[_test_name(operation, taken)] = make_sweep_test(
+            operation, validate_schema=validate_schema, max_ms=max_ms)
+
+    classes = OrderedDict()
+    for (index, test_methods) in enumerate(shard_methods):
+        if not test_methods:
+            continue
+        class_name = '{}Shard{}'.format(name, index)
+        namespace = dict(attributes, __module__=module, __qualname__=class_name,
+                         **test_methods)
+        if validate_schema and getattr(base, 'OPENAPI_SPEC', None) is None:
+            namespace['OPENAPI_SPEC'] = spec
+        classes[class_name] = type(class_name, (base,), namespace)
+
+    log.debug('Sweep %s: %d operations in %d classes', name, len(operations), len(classes))
+    return classes
+
+
+def _fetch_spec(rest_url, base, attributes):
+    """ load a spec rest_url from the base test case's host, with a short-lived client """
+    from .clients.live import RestApiClient
+
+    settings = dict((key, getattr(base, key, None)) for key in ('HOST', 'PORT', 'SCHEME'))
+    settings.update((key, attributes[key]) for key in settings if key in attributes)
+    wsgi_app = base._wsgi_app() if hasattr(base, '_wsgi_app') else None
+    client = RestApiClient(settings['HOST'], port=settings['PORT'] or 80,
+                           scheme=settings['SCHEME'] or 'http', wsgi_app=wsgi_app)
+    try:
+        return client.load_openapi(rest_url)
+    finally:
+        client.close()
@@ -1,17 +1,163 @@
 """ REST API Test Harness for Python unittest
 
 Use these unittest.TestCase subclasses to run REST API tests.
+
+Importing this module is cheap: each test case class imports its client
+backend (and so "requests") in setUpClass, and AsyncLiveRestApiTestCase
+(and so asyncio) loads on first use. Test discovery in many short-lived
+worker processes pays only for the backends its tests run.
 """
 
 import logging
+import os
+import time
 import unittest
 
-from .clients.live import RestApiClient
+from collections import OrderedDict
+
+from .cache import ResponseCache
+from .fixtures import FixtureRegistry, PhaseTimes
+from .schema import SchemaError, request_of
 
 log = logging.getLogger(__name__)
 
 
-class LiveRestApiTestCase(unittest.TestCase):
+def __getattr__(name):
+    if name == 'AsyncLiveRestApiTestCase':
+        from .async_testcases import AsyncLiveRestApiTestCase
+        return AsyncLiveRestApiTestCase
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+class RestApiAssertionsMixin(object):
+    """ REST API Assertions.
+
+    Assertion helpers for REST API test cases with a "client" attribute.
+    """
+
+    def assertResponseFasterThan(self, resp, ms, msg=None):
+        """ Assert the response arrived in under "ms" milliseconds. """
+        timing = getattr(resp, 'timing', None)
+        if timing is None:
+            self.fail(self._formatMessage(msg, 'Response has no timing: {!r}'.format(resp)))
+
+        elapsed = timing.total * 1000.0
+        if elapsed >= ms:
+            standardMsg = '{} {} took {:.1f} ms, not faster than {} ms'.format(
+                timing.method, timing.url, elapsed, ms)
+            self.fail(self._formatMessage(msg, standardMsg))
+
+    def assertP95Below(self, endpoint, ms, msg=None):
+        """ Assert the endpoint's 95th percentile latency is below "ms" milliseconds.
+
+        :param str endpoint: "METHOD rest_url" or just "rest_url" for all methods
+        :param float ms: latency limit (in milliseconds)
+        """
+
+        histogram = self.client.metrics.histogram(endpoint)
+        if not histogram.count:
+            self.fail(self._formatMessage(msg, 'No requests recorded for {}'.format(endpoint)))
+
+        p95 = histogram.percentile(95)
+        if p95 >= ms:
+            standardMsg = '{} p95 latency is {:.1f} ms over {} requests, not below {} ms'
+            standardMsg = standardMsg.format(endpoint, p95, histogram.count, ms)
+            self.fail(self._formatMessage(msg, standardMsg))
+
+    def assertCompressed(self, resp, encoding=None, msg=None):
+        """ Assert the server compressed the response body.
+
+        :param resp: an HTTP response from the client
+        :param str encoding: the expected Content-Encoding (default: any)
+        :returns: fraction of the body's bytes kept off the wire
+        """
+
+        content_encoding = (resp.headers.get('Content-Encoding') or 'identity').lower()
+        if content_encoding == 'identity' or encoding not in (None, content_encoding):
+            standardMsg = 'Response body is {}, not {}'.format(
+                content_encoding, encoding or 'compressed')
+            self.fail(self._formatMessage(msg, standardMsg))
+
+        timing = getattr(resp, 'timing', None)
+        if timing is None or not timing.response_bytes:
+            return None
+        wire = timing.response_wire_bytes
+        if wire is None or wire >= timing.response_bytes:
+            standardMsg = '{} {} body is {} bytes on the wire for {} decoded bytes'.format(
+                timing.method, timing.url, wire, timing.response_bytes)
+            self.fail(self._formatMessage(msg, standardMsg))
+        return 1.0 - wire / float(timing.response_bytes)
+
+    def assertMatchesSchema(self, resp, msg=None):
+        """ Assert the response body matches its OpenAPI response schema.
+
+        :param resp: an HTTP response from the client, whose "client.openapi" is loaded
+        """
+
+        spec = getattr(self.client, 'openapi', None)
+        if spec is None:
+            self.fail(self._formatMessage(msg, 'Client has no OpenAPI spec: set OPENAPI_SPEC'))
+
+        try:
+            spec.validate(resp, loads=self.client.codec.loads)
+        except (LookupError, SchemaError) as e:
+            (method, url) = request_of(resp)
+            standardMsg = '{} {} {} does not match the schema: {}'.format(
+                method, url, resp.status_code, e)
+            self.fail(self._formatMessage(msg, standardMsg))
+
+    def assertStreamMatchesSchema(self, stream, count=None, msg=None):
+        """ Assert each item of a streamed JSON array matches the OpenAPI items schema.
+
+        :param stream: a StreamedResponse from the client's "get_stream"
+        :param int count: expected number of items (default: any)
+        :returns: number of items
+        """
+
+        spec = getattr(self.client, 'openapi', None)
+        if spec is None:
+            self.fail(self._formatMessage(msg, 'Client has no OpenAPI spec: set OPENAPI_SPEC'))
+
+        (method, url) = request_of(stream)
+        try:
+            check = spec.validator(method, url, stream.status_code, items=True)
+        except LookupError as e:
+            stream.close()
+            self.fail(self._formatMessage(msg, str(e)))
+        return self.assertStreamItems(stream, check, count=count, msg=msg)
+
+    def assertStreamItems(self, stream, check=None, count=None, msg=None):
+        """ Assert each item of a streamed JSON array as it arrives.
+
+        Memory stays flat: every item is checked, then dropped. The stream is closed.
+
+        :param stream: a StreamedResponse from the client's "get_stream"
+        :param check: callable(item) that raises AssertionError or returns False on a bad item
+        :param int count: expected number of items (default: any)
+        :returns: number of items
+        """
+
+        seen = 0
+        with stream:
+            for item in stream.iter_items():
+                if check is not None:
+                    try:
+                        ok = check(item)
+                    except AssertionError as e:
+                        standardMsg = 'Stream item {} failed: {}'.format(seen, e)
+                        self.fail(self._formatMessage(msg, standardMsg))
+                    if ok is False:
+                        standardMsg = 'Stream item {} failed the check: {!r}'.format(seen, item)
+                        self.fail(self._formatMessage(msg, standardMsg))
+                seen += 1
+
+        if count is not None and seen != count:
+            standardMsg = 'Stream has {} items, not {}'.format(seen, count)
+            self.fail(self._formatMessage(msg, standardMsg))
+        return seen
+
+
+class LiveRestApiTestCase(RestApiAssertionsMixin, unittest.TestCase):
     """ Live REST API Test Case.
 
     This Test Case provides a QA or Regression testing plan.
@@ -19,6 +165,50 @@ class LiveRestApiTestCase(unittest.TestCase):
     The REST API service is deployed to a known "hostname" already.
     Each test case method should send an HTTP request to a server endpoint
     to validate its health.
+
+    All test methods in the class share one client and its keep-alive
+    connection pool.
+
+    Set METRICS_SINK to a MetricsSink to ship the client's request timings
+    elsewhere; by default each class's client keeps in-memory histograms.
+
+    Set RETRY_POLICY to a RetryPolicy to retry transient failures and
+    fail fast once the host is down; retries are logged as warnings.
+
+    Set THROTTLE to a Throttle to keep the tests within the host's rate
+    limits; one Throttle shared by several classes shares its limits.
+
+    Set COMPRESSION to a Compression to compress request bodies and pick
+    the response encodings; each timing counts wire and decoded bytes.
+
+    Set OPENAPI_SPEC to the service's OpenAPI (or Swagger) document: its
+    rest_url on the HOST, a file path or a dict. assertMatchesSchema then
+    checks a response against its operation's response schema.
+
+    Set RESPONSE_CACHE_SIZE to reuse GET responses across the class's tests,
+    for RESPONSE_CACHE_TTL seconds before revalidation.
+
+    Set CASSETTE to a file path to record the live responses and replay
+    them offline. The TESTHARNESS_CASSETTE_MODE environment variable (else
+    CASSETTE_MODE) picks "record", "replay" (the default) or "live".
+
+    Set WSGI_APP to a WSGI application, or its "package.module:attribute"
+    import path, to run the live client against the app in-process with no
+    sockets. The TESTHARNESS_WSGI_APP environment variable overrides it;
+    set it to "none" to test the deployed HOST instead.
+
+    Set FIXTURES to a dict of Fixture by name to create the test data once
+    for the class, as self.fixtures, and delete it all in tearDownClass.
+    The wall time spent in setup, tests and teardown is logged and kept
+    as the class's phase_times.
+
+    Set HISTORY to a SQLite file path to append the client's endpoint
+    histograms to the performance history, keyed by run, host and git SHA.
+    The TESTHARNESS_HISTORY environment variable overrides it.
+
+    Set the TESTHARNESS_PROFILE environment variable to "cpu", "memory"
+    or "all" to profile each test method and client request; the profiles
+    are written to TESTHARNESS_PROFILE_DIR in tearDownClass.
     """
 
     # Change these constants in the subclass to the real server.
@@ -26,7 +216,257 @@ class LiveRestApiTestCase(unittest.TestCase):
     HOST = 'example.com'
     PORT = 80
 
+    # Connection pool settings for the shared client.
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 10
+    MAX_RETRIES = 0
+    POOL_BLOCK = False
+
+    # Request timings sink for the shared client (default: in-memory histograms).
+    METRICS_SINK = None
+
+    # RetryPolicy for transient failures (default: no retries).
+    RETRY_POLICY = None
+
+    # Throttle of request rate and concurrency (default: no limits).
+    THROTTLE = None
+
+    # Compression of request bodies and Accept-Encoding (default: uncompressed requests).
+    COMPRESSION = None
+
+    # OpenAPI document for assertMatchesSchema: rest_url, file path or dict (default: none).
+    OPENAPI_SPEC = None
+
+    # JSON codec name or JsonCodec (default: orjson when installed, else json).
+    JSON_CODEC = None
+
+    # GET response cache shared by the class's tests (0 entries: no caching).
+    RESPONSE_CACHE_SIZE = 0
+    RESPONSE_CACHE_TTL = 60.0
+
+    # Record & replay cassette file path.
+    CASSETTE = None
+    CASSETTE_MODE = None
+
+    # In-process WSGI application for the client (default: the live HOST).
+    WSGI_APP = None
+
+    # Fixture objects created once for the class, by name (default: none).
+    FIXTURES = None
+
+    # Performance history SQLite file path (default: none).
+    HISTORY = None
+
+    fixtures = None
+    phase_times = None
+    _setup_time = 0.0
+    _test_time = 0.0
+    _profiler = None
+
     @classmethod
     def setUpClass(cls):
-        """ prepare HTTP client """
-        cls.client = RestApiClient(cls.HOST, port=cls.PORT, scheme=cls.SCHEME)
+        """ prepare HTTP client and fixtures """
+        from .clients.cassette import RecordingRestApiClient, ReplayRestApiClient
+        from .clients.live import RestApiClient
+
+        start = time.perf_counter()
+        (cls.phase_times, cls._test_time) = (None, 0.0)
+
+        pool_options = dict(
+            port=cls.PORT, scheme=cls.SCHEME,
+            pool_connections=cls.POOL_CONNECTIONS,
+            pool_maxsize=cls.POOL_MAXSIZE,
+            max_retries=cls.MAX_RETRIES,
+            pool_block=cls.POOL_BLOCK,
+            metrics=cls.METRICS_SINK,
+            cache=cls._response_cache(),
+            retry=cls.RETRY_POLICY,
+            codec=cls.JSON_CODEC,
+            wsgi_app=cls._wsgi_app(),
+            throttle=cls.THROTTLE,
+            compression=cls.COMPRESSION)
+
+        cassette_mode = (os.environ.get('TESTHARNESS_CASSETTE_MODE')
+                         or cls.CASSETTE_MODE or 'replay')
+        if cls.CASSETTE is None or cassette_mode == 'live':
+            cls.client = RestApiClient(cls.HOST, **pool_options)
+        elif cassette_mode == 'record':
+            cls.client = RecordingRestApiClient(cls.HOST, cls.CASSETTE, **pool_options)
+        elif cassette_mode == 'replay':
+            cls.client = ReplayRestApiClient(cls.HOST, cls.CASSETTE, port=cls.PORT,
+                                             scheme=cls.SCHEME, metrics=cls.METRICS_SINK)
+        else:
+            raise ValueError('Unknown cassette mode: {}'.format(cassette_mode))
+
+        if cls.OPENAPI_SPEC is not None:
+            cls.client.load_openapi(cls.OPENAPI_SPEC)
+
+        # Profiling is off unless asked for: then not even its module loads.
+        cls._profiler = None
+        if os.environ.get('TESTHARNESS_PROFILE'):
+            from .profiling import get_profiler
+            cls._profiler = get_profiler()
+            if cls._profiler is not None:
+                cls._profiler.wrap_client(cls.client)
+
+        cls.fixtures = FixtureRegistry(cls.client, max_workers=cls.POOL_MAXSIZE)
+        if cls.FIXTURES:
+            try:
+                cls.fixtures.create(cls.FIXTURES)
+            except Exception:
+                # tearDownClass does not run after a failed setUpClass.
+                cls.fixtures.teardown()
+                cls.client.close()
+                raise
+        cls._setup_time = time.perf_counter() - start
+
+    @classmethod
+    def _wsgi_app(cls):
+        """ the WSGI application (or import path) for the class's client, or None """
+        wsgi_app = os.environ.get('TESTHARNESS_WSGI_APP') or cls.WSGI_APP
+        if isinstance(wsgi_app, str) and wsgi_app.lower() == 'none':
+            return None
+        return wsgi_app
+
+    @classmethod
+    def _response_cache(cls):
+        """ a ResponseCache for the class's client, or None """
+        if not cls.RESPONSE_CACHE_SIZE:
+            return None
+        return ResponseCache(max_entries=cls.RESPONSE_CACHE_SIZE, ttl=cls.RESPONSE_CACHE_TTL)
+
+    @classmethod
+    def tearDownClass(cls):
+        """ delete fixtures and close HTTP client connections """
+        from .clients.live import RestApiClient
+
+        start = time.perf_counter()
+        if cls.fixtures is not None:
+            failed = cls.fixtures.teardown()
+            if failed:
+                log.warning('%s: %d fixture objects were not deleted', cls.__name__, failed)
+        cls.client.close()
+        if isinstance(cls.client, RestApiClient):
+            log.debug('%s connections: opened=%d reused=%d', cls.__name__,
+                      cls.client.connections_opened, cls.client.connections_reused)
+        if getattr(cls.client, 'cache', None) is not None:
+            log.debug('%s response cache: %s', cls.__name__, cls.client.cache.stats())
+
+        history = os.environ.get('TESTHARNESS_HISTORY') or cls.HISTORY
+        if history:
+            from .history import record_client
+            record_client(history, cls.client)
+        if cls._profiler is not None:
+            log.info('%s profiles: %s', cls.__name__, cls._profiler.write())
+
+        cls.phase_times = PhaseTimes(cls._setup_time, cls._test_time,
+                                     time.perf_counter() - start)
+        log.info('%s phases: setup=%.3fs test=%.3fs teardown=%.3fs', cls.__name__,
+                 *cls.phase_times)
+
+    def run(self, result=None):
+        """ run the test, adding its wall time to the class's test phase """
+        start = time.perf_counter()
+        try:
+            if self._profiler is None:
+                return super().run(result)
+            with self._profiler.profile_test(self.id()):
+                return super().run(result)
+        finally:
+            type(self)._test_time += time.perf_counter() - start
+
+
+class MultiHostRestApiTestCase(RestApiAssertionsMixin, unittest.TestCase):
+    """ Multi-Host REST API Test Case.
+
+    This Test Case compares a canary deployment with its baseline.
+
+    Each request goes to every host in HOSTS at once, and returns a
+    MultiResponse. Assert the hosts agree with assertNoDivergence, and the
+    canary is not slower with assertLatencyWithin. The first host is the
+    baseline, unless BASELINE names another.
+
+    The TESTHARNESS_HOSTS environment variable overrides HOSTS, e.g.
+    "baseline=http://api-blue.example.com,canary=http://api-green.example.com".
+    """
+
+    # Change these to the real servers: host name -> "scheme://hostname:port".
+    HOSTS = OrderedDict([
+        ('baseline', 'http://example.com:80'),
+    ])
+    BASELINE = None
+
+    # Response parts that may differ between hosts (default headers: multi.IGNORED_HEADERS).
+    IGNORE_HEADERS = None
+    IGNORE_PATHS = ()
+
+    POOL_MAXSIZE = 10
+
+    # RetryPolicy for transient failures (default: no retries).
+    RETRY_POLICY = None
+
+    # JSON codec name or JsonCodec (default: orjson when installed, else json).
+    JSON_CODEC = None
+
+    @classmethod
+    def setUpClass(cls):
+        """ prepare multi-host HTTP client """
+        from .clients.multi import IGNORED_HEADERS, MultiHostRestApiClient
+
+        ignore_headers = cls.IGNORE_HEADERS
+        cls.client = MultiHostRestApiClient.from_urls(
+            cls._hosts(), baseline=cls.BASELINE,
+            ignore_headers=ignore_headers if ignore_headers is not None else IGNORED_HEADERS,
+            ignore_paths=cls.IGNORE_PATHS,
+            pool_maxsize=cls.POOL_MAXSIZE, retry=cls.RETRY_POLICY, codec=cls.JSON_CODEC)
+
+    @classmethod
+    def _hosts(cls):
+        """ host URLs by name, from TESTHARNESS_HOSTS else HOSTS """
+        environ_hosts = os.environ.get('TESTHARNESS_HOSTS')
+        if not environ_hosts:
+            return OrderedDict(cls.HOSTS)
+
+        hosts = OrderedDict()
+        for item in environ_hosts.split(','):
+            (name, _, host_url) = item.strip().partition('=')
+            if not host_url:
+                raise ValueError('TESTHARNESS_HOSTS items must be "name=url": {}'.format(item))
+            hosts[name.strip()] = host_url.strip()
+        return hosts
+
+    @classmethod
+    def tearDownClass(cls):
+        """ close every host's HTTP client """
+        cls.client.close()
+
+    def assertNoDivergence(self, multi, msg=None):
+        """ Assert every host answered like the baseline.
+
+        :param multi: a MultiResponse
+        """
+
+        divergences = multi.divergences()
+        if divergences:
+            lines = ['{} {} {}: {!r} != {!r}'.format(
+                d.host, d.field, d.path or '', d.baseline, d.value) for d in divergences[:20]]
+            standardMsg = '{} divergences from {}:\n{}'.format(
+                len(divergences), multi.baseline, '\n'.join(lines))
+            self.fail(self._formatMessage(msg, standardMsg))
+
+    def assertLatencyWithin(self, ratio, endpoint=None, percentile=95, msg=None):
+        """ Assert no host is slower than "ratio" times the baseline.
+
+        :param float ratio: latency limit as a multiple of the baseline's, e.g. 1.2
+        :param str endpoint: "METHOD rest_url" or "rest_url" (default: every endpoint)
+        :param float percentile: the latency percentile to compare
+        """
+
+        slower = [c for c in self.client.compare_latency(endpoint, percentile=percentile)
+                  if c.ratio is not None and c.ratio > ratio]
+        if slower:
+            lines = ['{} {}: p{:g} {:.1f} ms vs {:.1f} ms ({:.2f}x)'.format(
+                c.host, c.endpoint, percentile, c.host_ms, c.baseline_ms, c.ratio)
+                for c in slower]
+            standardMsg = 'Latency over {}x the baseline:\n{}'.format(ratio, '\n'.join(lines))
+            self.fail(self._formatMessage(msg, standardMsg))
@@ -0,0 +1,245 @@
+""" REST API Throttle
+
+Shape the request rate and concurrency to what the environment allows.
+
+A Throttle on the client limits each host, and optionally each rest_url
+prefix, to a token-bucket rate and a maximum number of requests in flight.
+When a host answers 429 or 503 with a Retry-After header, its requests
+wait until then. One Throttle may be shared by many clients and worker
+threads: the limits are per host URL, whichever client sends.
+
+The async client sends each request in a worker thread, so the same
+Throttle shapes asyncio tasks too, without blocking the event loop.
+"""
+
+import datetime
+import logging
+import threading
+import time
+
+from collections import namedtuple
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+log = logging.getLogger(__name__)
+
+# Throttle counters.
+#   delayed: requests that waited for a token, a Retry-After or a free slot
+#   waited: total seconds spent waiting for tokens and Retry-After
+#   retry_after: responses with a Retry-After the throttle honored
+ThrottleStats = namedtuple('ThrottleStats', ['requests', 'delayed', 'waited', 'retry_after'])
+
+# Status codes whose Retry-After header holds the host's requests back.
+RETRY_AFTER_STATUSES = frozenset([429, 503])
+
+
+def parse_retry_after(value, now=None):
+    """ Parse Retry-After.
+
+    :param str value: delay seconds, or an HTTP date
+    :param now: current datetime.datetime for an HTTP date (default: UTC now)
+    :returns: seconds to wait, or None when the value is not valid
+    """
+
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    now = now if now is not None else datetime.datetime.now(datetime.timezone.utc)
+    return max((when - now).total_seconds(), 0.0)
+
+
+class TokenBucket(object):
+    """ Token Bucket.
+
+    Allow "rate" requests per second on average, in bursts of up to "burst";
+    safe across threads. A request takes its token at once, in debt if need
+    be, and waits for the debt to refill, so waiting requests keep their order.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        """ Init TokenBucket.
+
+        :param float rate: tokens per second
+        :param float burst: most tokens saved up (default: one second of tokens, at least 1)
+        :param clock: monotonic time function
+        """
+
+        if rate <= 0:
+            raise ValueError('Token bucket rate must be positive: {}'.format(rate))
+
+        self.rate = float(rate)
+        self.burst = float(burst) if burst is not None else max(self.rate, 1.0)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def reserve(self, tokens=1.0):
+        """ Take tokens.
+
+        :returns: seconds to wait before using them
+        """
+
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class _Limit(object):
+    """ the rate, concurrency and Retry-After state of one host or rest_url prefix """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None, clock=time.monotonic):
+        self.bucket = TokenBucket(rate, burst=burst, clock=clock) if rate else None
+        self.slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self.blocked_until = 0.0
+
+
+def _under(rest_url, prefix):
+    """ the rest_url is the prefix path or one of its sub-paths """
+    return rest_url == prefix or rest_url.startswith(prefix.rstrip('/') + '/')
+
+
+class Throttle(object):
+    """ Throttle.
+
+    Per host and per rest_url prefix rate and concurrency limits.
+
+    Example:
+        Throttle(rate=20, max_in_flight=8, rules={
+            '/v1/search': {'rate': 2, 'max_in_flight': 1},
+        })
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None, rules=None,
+                 honor_retry_after=True, max_retry_after=60.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        """ Init Throttle.
+
+        :param float rate: requests per second to each host (default: no limit)
+        :param float burst: requests sent at once before the rate applies
+        :param int max_in_flight: most concurrent requests to each host (default: no limit)
+        :param rules: dict of rest_url prefix to dict of "rate", "burst" and
+            "max_in_flight" limits, on top of the host's
+        :param bool honor_retry_after: hold a host's requests for its Retry-After
+        :param float max_retry_after: longest Retry-After honored (in seconds)
+        :param clock: monotonic time function
+        :param sleep: sleep function
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.rules = dict(rules or {})
+        self.honor_retry_after = honor_retry_after
+        self.max_retry_after = max_retry_after
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+        self.requests = 0
+        self.delayed = 0
+        self.waited = 0.0
+        self.retry_after = 0
+
+    def _host_limits(self, host_url):
+        """ the host's limit and its rule limits by prefix """
+        with self._lock:
+            limits = self._hosts.get(host_url)
+            if limits is None:
+                limits = self._hosts[host_url] = (
+                    _Limit(self.rate, self.burst, self.max_in_flight, clock=self._clock),
+                    {prefix: _Limit(clock=self._clock, **rule)
+                     for (prefix, rule) in self.rules.items()})
+            return limits
+
+    def _limits(self, host_url, rest_url):
+        """ the limits for a request: the host's, then its rules' in prefix order """
+        (host_limit, rule_limits) = self._host_limits(host_url)
+        return [host_limit] + [rule_limits[prefix] for prefix in sorted(rule_limits)
+                               if _under(rest_url, prefix)]
+
+    @contextmanager
+    def slot(self, host_url, rest_url):
+        """ Hold a request until the limits allow it, then send it in the "with" block.
+
+        :param str host_url: the client's host URL
+        :param rest_url: the request's relative URL
+        """
+
+        limits = self._limits(host_url, rest_url)
+        acquired = []
+        delayed = False
+        try:
+            for limit in limits:
+                if limit.slots is not None:
+                    if not limit.slots.acquire(blocking=False):
+                        delayed = True
+                        limit.slots.acquire()
+                    acquired.append(limit)
+
+            now = self._clock()
+            wait = max(limit.blocked_until for limit in limits) - now
+            for limit in limits:
+                if limit.bucket is not None:
+                    wait = max(wait, limit.bucket.reserve())
+            if wait > 0:
+                delayed = True
+                log.debug('Throttle %s %s: waiting %.3fs', host_url, rest_url, wait)
+                self._sleep(wait)
+
+            with self._lock:
+                self.requests += 1
+                self.delayed += 1 if delayed else 0
+                self.waited += max(wait, 0.0)
+            yield
+        finally:
+            for limit in reversed(acquired):
+                limit.slots.release()
+
+    def record(self, host_url, resp):
+        """ Hold the host's requests for the response's Retry-After, if any.
+
+        :param str host_url: the client's host URL
+        :param resp: the HTTP response or None
+        """
+
+        if not self.honor_retry_after or resp is None:
+            return
+        if getattr(resp, 'status_code', None) not in RETRY_AFTER_STATUSES:
+            return
+
+        headers = getattr(resp, 'headers', None) or {}
+        delay = parse_retry_after(headers.get('Retry-After'))
+        if delay is None:
+            return
+
+        delay = min(delay, self.max_retry_after)
+        (host_limit, _) = self._host_limits(host_url)
+        with self._lock:
+            host_limit.blocked_until = max(host_limit.blocked_until, self._clock() + delay)
+            self.retry_after += 1
+        log.warning('Throttle %s: %d Retry-After %.1fs', host_url, resp.status_code, delay)
+
+    def stats(self):
+        """ Throttle Statistics.
+
+        :returns: a ThrottleStats
+        """
+
+        with self._lock:
+            return ThrottleStats(self.requests, self.delayed, self.waited, self.retry_after)
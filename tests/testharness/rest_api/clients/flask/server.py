@@ -1,4 +1,6 @@
-from flask import Flask, request
+import json
+
+from flask import Flask, Response, request
 from flask_restplus import Api, Resource
 
 # ==============================================================
@@ -43,5 +45,19 @@ class HelloTester(Resource):
         return {"message": hello_message}, 201
 
 
+@app.route('/stream/items')
+def stream_items():
+    """ Stream a JSON array of "count" items, one chunk per item. """
+    count = int(request.args.get('count', 0))
+
+    def generate():
+        yield '['
+        for n in range(count):
+            yield (',' if n else '') + json.dumps({'id': n})
+        yield ']'
+
+    return Response(generate(), mimetype='application/json')
+
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -49,3 +49,27 @@ class FlaskTestingRestApiClientTests(TestCase):
         response = self.client.post('/v1/testing/hello', expected_json)
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.json, expected_json)
+
+    def test_batch_sequential(self):
+        results = self.client.batch([
+            ('GET', '/v1/testing/hello'),
+            ('POST', '/v1/testing/hello', ({'message': 'batch'},)),
+            ('DELETE', '/v1/testing/goodbye', 'you'),
+        ])
+
+        self.assertEqual([r.response.status_code for r in results], [200, 201, 204])
+        self.assertEqual(results[1].response.json, {'message': 'batch'})
+
+    def test_get_stream(self):
+        with self.client.get_stream('/stream/items', query={'count': 100}) as stream:
+            self.assertEqual(stream.status_code, 200)
+            ids = [item['id'] for item in stream.iter_items()]
+
+        self.assertEqual(ids, list(range(100)))
+
+    def test_openapi_validation(self):
+        spec = self.client.load_openapi('/v1/swagger.json')
+
+        self.assertIs(self.client.load_openapi('/v1/swagger.json'), spec)
+        self.assertEqual(spec.match('DELETE', '/v1/testing/goodbye/you')[0][-6:], '/{tag}')
+        spec.validate(self.client.get('/v1/testing/hello'))
@@ -0,0 +1,167 @@
+import gzip
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# ==============================================================
+# Local HTTP REST API for Testing
+# ==============================================================
+
+
+class JsonTestHandler(BaseHTTPRequestHandler):
+    """ JSON Test Handler.
+
+    Echo each request back as JSON over keep-alive HTTP/1.1.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return body
+
+    def _send_json(self, status, body, headers={}):
+        content = json.dumps(body).encode('utf8')
+        self.send_response(status)
+        # Only the "/v1/test/gzip" endpoints compress, when the client accepts gzip.
+        if (self.path.startswith('/v1/test/gzip')
+                and 'gzip' in (self.headers.get('Accept-Encoding') or '')):
+            content = gzip.compress(content)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for (name, value) in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _echo(self):
+        parts = urlsplit(self.path)
+        body = self._read_body()
+        return {
+            'method': self.command,
+            'path': parts.path,
+            'query': dict(parse_qsl(parts.query)),
+            'body': json.loads(body.decode('utf8')) if body else None,
+        }
+
+    def do_DELETE(self):
+        self._read_body()
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _send_chunked_array(self, count):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        pieces = ['['] + [('{}' if n == 0 else ',{}').format(json.dumps({'id': n}))
+                          for n in range(count)] + [']']
+        for piece in pieces:
+            data = piece.encode('utf8')
+            self.wfile.write('{:x}\r\n'.format(len(data)).encode('ascii') + data + b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _send_page(self, query):
+        """ Page through "total" items by offset, page, cursor or Link header "start". """
+        total = int(query.get('total', 25))
+        if 'offset' in query:
+            (start, size) = (int(query['offset']), int(query['limit']))
+        elif 'page' in query:
+            size = int(query.get('per_page', 10))
+            start = (int(query['page']) - 1) * size
+        else:
+            (start, size) = (int(query.get('cursor') or query.get('start') or 0), 10)
+
+        end = min(start + size, total)
+        headers = {}
+        if end < total:
+            next_query = dict(query, start=end)
+            next_query.pop('cursor', None)
+            headers['Link'] = '<http://{}:{}/v1/test/items?{}>; rel="next"'.format(
+                self.server.server_address[0], self.server.server_address[1],
+                urlencode(sorted(next_query.items())))
+
+        self._send_json(200, {
+            'items': [{'id': n} for n in range(start, end)],
+            'next_cursor': str(end) if end < total else None,
+        }, headers=headers)
+
+    def _send_etag(self):
+        """ Answer "304 Not Modified" to a matching If-None-Match. """
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self._send_json(200, self._echo(), headers={'ETag': '"v1"'})
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == '/v1/test/stream':
+            self._send_chunked_array(int(dict(parse_qsl(parts.query)).get('count', 0)))
+        elif parts.path == '/v1/test/items':
+            self._send_page(dict(parse_qsl(parts.query)))
+        elif parts.path.startswith('/v1/test/etag'):
+            self._send_etag()
+        else:
+            self._send_json(200, self._echo())
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header('Allow', 'DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_PATCH(self):
+        self._send_json(200, self._echo())
+
+    def do_POST(self):
+        self._send_json(201, self._echo())
+
+    def do_PUT(self):
+        self._send_json(200, self._echo())
+
+
+class ThreadedTestServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class LocalTestServer(object):
+    """ Local Test Server.
+
+    Serve the handler on 127.0.0.1 with a free port in a background thread.
+    """
+
+    def __init__(self, handler_class=JsonTestHandler):
+        self.httpd = ThreadedTestServer(('127.0.0.1', 0), handler_class)
+        self.host = '127.0.0.1'
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever,
+                                       kwargs={'poll_interval': 0.05}, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
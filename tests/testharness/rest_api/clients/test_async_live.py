@@ -0,0 +1,151 @@
+import asyncio
+
+from unittest import IsolatedAsyncioTestCase, mock
+
+from testharness.rest_api import pagination
+from testharness.rest_api.clients import async_live
+
+from .http_server import LocalTestServer
+
+
+class AsyncRestApiClientTests(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.client = async_live.AsyncRestApiClient('test.example.com', max_concurrency=3)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_init_client_pool(self):
+        self.assertEqual(self.client.host_url, 'http://test.example.com:80')
+        self.assertEqual(self.client.max_concurrency, 3)
+        self.assertEqual(self.client.adapter._pool_maxsize, 3)
+        self.assertIs(self.client.session.get_adapter('https://test.example.com'),
+                      self.client.adapter)
+
+    async def test_delete(self):
+        mock_response = mock.MagicMock()
+
+        with mock.patch.object(self.client.session, 'delete',
+                               return_value=mock_response) as mock_delete:
+            response = await self.client.delete('/v1/test/object', 'asdf')
+
+            mock_delete.assert_called_with(
+                self.client.delete_url('/v1/test/object', 'asdf'),
+                headers=self.client._add_rest_headers(),
+                timeout=self.client.response_timeout)
+            self.assertEqual(response, mock_response)
+
+    async def test_get(self):
+        mock_response = mock.MagicMock()
+
+        with mock.patch.object(self.client.session, 'get',
+                               return_value=mock_response) as mock_get:
+            response = await self.client.get('/v1/test/object', query={'code': 'asdf'})
+
+            mock_get.assert_called_with(
+                self.client.get_url('/v1/test/object', query={'code': 'asdf'}),
+                headers=self.client._add_rest_headers(),
+                timeout=self.client.response_timeout)
+            self.assertEqual(response, mock_response)
+
+    async def test_post(self):
+        mock_response = mock.MagicMock()
+
+        with mock.patch.object(self.client.session, 'post',
+                               return_value=mock_response) as mock_post:
+            response = await self.client.post('/v1/test/object', {'code': 'asdf'})
+
+            (full_url, post_payload) = self.client.post_url('/v1/test/object', {'code': 'asdf'})
+            mock_post.assert_called_with(
+                full_url,
+                headers=self.client._add_rest_headers(),
+                timeout=self.client.response_timeout,
+                **self.client.codec.request_body(post_payload))
+            self.assertEqual(response, mock_response)
+
+    async def test_put(self):
+        mock_response = mock.MagicMock()
+
+        with mock.patch.object(self.client.session, 'put',
+                               return_value=mock_response) as mock_put:
+            response = await self.client.put('/v1/test/object', {'code': 'asdf'},
+                                             object_key='asdf')
+
+            mock_put.assert_called_with(
+                self.client.request_url('PUT', '/v1/test/object', object_key='asdf'),
+                headers=self.client._add_rest_headers(),
+                timeout=self.client.response_timeout,
+                **self.client.codec.request_body({'code': 'asdf'}))
+            self.assertEqual(response, mock_response)
+
+    def test_get_stream_not_implemented(self):
+        with self.assertRaisesRegex(NotImplementedError, r'^GET Stream needs'):
+            self.client.get_stream('/v1/test/stream')
+
+
+class AsyncRestApiClientServerTests(IsolatedAsyncioTestCase):
+    """ AsyncRestApiClient Server Tests.
+
+    Gather many requests on a local HTTP/1.1 server.
+    """
+
+    def setUp(self):
+        self.server = LocalTestServer().start()
+        self.client = async_live.AsyncRestApiClient(self.server.host, port=self.server.port,
+                                                    max_concurrency=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    async def test_gather_bounded_concurrency(self):
+        responses = await asyncio.gather(*[
+            self.client.get('/v1/test/object', query={'n': n}) for n in range(20)
+        ])
+
+        self.assertEqual([r.status_code for r in responses], [200] * 20)
+        self.assertEqual([r.json()['query']['n'] for r in responses],
+                         [str(n) for n in range(20)])
+        self.assertLessEqual(self.client.connections_opened, 4)
+        self.assertEqual(self.client.connections_opened + self.client.connections_reused, 20)
+
+    async def test_batch_in_order(self):
+        results = await self.client.batch([
+            ('GET', '/v1/test/object', ({'n': 1},)),
+            ('POST', '/v1/test/object', ({'code': 'asdf'},)),
+            ('DELETE', '/v1/test/object', 'asdf'),
+        ])
+
+        self.assertEqual([r.response.status_code for r in results], [200, 201, 204])
+        self.assertEqual(results[0].response.json()['query'], {'n': '1'})
+        for result in results:
+            self.assertGreater(result.elapsed, 0.0)
+
+    async def test_batch_max_workers(self):
+        in_flight = []
+        peak = []
+        get = self.client.get
+
+        async def counting_get(rest_url, *args):
+            in_flight.append(rest_url)
+            peak.append(len(in_flight))
+            try:
+                return await get(rest_url, *args)
+            finally:
+                in_flight.remove(rest_url)
+
+        with mock.patch.object(self.client, 'get', side_effect=counting_get):
+            results = await self.client.batch(
+                [('GET', '/v1/test/{}'.format(n)) for n in range(8)], max_workers=2)
+
+        self.assertEqual([r.response.status_code for r in results], [200] * 8)
+        self.assertEqual(max(peak), 2)
+
+    async def test_paginate(self):
+        strategy = pagination.CursorPagination()
+
+        ids = [item['id'] async for item in self.client.paginate(
+            '/v1/test/items', {'total': 25}, strategy=strategy)]
+
+        self.assertEqual(ids, list(range(25)))
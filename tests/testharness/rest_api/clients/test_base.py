@@ -1,4 +1,4 @@
-from unittest import TestCase
+from unittest import TestCase, mock
 
 from testharness.rest_api.clients import base
 
@@ -111,3 +111,105 @@ class BaseRestApiClientTests(TestCase):
 
         with self.assertRaisesRegex(NotImplementedError, r'^POST Endpoint:'):
             client.post('/v1/test/object', {'code': 'asdf'})
+
+    def test_put_not_implemented(self):
+        client = base.BaseRestApiClient('test.example.com')
+
+        with self.assertRaisesRegex(NotImplementedError, r"^PUT Endpoint: .*/'asdf' payload="):
+            client.put('/v1/test/object', {'code': 'asdf'}, object_key='asdf')
+
+    def test_head_options_not_implemented(self):
+        client = base.BaseRestApiClient('test.example.com')
+
+        with self.assertRaisesRegex(NotImplementedError, r'^HEAD Endpoint:'):
+            client.head('/v1/test/object')
+        with self.assertRaisesRegex(NotImplementedError, r'^OPTIONS Endpoint:'):
+            client.options('/v1/test/object')
+
+    def test_request_dispatches_to_send(self):
+        client = base.BaseRestApiClient('test.example.com')
+        mock_response = mock.MagicMock(status_code=200)
+
+        with mock.patch.object(client, '_send', return_value=mock_response) as mock_send:
+            response = client.patch('/v1/test/object', {'code': 'asdf'}, object_key=7)
+
+            mock_send.assert_called_once_with(
+                'PATCH', 'http://test.example.com:80/v1/test/object/7', {},
+                payload={'code': 'asdf'}, stream=False)
+            self.assertEqual(response, mock_response)
+            self.assertEqual(response.timing.method, 'PATCH')
+
+    def test_request_write_invalidates_cache(self):
+        client = base.BaseRestApiClient('test.example.com', cache=mock.MagicMock())
+
+        with mock.patch.object(client, '_send', return_value=mock.MagicMock(status_code=200)):
+            client.put('/v1/test/object', {'code': 'asdf'}, object_key=7)
+            client.head('/v1/test/object')
+
+        client.cache.invalidate.assert_called_once_with('/v1/test/object')
+        client.cache.lookup.assert_not_called()
+
+    # =========================================================
+
+    def test_timed_sink_failure_keeps_response(self):
+        client = base.BaseRestApiClient('test.example.com', metrics=mock.MagicMock())
+        client.metrics.record.side_effect = RuntimeError('sink down')
+        mock_response = mock.MagicMock()
+
+        with self.assertLogs('testharness.rest_api.clients', level='ERROR'):
+            response = client._timed('GET', '/v1/test', client.get_url('/v1/test'),
+                                     lambda: mock_response)
+
+        self.assertIs(response, mock_response)
+
+    def test_timed_sink_failure_keeps_request_error(self):
+        client = base.BaseRestApiClient('test.example.com', metrics=mock.MagicMock())
+        client.metrics.record.side_effect = RuntimeError('sink down')
+
+        def send():
+            raise ConnectionError('refused')
+
+        with self.assertLogs('testharness.rest_api.clients', level='ERROR'), \
+                self.assertRaises(ConnectionError):
+            client._timed('GET', '/v1/test', client.get_url('/v1/test'), send)
+
+    def test_timed_records_timing(self):
+        client = base.BaseRestApiClient('test.example.com')
+        mock_response = mock.MagicMock(content=b'{}')
+
+        response = client._timed('GET', '/v1/test', client.get_url('/v1/test'),
+                                 lambda: mock_response)
+
+        self.assertEqual(response.timing.rest_url, '/v1/test')
+        self.assertEqual(response.timing.response_bytes, 2)
+        self.assertEqual(client.metrics.histogram('GET /v1/test').errors, 0)
+
+    # =========================================================
+
+    def test_batch_sequential_in_order(self):
+        client = base.BaseRestApiClient('test.example.com')
+
+        with mock.patch.object(client, 'get', side_effect=['one', 'three']) as mock_get, \
+                mock.patch.object(client, 'delete', return_value='two') as mock_delete:
+            results = client.batch([
+                ('GET', '/v1/test/object', ({'code': 'asdf'},)),
+                ('DELETE', '/v1/test/object', 'asdf'),
+                ('get', '/v1/test/other'),
+            ])
+
+            mock_get.assert_has_calls([
+                mock.call('/v1/test/object', {'code': 'asdf'}),
+                mock.call('/v1/test/other'),
+            ])
+            mock_delete.assert_called_once_with('/v1/test/object', 'asdf')
+
+        self.assertEqual([r.response for r in results], ['one', 'two', 'three'])
+        for result in results:
+            self.assertIsInstance(result, base.BatchResult)
+            self.assertGreaterEqual(result.elapsed, 0.0)
+
+    def test_batch_not_implemented(self):
+        client = base.BaseRestApiClient('test.example.com')
+
+        with self.assertRaisesRegex(NotImplementedError, r'^GET Endpoint:'):
+            client.batch([('GET', '/v1/test/object')])
@@ -0,0 +1,131 @@
+import os
+import tempfile
+
+from unittest import TestCase
+
+from testharness.rest_api.clients import cassette
+
+from .http_server import LocalTestServer
+
+
+class CassetteTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'api.cassette')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_request_key(self):
+        key = cassette.request_key('POST', '/v1/test', {'b': 1, 'a': 2})
+
+        self.assertEqual(key, cassette.request_key('POST', '/v1/test', {'a': 2, 'b': 1}))
+        self.assertNotEqual(key, cassette.request_key('POST', '/v1/test', {'a': 2}))
+        self.assertNotEqual(key, cassette.request_key('GET', '/v1/test'))
+
+    def test_empty_cassette(self):
+        open(self.path, 'w').close()
+        reader = cassette.CassetteReader(self.path)
+
+        self.assertEqual(len(reader), 0)
+        with self.assertRaisesRegex(cassette.CassetteError, r'^GET /v1/test is not in'):
+            reader.play('GET', '/v1/test')
+        reader.close()
+
+    def test_truncated_entry_ignored(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'abc\t{"status_code": 200')
+
+        with self.assertLogs('testharness.rest_api.clients', level='WARNING'):
+            reader = cassette.CassetteReader(self.path)
+
+        self.assertEqual(len(reader), 0)
+        reader.close()
+
+    def test_missing_cassette(self):
+        with self.assertRaisesRegex(cassette.CassetteError, r'does not exist: record it first'):
+            cassette.CassetteReader(os.path.join(self.tmp_dir.name, 'missing.cassette'))
+
+
+class RecordReplayTests(TestCase):
+    """ Record & Replay Tests.
+
+    Record a local HTTP server's responses, then replay them with the server down.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'api.cassette')
+        self.server = LocalTestServer().start()
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.stop()
+        self.tmp_dir.cleanup()
+
+    def _record(self):
+        client = cassette.RecordingRestApiClient(self.server.host, self.path,
+                                                 port=self.server.port)
+        recorded = [
+            client.get('/v1/test/object', query={'n': 1}),
+            client.post('/v1/test/object', {'code': 'asdf'}),
+            client.delete('/v1/test/object', 'asdf'),
+            client.get('/v1/test/object', query={'n': 2}),
+            client.put('/v1/test/object', {'code': 'new'}, object_key=7),
+        ]
+        with client.get_stream('/v1/test/stream', query={'count': 3}) as stream:
+            self.assertEqual(len(list(stream)), 3)
+        client.close()
+        return recorded
+
+    def test_record_then_replay_offline(self):
+        recorded = self._record()
+        self.server.stop()
+        self.server = None
+
+        client = cassette.ReplayRestApiClient('other.example.com', self.path, port=8080)
+        self.assertEqual(len(client.cassette), 6)
+
+        replayed = [
+            client.get('/v1/test/object', query={'n': 1}),
+            client.post('/v1/test/object', {'code': 'asdf'}),
+            client.delete('/v1/test/object', 'asdf'),
+            client.get('/v1/test/object', query={'n': 2}),
+            client.put('/v1/test/object', {'code': 'new'}, object_key=7),
+        ]
+
+        for (live_resp, replay_resp) in zip(recorded, replayed):
+            self.assertEqual(replay_resp.status_code, live_resp.status_code)
+            self.assertEqual(replay_resp.content, live_resp.content)
+            self.assertEqual(replay_resp.headers['Content-Length'],
+                             live_resp.headers['Content-Length'])
+        self.assertEqual(replayed[1].json()['body'], {'code': 'asdf'})
+        self.assertEqual(replayed[4].json()['path'], '/v1/test/object/7')
+        self.assertEqual(replayed[0].timing.status_code, 200)
+
+        with client.get_stream('/v1/test/stream', query={'count': 3}, chunk_size=8) as stream:
+            self.assertEqual([item['id'] for item in stream], [0, 1, 2])
+        self.assertEqual(stream.timing.status_code, 200)
+
+        with self.assertRaises(cassette.CassetteError):
+            client.post('/v1/test/object', {'code': 'other'})
+        client.close()
+
+    def test_replay_repeated_requests_in_order(self):
+        client = cassette.RecordingRestApiClient(self.server.host, self.path,
+                                                 port=self.server.port)
+        client.post('/v1/test/object', {'n': 1})
+        client.close()
+        with open(self.path, 'ab') as f:
+            with open(self.path, 'rb') as recorded:
+                line = recorded.read()
+            f.write(line.replace(b'"status_code":201', b'"status_code":409'))
+
+        client = cassette.ReplayRestApiClient('other.example.com', self.path)
+        statuses = [client.post('/v1/test/object', {'n': 1}).status_code for n in range(3)]
+        client.cassette.rewind()
+        statuses.append(client.post('/v1/test/object', {'n': 1}).status_code)
+        client.close()
+
+        self.assertEqual(statuses, [201, 409, 409, 201])
@@ -2,6 +2,8 @@ from unittest import TestCase, mock
 
 from testharness.rest_api.clients import live
 
+from .http_server import LocalTestServer
+
 
 class RestApiClientTests(TestCase):
 
@@ -10,8 +12,8 @@ class RestApiClientTests(TestCase):
 
         mock_response = mock.MagicMock()
 
-        with mock.patch('testharness.rest_api.clients.live.requests.delete',
-                        return_value=mock_response) as mock_delete:
+        with mock.patch.object(client.session, 'delete',
+                               return_value=mock_response) as mock_delete:
             response = client.delete('/v1/test/object', 'asdf')
 
             mock_delete.assert_called_with(
@@ -25,8 +27,8 @@ class RestApiClientTests(TestCase):
 
         mock_response = mock.MagicMock()
 
-        with mock.patch('testharness.rest_api.clients.live.requests.get',
-                        return_value=mock_response) as mock_get:
+        with mock.patch.object(client.session, 'get',
+                               return_value=mock_response) as mock_get:
             response = client.get('/v1/test/object', query={'code': 'asdf'})
 
             mock_get.assert_called_with(
@@ -40,14 +42,174 @@ class RestApiClientTests(TestCase):
 
         mock_response = mock.MagicMock()
 
-        with mock.patch('testharness.rest_api.clients.live.requests.post',
-                        return_value=mock_response) as mock_post:
+        with mock.patch.object(client.session, 'post',
+                               return_value=mock_response) as mock_post:
             response = client.post('/v1/test/object', {'code': 'asdf'})
 
             (full_url, post_payload) = client.post_url('/v1/test/object', {'code': 'asdf'})
             mock_post.assert_called_with(
                 full_url,
-                json=post_payload,
                 headers=client._add_rest_headers(),
-                timeout=client.response_timeout)
+                timeout=client.response_timeout,
+                **client.codec.request_body(post_payload))
+            self.assertEqual(response, mock_response)
+
+    def test_put(self):
+        client = live.RestApiClient('test.example.com')
+
+        mock_response = mock.MagicMock()
+
+        with mock.patch.object(client.session, 'put',
+                               return_value=mock_response) as mock_put:
+            response = client.put('/v1/test/object', {'code': 'asdf'}, object_key='asdf')
+
+            mock_put.assert_called_with(
+                client.request_url('PUT', '/v1/test/object', object_key='asdf'),
+                headers=client._add_rest_headers(),
+                timeout=client.response_timeout,
+                **client.codec.request_body({'code': 'asdf'}))
             self.assertEqual(response, mock_response)
+
+    # =========================================================
+
+    def test_session_mounts_pooled_adapter(self):
+        client = live.RestApiClient('test.example.com', pool_connections=2, pool_maxsize=7,
+                                    max_retries=3, pool_block=True)
+
+        self.assertIs(client.session.get_adapter('http://test.example.com'), client.adapter)
+        self.assertIs(client.session.get_adapter('https://test.example.com'), client.adapter)
+        self.assertEqual(client.adapter._pool_connections, 2)
+        self.assertEqual(client.adapter._pool_maxsize, 7)
+        self.assertEqual(client.adapter._pool_block, True)
+        self.assertEqual(client.adapter.max_retries.total, 3)
+
+    def test_close(self):
+        client = live.RestApiClient('test.example.com')
+
+        with mock.patch.object(client.session, 'close') as mock_close:
+            client.close()
+
+            mock_close.assert_called_once_with()
+
+
+class RestApiClientConnectionTests(TestCase):
+    """ RestApiClient Connection Tests.
+
+    Send requests to a local HTTP/1.1 server to count keep-alive connections.
+    """
+
+    def setUp(self):
+        self.server = LocalTestServer().start()
+        self.client = live.RestApiClient(self.server.host, port=self.server.port)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_connections_reused(self):
+        self.assertEqual(self.client.connections_opened, 0)
+        self.assertEqual(self.client.connections_reused, 0)
+
+        for n in range(3):
+            response = self.client.get('/v1/test/object', query={'n': n})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['query'], {'n': str(n)})
+
+        self.assertEqual(self.client.connections_opened, 1)
+        self.assertEqual(self.client.connections_reused, 2)
+
+    def test_connections_counted_after_close(self):
+        self.client.post('/v1/test/object', {'code': 'asdf'})
+        self.client.delete('/v1/test/object', 'asdf')
+        self.client.close()
+
+        self.assertEqual(self.client.connections_opened, 1)
+        self.assertEqual(self.client.connections_reused, 1)
+
+    def test_batch_concurrent_in_order(self):
+        requests = [('GET', '/v1/test/object', ({'n': n},)) for n in range(12)]
+        requests.append(('POST', '/v1/test/object', ({'code': 'asdf'},)))
+        requests.append(('DELETE', '/v1/test/object', 'asdf'))
+
+        results = self.client.batch(requests, max_workers=4)
+
+        self.assertEqual(len(results), 14)
+        self.assertEqual([r.response.json()['query']['n'] for r in results[:12]],
+                         [str(n) for n in range(12)])
+        self.assertEqual(results[12].response.status_code, 201)
+        self.assertEqual(results[12].response.json()['body'], {'code': 'asdf'})
+        self.assertEqual(results[13].response.status_code, 204)
+        for result in results:
+            self.assertGreater(result.elapsed, 0.0)
+        self.assertLessEqual(self.client.connections_opened, 4)
+
+    def test_http_verbs(self):
+        response = self.client.put('/v1/test/object', {'code': 'put'}, object_key=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['method'], 'PUT')
+        self.assertEqual(response.json()['path'], '/v1/test/object/1')
+        self.assertEqual(response.json()['body'], {'code': 'put'})
+
+        response = self.client.patch('/v1/test/object', {'code': 'patch'}, object_key=1)
+        self.assertEqual(response.json()['method'], 'PATCH')
+        self.assertEqual(response.json()['body'], {'code': 'patch'})
+
+        response = self.client.head('/v1/test/object')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.options('/v1/test/object')
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('PATCH', response.headers['Allow'])
+
+        self.assertEqual(self.client.connections_opened, 1)
+        for method in ('PUT', 'PATCH', 'HEAD', 'OPTIONS'):
+            histogram = self.client.metrics.histogram('{} /v1/test/object'.format(method))
+            self.assertEqual(histogram.count, 1)
+
+    def test_batch_empty(self):
+        self.assertEqual(self.client.batch([]), [])
+
+    def test_get_stream(self):
+        with self.client.get_stream('/v1/test/stream', query={'count': 500},
+                                    chunk_size=64) as stream:
+            self.assertEqual(stream.status_code, 200)
+            self.assertEqual(stream.timing.method, 'GET')
+            ids = [item['id'] for item in stream.iter_items()]
+
+        self.assertEqual(ids, list(range(500)))
+        self.assertGreater(stream.bytes_read, 0)
+        self.assertEqual(self.client.metrics.histogram('GET /v1/test/stream').count, 1)
+
+        response = self.client.get('/v1/test/object')
+        self.assertEqual(response.status_code, 200)
+
+    def test_request_timing(self):
+        first = self.client.get('/v1/test/object', query={'n': 1})
+        second = self.client.post('/v1/test/object', {'code': 'asdf'})
+
+        self.assertEqual(first.timing.method, 'GET')
+        self.assertEqual(first.timing.rest_url, '/v1/test/object')
+        self.assertEqual(first.timing.url, self.client.get_url('/v1/test/object', {'n': 1}))
+        self.assertEqual(first.timing.status_code, 200)
+        self.assertGreater(first.timing.connect, 0.0)
+        self.assertEqual(first.timing.tls, 0.0)
+        self.assertGreater(first.timing.ttfb, 0.0)
+        self.assertGreaterEqual(first.timing.total, first.timing.ttfb)
+        self.assertEqual(first.timing.response_bytes, len(first.content))
+
+        self.assertEqual(second.timing.connect, 0.0)
+        self.assertEqual(second.timing.request_bytes,
+                         len(self.client.codec.dumps({'code': 'asdf'})))
+
+        self.assertEqual(self.client.metrics.histogram('GET /v1/test/object').count, 1)
+        self.assertEqual(self.client.metrics.histogram('/v1/test/object').count, 2)
+
+    def test_request_timing_error(self):
+        self.server.stop()
+
+        with self.assertRaises(Exception):
+            self.client.get('/v1/test/object')
+
+        self.assertEqual(self.client.metrics.histogram('GET /v1/test/object').errors, 1)
+        self.server = LocalTestServer().start()
@@ -0,0 +1,121 @@
+import time
+
+from collections import OrderedDict
+from unittest import TestCase, mock
+
+from testharness.rest_api.clients import multi
+
+from .http_server import JsonTestHandler, LocalTestServer
+
+
+class CanaryTestHandler(JsonTestHandler):
+    """ A canary that answers one endpoint differently, and slowly. """
+
+    def do_GET(self):
+        if self.path.startswith('/v1/test/changed'):
+            self._send_json(200, dict(self._echo(), extra=True), headers={'X-Version': '2'})
+        elif self.path.startswith('/v1/test/missing'):
+            self._send_json(404, {'error': 'not found'})
+        elif self.path.startswith('/v1/test/slow'):
+            time.sleep(0.05)
+            self._send_json(200, self._echo())
+        else:
+            super().do_GET()
+
+
+class DiffJsonTests(TestCase):
+
+    def test_equal(self):
+        self.assertEqual(multi.diff_json({'a': [1, {'b': 2}]}, {'a': [1, {'b': 2}]}), [])
+
+    def test_differences(self):
+        baseline = {'a': 1, 'items': [{'id': 1}, {'id': 2}], 'gone': 'x', 'n': 1}
+        value = {'a': 2, 'items': [{'id': 1}, {'id': 3}, {'id': 4}], 'new': 'y', 'n': 1.0}
+
+        self.assertEqual(multi.diff_json(baseline, value), [
+            ('$.a', 1, 2),
+            ('$.gone', 'x', None),
+            ('$.items[1].id', 2, 3),
+            ('$.items.length', 2, 3),
+            ('$.n', 1, 1.0),
+            ('$.new', None, 'y'),
+        ])
+
+    def test_ignore_paths(self):
+        self.assertEqual(multi.diff_json({'at': 1, 'id': 7}, {'at': 2, 'id': 7},
+                                         ignore_paths=['$.at']), [])
+
+
+class MultiHostRestApiClientTests(TestCase):
+
+    def setUp(self):
+        self.baseline = LocalTestServer().start()
+        self.canary = LocalTestServer(CanaryTestHandler).start()
+        self.client = multi.MultiHostRestApiClient.from_urls(OrderedDict([
+            ('baseline', 'http://{}:{}'.format(self.baseline.host, self.baseline.port)),
+            ('canary', 'http://{}:{}'.format(self.canary.host, self.canary.port)),
+        ]))
+
+    def tearDown(self):
+        self.client.close()
+        self.baseline.stop()
+        self.canary.stop()
+
+    def test_same_responses(self):
+        response = self.client.get('/v1/test/object', query={'code': 'asdf'})
+
+        self.assertEqual(list(response.responses), ['baseline', 'canary'])
+        self.assertEqual(response['canary'].json()['query'], {'code': 'asdf'})
+        self.assertFalse(response.diverged)
+        self.assertEqual(response.timings['canary'].status_code, 200)
+
+        response = self.client.post('/v1/test/object', {'code': 'asdf'})
+        self.assertFalse(response.diverged)
+
+    def test_divergences(self):
+        response = self.client.get('/v1/test/changed')
+        codec = self.client.clients['canary'].codec
+
+        with mock.patch.object(codec, 'loads', wraps=codec.loads) as loads:
+            self.assertEqual(response.divergences(), [
+                multi.Divergence('canary', 'header', 'x-version', None, '2'),
+                multi.Divergence('canary', 'body', '$.extra', None, True),
+            ])
+        self.assertEqual(loads.call_count, 1)
+
+        response = self.client.get('/v1/test/missing')
+        self.assertEqual(response.divergences()[0],
+                         multi.Divergence('canary', 'status_code', None, 200, 404))
+
+    def test_error_divergence(self):
+        self.client.clients['canary'].session.get = mock.MagicMock(
+            side_effect=ConnectionError('canary down'))
+
+        with self.assertLogs('testharness.rest_api.clients', 'WARNING'):
+            response = self.client.get('/v1/test/object')
+
+        self.assertIsNone(response['canary'])
+        self.assertEqual([(d.host, d.field) for d in response.divergences()],
+                         [('canary', 'error')])
+
+    def test_requests_sent_concurrently(self):
+        start = time.perf_counter()
+        for n in range(4):
+            self.client.get('/v1/test/slow')
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 4 * 0.05 * 1.8)
+
+    def test_compare_latency(self):
+        for n in range(4):
+            self.client.get('/v1/test/slow')
+
+        (comparison,) = self.client.compare_latency('GET /v1/test/slow')
+        self.assertEqual(comparison.host, 'canary')
+        self.assertGreater(comparison.host_ms, 50.0)
+        self.assertGreater(comparison.ratio, 1.0)
+        self.assertIs(self.client.metrics, self.client.clients['baseline'].metrics)
+
+    def test_bad_baseline(self):
+        with self.assertRaisesRegex(ValueError, r'^Baseline blue is not one of the hosts'):
+            multi.MultiHostRestApiClient(self.client.clients, baseline='blue')
@@ -0,0 +1,163 @@
+import json
+import os
+import time
+import zlib
+
+from unittest import TestCase, mock
+from urllib.parse import parse_qsl
+
+from requests.exceptions import ReadTimeout
+
+from testharness.rest_api import testcases
+from testharness.rest_api.clients import live, wsgi
+
+# ==============================================================
+# WSGI REST API for Testing
+# ==============================================================
+
+
+def echo_app(environ, start_response):
+    """ Echo each request back as JSON, like the local test HTTP server. """
+    path = environ['PATH_INFO']
+    if path == '/v1/test/fail':
+        raise RuntimeError('app failure')
+    if path == '/v1/test/slow':
+        time.sleep(0.05)
+    if path == '/v1/test/stream':
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        count = int(dict(parse_qsl(environ['QUERY_STRING'])).get('count', 0))
+        return iter([b'['] + [(',' if n else '').encode('ascii') + json.dumps(
+            {'id': n}).encode('utf8') for n in range(count)] + [b']'])
+
+    length = int(environ.get('CONTENT_LENGTH') or 0)
+    body = environ['wsgi.input'].read(length) if length else b''
+    content = json.dumps({
+        'method': environ['REQUEST_METHOD'],
+        'path': path,
+        'query': dict(parse_qsl(environ['QUERY_STRING'])),
+        'body': json.loads(body.decode('utf8')) if body else None,
+        'host': environ['HTTP_HOST'],
+        'content_type': environ.get('CONTENT_TYPE'),
+    }).encode('utf8')
+
+    status = '201 CREATED' if environ['REQUEST_METHOD'] == 'POST' else '200 OK'
+    start_response(status, [('Content-Type', 'application/json'),
+                            ('Content-Length', str(len(content)))])
+    return [content]
+
+
+def lazy_gzip_app(environ, start_response):
+    """ Start the response on the first iteration, and gzip a JSON array in chunks. """
+    start_response('200 OK', [('Content-Type', 'application/json'),
+                              ('Content-Encoding', 'gzip')])
+    gzipper = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    yield gzipper.compress(b'[')
+    for n in range(50):
+        yield gzipper.compress((',' if n else '').encode('ascii') + json.dumps(
+            {'id': n}).encode('utf8')) + gzipper.flush(zlib.Z_SYNC_FLUSH)
+    yield gzipper.compress(b']') + gzipper.flush()
+
+
+class WSGIAdapterTests(TestCase):
+
+    def setUp(self):
+        self.client = live.RestApiClient('api.example.com', wsgi_app=echo_app)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_get(self):
+        response = self.client.get('/v1/test/a b', query={'code': 'asdf'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['content-type'], 'application/json')
+        self.assertEqual(response.json(), {
+            'method': 'GET', 'path': '/v1/test/a b', 'query': {'code': 'asdf'}, 'body': None,
+            'host': 'api.example.com:80', 'content_type': 'application/json'})
+        self.assertIsNotNone(response.timing)
+        self.assertEqual(self.client.connections_opened, 0)
+
+    def test_post_put(self):
+        response = self.client.post('/v1/test/object', {'code': 'asdf'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.reason, 'CREATED')
+        self.assertEqual(response.json()['body'], {'code': 'asdf'})
+
+        response = self.client.put('/v1/test/object', {'code': 'new'}, object_key=7)
+        self.assertEqual(response.json()['method'], 'PUT')
+        self.assertEqual(response.json()['path'], '/v1/test/object/7')
+
+    def test_get_stream(self):
+        with self.client.get_stream('/v1/test/stream', query={'count': 50},
+                                    chunk_size=16) as stream:
+            ids = [item['id'] for item in stream.iter_items()]
+
+        self.assertEqual(ids, list(range(50)))
+
+    def test_lazy_start_response(self):
+        self.client.mount_wsgi(lazy_gzip_app)
+
+        response = self.client.get('/v1/test/stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json()], list(range(50)))
+
+        with self.client.get_stream('/v1/test/stream', chunk_size=16) as stream:
+            ids = [item['id'] for item in stream.iter_items()]
+        self.assertEqual(ids, list(range(50)))
+
+    def test_app_error_is_500(self):
+        with self.assertLogs('testharness.rest_api.clients', 'ERROR'):
+            response = self.client.get('/v1/test/fail')
+
+        self.assertEqual(response.status_code, 500)
+
+    def test_raise_errors(self):
+        self.client.mount_wsgi(echo_app, raise_errors=True)
+
+        with self.assertRaisesRegex(RuntimeError, r'^app failure'):
+            self.client.get('/v1/test/fail')
+
+    def test_timeout(self):
+        self.client.response_timeout = 0.01
+
+        with self.assertRaisesRegex(ReadTimeout, r'over the 0.01s timeout'):
+            self.client.get('/v1/test/slow')
+
+    def test_other_hosts_not_mounted(self):
+        adapter = self.client.session.get_adapter('http://other.example.com:80/v1/test')
+        self.assertIs(adapter, self.client.adapter)
+
+    def test_load_wsgi_app(self):
+        app_path = 'tests.testharness.rest_api.clients.test_wsgi:echo_app'
+        self.assertIs(wsgi.load_wsgi_app(app_path), echo_app)
+        self.assertIs(wsgi.load_wsgi_app(echo_app), echo_app)
+
+        with self.assertRaisesRegex(ValueError, r'must be "package.module:attribute"'):
+            wsgi.load_wsgi_app('tests.testharness')
+
+
+class WSGITestCaseTests(TestCase):
+
+    def _client(self, wsgi_app=None, environ={}):
+        test_class = type('WSGICase', (testcases.LiveRestApiTestCase,),
+                          {'HOST': 'api.example.com', 'WSGI_APP': wsgi_app})
+        with mock.patch.dict(os.environ, environ):
+            if 'TESTHARNESS_WSGI_APP' not in environ:
+                os.environ.pop('TESTHARNESS_WSGI_APP', None)
+            test_class.setUpClass()
+        self.addCleanup(test_class.tearDownClass)
+        return test_class.client
+
+    def test_wsgi_app(self):
+        client = self._client(wsgi_app=echo_app)
+        self.assertEqual(client.get('/v1/test/object').json()['host'], 'api.example.com:80')
+
+    def test_environ_wsgi_app(self):
+        app_path = 'tests.testharness.rest_api.clients.test_wsgi:echo_app'
+        client = self._client(environ={'TESTHARNESS_WSGI_APP': app_path})
+        self.assertEqual(client.get('/v1/test/object').json()['method'], 'GET')
+
+    def test_environ_none_is_live(self):
+        client = self._client(wsgi_app=echo_app, environ={'TESTHARNESS_WSGI_APP': 'none'})
+        adapter = client.session.get_adapter(client.host_url + '/v1/test/object')
+        self.assertIs(adapter, client.adapter)
@@ -0,0 +1,27 @@
+from testharness.rest_api import testcases
+
+# ==============================================================
+# Sample LiveRestApiTestCase for the load runner tests
+# ==============================================================
+
+
+class SampleLoadCase(testcases.LiveRestApiTestCase):
+    """ Sample Load Case.
+
+    The load runner replays these test methods; the tests set HOST and PORT.
+    """
+
+    POOL_MAXSIZE = 2
+
+    def test_get_object(self):
+        response = self.client.get('/v1/test/object', query={'code': 'asdf'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_object(self):
+        response = self.client.post('/v1/test/object', {'code': 'asdf'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_post_object_fails(self):
+        """ Fail on purpose: the load report counts failed test iterations. """
+        response = self.client.post('/v1/test/object', {'code': 'asdf'})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,34 @@
+import threading
+import time
+import unittest
+
+# ==============================================================
+# Sample module with module fixtures for the parallel runner tests
+# ==============================================================
+
+calls = []
+_lock = threading.Lock()
+
+
+def setUpModule():
+    with _lock:
+        calls.append('setUpModule')
+
+
+def tearDownModule():
+    with _lock:
+        calls.append('tearDownModule')
+
+
+class FirstModuleSampleCase(unittest.TestCase):
+
+    def test_first(self):
+        time.sleep(0.05)
+        self.assertEqual(calls[-1], 'setUpModule')
+
+
+class SecondModuleSampleCase(unittest.TestCase):
+
+    def test_second(self):
+        time.sleep(0.05)
+        self.assertEqual(calls[-1], 'setUpModule')
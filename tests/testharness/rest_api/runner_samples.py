@@ -0,0 +1,61 @@
+import threading
+import time
+import unittest
+
+# ==============================================================
+# Sample TestCase classes for the parallel runner tests
+# ==============================================================
+
+
+class SlowSampleCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setup_thread = threading.current_thread().name
+
+    def test_first(self):
+        time.sleep(0.2)
+        self.assertEqual(self.setup_thread, threading.current_thread().name)
+
+    def test_second(self):
+        time.sleep(0.2)
+        self.assertEqual(self.setup_thread, threading.current_thread().name)
+
+
+class OtherSlowSampleCase(unittest.TestCase):
+
+    def test_sleep(self):
+        time.sleep(0.2)
+
+    @unittest.skip('sample skip')
+    def test_skipped(self):
+        pass
+
+
+class FailingSampleCase(unittest.TestCase):
+
+    def test_fails(self):
+        self.assertEqual(1, 2)
+
+    def test_errors(self):
+        raise RuntimeError('sample error')
+
+    @unittest.expectedFailure
+    def test_expected_failure(self):
+        self.assertTrue(False)
+
+
+# Both classes wait for each other, so they pass only when run at the same time.
+overlap_barrier = threading.Barrier(2, timeout=5)
+
+
+class FirstOverlapSampleCase(unittest.TestCase):
+
+    def test_overlap(self):
+        overlap_barrier.wait()
+
+
+class SecondOverlapSampleCase(unittest.TestCase):
+
+    def test_overlap(self):
+        overlap_barrier.wait()
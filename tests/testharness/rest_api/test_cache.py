@@ -0,0 +1,126 @@
+from unittest import TestCase, mock
+
+from testharness.rest_api import cache
+from testharness.rest_api.clients.live import RestApiClient
+
+from .clients.http_server import LocalTestServer
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_response(headers={}):
+    return mock.MagicMock(status_code=200, headers=headers)
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = cache.ResponseCache(max_entries=2, ttl=10.0, clock=self.clock)
+
+    def test_fresh_hit_and_miss(self):
+        response = make_response()
+        self.assertEqual(self.cache.lookup('http://a/v1/x'), (None, False))
+
+        self.cache.store('http://a/v1/x', '/v1/x', response)
+        (entry, fresh) = self.cache.lookup('http://a/v1/x')
+
+        self.assertTrue(fresh)
+        self.assertIs(entry.response, response)
+        self.assertEqual(self.cache.stats(), cache.CacheStats(1, 1, 0, 0, 0, 1))
+
+    def test_ttl_expiry_without_validators(self):
+        self.cache.store('http://a/v1/x', '/v1/x', make_response())
+        self.clock.now = 10.0
+
+        self.assertEqual(self.cache.lookup('http://a/v1/x'), (None, False))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_stale_entry_revalidates(self):
+        response = make_response({'ETag': '"v1"', 'Last-Modified': 'Wed, 01 Jan 2025'})
+        self.cache.store('http://a/v1/x', '/v1/x', response)
+        self.clock.now = 11.0
+
+        (entry, fresh) = self.cache.lookup('http://a/v1/x')
+        self.assertFalse(fresh)
+        self.assertEqual(entry.validators(), {'If-None-Match': '"v1"',
+                                              'If-Modified-Since': 'Wed, 01 Jan 2025'})
+
+        self.assertIs(self.cache.revalidate('http://a/v1/x', entry, make_response()), response)
+        self.assertTrue(self.cache.lookup('http://a/v1/x')[1])
+        self.assertEqual(self.cache.stats().revalidated, 1)
+
+    def test_lru_eviction(self):
+        for name in ('a', 'b'):
+            self.cache.store('http://a/v1/' + name, '/v1/' + name, make_response())
+        self.cache.lookup('http://a/v1/a')
+        self.cache.store('http://a/v1/c', '/v1/c', make_response())
+
+        self.assertTrue(self.cache.lookup('http://a/v1/a')[1])
+        self.assertEqual(self.cache.lookup('http://a/v1/b'), (None, False))
+        self.assertEqual(self.cache.stats().evictions, 1)
+
+    def test_no_store(self):
+        self.cache.store('http://a/v1/x', '/v1/x', make_response({'Cache-Control': 'no-store'}))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate_prefix(self):
+        for rest_url in ('/v1/things', '/v1/things/1', '/v1/thingsx', '/v1/other'):
+            self.cache.max_entries = 10
+            self.cache.store('http://a' + rest_url, rest_url, make_response())
+
+        self.assertEqual(self.cache.invalidate('/v1/things'), 2)
+        self.assertEqual(self.cache.invalidate('/v1/other/7/notes'), 1)
+        self.assertEqual(len(self.cache), 1)
+
+
+class CachedClientTests(TestCase):
+    """ Cached Client Tests.
+
+    Prove the live client's GET cache against a local HTTP server.
+    """
+
+    def setUp(self):
+        self.server = LocalTestServer().start()
+        self.clock = FakeClock()
+        self.client = RestApiClient(self.server.host, port=self.server.port,
+                                    cache=cache.ResponseCache(ttl=10.0, clock=self.clock))
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_cache_hit_skips_request(self):
+        first = self.client.get('/v1/test/object', {'n': 1})
+        second = self.client.get('/v1/test/object', {'n': 1})
+        self.client.get('/v1/test/object', {'n': 2})
+
+        self.assertIs(second, first)
+        self.assertEqual(self.client.metrics.histogram('GET /v1/test/object').count, 2)
+        self.assertEqual(self.client.cache.stats()[:2], (1, 2))
+
+    def test_etag_revalidation(self):
+        first = self.client.get('/v1/test/etag')
+        self.clock.now = 11.0
+
+        second = self.client.get('/v1/test/etag')
+
+        self.assertIs(second, first)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(self.client.cache.stats().revalidated, 1)
+        self.assertEqual(self.client.metrics.histogram('GET /v1/test/etag').count, 2)
+
+    def test_post_and_delete_invalidate(self):
+        self.client.get('/v1/test/object/1')
+        self.client.get('/v1/test/object')
+        self.assertEqual(len(self.client.cache), 2)
+
+        self.client.delete('/v1/test/object', 1)
+        self.assertEqual(len(self.client.cache), 0)
@@ -0,0 +1,114 @@
+from unittest import TestCase, mock
+
+from testharness.rest_api import compression
+from testharness.rest_api.clients.live import RestApiClient
+
+from .clients.http_server import LocalTestServer
+
+# A payload big enough to compress, and to compress well.
+PAYLOAD = {'items': [{'id': n, 'name': 'item', 'tags': ['a', 'b']} for n in range(200)]}
+
+
+class CompressionFunctionTests(TestCase):
+
+    def test_round_trip(self):
+        body = b'{"a": 1}' * 100
+        for encoding in compression.available_encodings():
+            compressed = compression.compress(body, encoding)
+            self.assertLess(len(compressed), len(body))
+            self.assertEqual(compression.decompress(compressed, encoding), body)
+
+        self.assertEqual(compression.decompress(body, 'identity'), body)
+
+    def test_available_encodings(self):
+        encodings = compression.available_encodings()
+        self.assertEqual(encodings[-2:], ['gzip', 'deflate'])
+
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertNotIn('br', compression.available_encodings())
+
+    def test_unknown_or_missing_encoding(self):
+        with self.assertRaisesRegex(ValueError, r'^Unknown content encoding: lzma'):
+            compression.compress(b'x', 'lzma')
+
+        with mock.patch.object(compression, 'zstandard', None):
+            with self.assertRaisesRegex(ValueError, r'^Content encoding zstd needs the '):
+                compression.Compression(request_encoding='zstd')
+
+
+class CompressionTests(TestCase):
+
+    def test_accept_header(self):
+        self.assertEqual(compression.Compression(accept_encoding=['gzip']).accept_header,
+                         'gzip')
+        self.assertEqual(compression.Compression(accept_encoding=[]).accept_header, 'identity')
+        self.assertIn('gzip', compression.Compression().accept_header)
+
+    def test_encode(self):
+        policy = compression.Compression(request_encoding='gzip', min_size=10)
+
+        self.assertEqual(policy.encode(b'{}'), (b'{}', None))
+        (body, encoding) = policy.encode(b'{"a": 1}' * 10)
+        self.assertEqual(encoding, 'gzip')
+        self.assertEqual(compression.decompress(body, 'gzip'), b'{"a": 1}' * 10)
+
+        self.assertEqual(compression.Compression().encode(b'{"a": 1}' * 1000)[1], None)
+
+
+class CompressedClientTests(TestCase):
+
+    def setUp(self):
+        self.server = LocalTestServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def make_client(self, **options):
+        client = RestApiClient(self.server.host, port=self.server.port,
+                               compression=compression.Compression(**options))
+        self.addCleanup(client.close)
+        return client
+
+    def test_compressed_request_body(self):
+        client = self.make_client(request_encoding='gzip')
+        with mock.patch('testharness.rest_api.clients.base.decompress') as decompress:
+            response = client.post('/v1/test/object', PAYLOAD)
+        decompress.assert_not_called()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['body'], PAYLOAD)
+        self.assertEqual(response.request.headers['Content-Encoding'], 'gzip')
+
+        timing = response.timing
+        self.assertEqual(timing.request_bytes, len(client.codec.dumps(PAYLOAD)))
+        self.assertLess(timing.request_wire_bytes, timing.request_bytes / 5)
+
+    def test_small_request_body_uncompressed(self):
+        client = self.make_client(request_encoding='gzip')
+        response = client.post('/v1/test/object', {'code': 'asdf'})
+
+        self.assertNotIn('Content-Encoding', response.request.headers)
+        self.assertEqual(response.timing.request_wire_bytes, response.timing.request_bytes)
+
+    def test_compressed_response(self):
+        client = self.make_client(accept_encoding=['gzip'])
+        response = client.post('/v1/test/gzip', PAYLOAD)
+
+        self.assertEqual(response.request.headers['Accept-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.json()['body'], PAYLOAD)
+
+        timing = response.timing
+        self.assertEqual(timing.response_bytes, len(response.content))
+        self.assertLess(timing.response_wire_bytes, timing.response_bytes / 5)
+
+        histogram = client.metrics.histogram('POST /v1/test/gzip')
+        self.assertEqual(histogram.response_wire_bytes, timing.response_wire_bytes)
+        self.assertGreater(histogram.response_savings, 0.8)
+
+    def test_identity_response(self):
+        client = self.make_client(accept_encoding=['identity'])
+        response = client.get('/v1/test/gzip')
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.timing.response_wire_bytes, response.timing.response_bytes)
@@ -0,0 +1,182 @@
+import io
+import json
+import threading
+import unittest
+
+from unittest import TestCase
+
+from testharness.rest_api import testcases
+from testharness.rest_api.clients.live import RestApiClient
+from testharness.rest_api.fixtures import (Fixture, FixtureError, FixtureRegistry, PhaseTimes,
+                                           fixture_stages)
+from testharness.rest_api.runner import ParallelTestRunner
+
+from .clients.http_server import JsonTestHandler, LocalTestServer
+
+
+class FixtureTestHandler(JsonTestHandler):
+    """ Create objects with increasing ids, and record every POST and DELETE. """
+
+    lock = threading.Lock()
+    next_id = 0
+    requests = []
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.next_id = 0
+            cls.requests = []
+
+    @classmethod
+    def _new_object(cls, payload):
+        with cls.lock:
+            cls.next_id += 1
+            return dict(payload, id=cls.next_id)
+
+    def do_POST(self):
+        body = json.loads(self._read_body().decode('utf8'))
+        with self.lock:
+            self.requests.append(('POST', self.path))
+        if self.path == '/v1/fail':
+            self._send_json(500, {'error': 'nope'})
+        elif self.path.endswith('/bulk'):
+            self._send_json(201, [self._new_object(payload) for payload in body])
+        elif self.path == '/v1/located':
+            self.send_response(201)
+            self.send_header('Location', '/v1/located/{}'.format(
+                self._new_object(body)['id']))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self._send_json(201, self._new_object(body))
+
+    def do_DELETE(self):
+        with self.lock:
+            self.requests.append(('DELETE', self.path))
+        super().do_DELETE()
+
+
+FIXTURES = {
+    'owner': Fixture('/v1/owners', {'name': 'owner'}),
+    'things': Fixture('/v1/things', lambda created: [
+        {'owner': created['owner'][0]['id'], 'n': n} for n in range(5)],
+        bulk_url='/v1/things/bulk', after='owner'),
+    'tags': Fixture('/v1/tags', [{'tag': 'a'}, {'tag': 'b'}], after=['owner']),
+    'located': Fixture('/v1/located', {'name': 'x'}),
+}
+
+
+class FixtureStagesTests(TestCase):
+
+    def test_stages(self):
+        self.assertEqual(fixture_stages(FIXTURES), [['owner', 'located'], ['things', 'tags']])
+
+    def test_bad_dependencies(self):
+        with self.assertRaisesRegex(ValueError, r'^Fixture "a" is after unknown fixture "b"'):
+            fixture_stages({'a': Fixture('/v1/a', {}, after='b')})
+
+        with self.assertRaisesRegex(ValueError, r'^Fixtures depend on each other: a, b'):
+            fixture_stages({'a': Fixture('/v1/a', {}, after='b'),
+                            'b': Fixture('/v1/b', {}, after='a')})
+
+
+class FixtureRegistryTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalTestServer(FixtureTestHandler).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        FixtureTestHandler.reset()
+        self.client = RestApiClient(self.server.host, port=self.server.port)
+        self.addCleanup(self.client.close)
+        self.registry = FixtureRegistry(self.client, max_workers=4)
+
+    def test_create_and_teardown(self):
+        self.registry.create(FIXTURES)
+
+        owner_id = self.registry['owner'][0]['id']
+        self.assertEqual([thing['owner'] for thing in self.registry['things']], [owner_id] * 5)
+        self.assertEqual([thing['n'] for thing in self.registry['things']], list(range(5)))
+        self.assertEqual([tag['tag'] for tag in self.registry['tags']], ['a', 'b'])
+        self.assertIsNone(self.registry['located'][0])
+        self.assertEqual(len(self.registry), 9)
+        self.assertEqual(FixtureTestHandler.requests.count(('POST', '/v1/things/bulk')), 1)
+        self.assertNotIn(('POST', '/v1/things'), FixtureTestHandler.requests)
+        self.assertGreater(self.registry.setup_time, 0.0)
+
+        self.assertEqual(self.registry.teardown(), 0)
+        deletes = [path for (method, path) in FixtureTestHandler.requests if method == 'DELETE']
+        self.assertEqual(len(deletes), 9)
+        self.assertEqual(sorted(path.rpartition('/')[0] for path in deletes[-2:]),
+                         ['/v1/located', '/v1/owners'])
+        self.assertIn('/v1/owners/{}'.format(owner_id), deletes[-2:])
+        self.assertEqual(len(self.registry), 0)
+        self.assertEqual(self.registry.teardown(), 0)
+
+    def test_failed_create_keeps_keys(self):
+        fixtures = {
+            'owner': Fixture('/v1/owners', {'name': 'owner'}),
+            'fail': Fixture('/v1/fail', [{}, {}], after='owner'),
+        }
+        with self.assertRaisesRegex(FixtureError, r'^Fixture "fail": POST /v1/fail answered'):
+            self.registry.create(fixtures)
+
+        self.assertEqual(len(self.registry), 1)
+        self.registry.teardown()
+        self.assertEqual(FixtureTestHandler.requests[-1], ('DELETE', '/v1/owners/1'))
+
+    def test_missing_key(self):
+        with self.assertRaisesRegex(FixtureError, r'no key "uuid" in the created object'):
+            self.registry.create({'owner': Fixture('/v1/owners', {}, key='uuid')})
+        self.assertEqual(len(self.registry), 0)
+
+
+class FixtureTestCase(testcases.LiveRestApiTestCase):
+    """ Create the FIXTURES on a local HTTP server for the class's tests. """
+
+    FIXTURES = FIXTURES
+
+    @classmethod
+    def setUpClass(cls):
+        FixtureTestHandler.reset()
+        cls.server = LocalTestServer(FixtureTestHandler).start()
+        cls.HOST = cls.server.host
+        cls.PORT = cls.server.port
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+    def test_owner(self):
+        self.assertEqual(self.fixtures['owner'][0]['name'], 'owner')
+
+    def test_things(self):
+        resp = self.client.route('/v1/things/{id}').get(id=self.fixtures['things'][0]['id'])
+        self.assertEqual(resp.status_code, 200)
+
+
+class LiveFixturesTests(TestCase):
+
+    def test_class_fixtures(self):
+        runner = ParallelTestRunner(workers=1, stream=io.StringIO())
+        result = runner.run(unittest.defaultTestLoader.loadTestsFromTestCase(FixtureTestCase))
+
+        self.assertTrue(result.wasSuccessful())
+        posts = [path for (method, path) in FixtureTestHandler.requests if method == 'POST']
+        deletes = [path for (method, path) in FixtureTestHandler.requests if method == 'DELETE']
+        self.assertEqual(len(posts), 5)
+        self.assertEqual(len(deletes), 9)
+
+        phases = FixtureTestCase.phase_times
+        self.assertIsInstance(phases, PhaseTimes)
+        self.assertTrue(all(seconds > 0.0 for seconds in phases))
+        (report,) = result.reports
+        self.assertEqual(report.phases, phases)
+        self.assertIn('setup ', runner.stream.getvalue())
@@ -0,0 +1,187 @@
+import contextlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+
+from unittest import TestCase
+
+from testharness.rest_api import history, testcases
+from testharness.rest_api.metrics import LatencyHistogram
+
+from .clients.http_server import LocalTestServer
+
+HOST = 'http://api.example.com:80'
+
+
+def histograms(p95, requests=100, endpoint=('GET', '/v1/things')):
+    """ a histogram of mostly 10 ms requests, and a slow tail at about p95 """
+    histogram = LatencyHistogram()
+    for n in range(requests):
+        histogram.add(p95 if n >= requests * 0.9 else 10.0)
+    return {endpoint: histogram}
+
+
+class HistoryStoreTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.path = os.path.join(tmp, 'history.db')
+        self.store = history.HistoryStore(self.path)
+        self.addCleanup(self.store.close)
+
+    def record_baseline(self, values, start=1000.0):
+        for (n, p95) in enumerate(values):
+            self.store.record(histograms(p95), HOST, key='run{}'.format(n), sha='abc',
+                              started=start + n)
+
+    def test_record_merges_run(self):
+        run_id = self.store.record(histograms(50.0), HOST, key='one', sha='abc')
+        self.assertEqual(self.store.record(histograms(50.0), HOST, key='one'), run_id)
+        self.assertNotEqual(self.store.record(histograms(50.0), 'http://other:80', key='one'),
+                            run_id)
+
+        (point,) = self.store.trend('GET /v1/things', host=HOST)
+        self.assertEqual((point.run_key, point.git_sha, point.requests), ('one', 'abc', 200))
+        self.assertAlmostEqual(point.p95, 50.0, delta=1.0)
+        self.assertAlmostEqual(point.p50, 10.0, delta=0.2)
+        self.assertEqual([run['host'] for run in self.store.runs()],
+                         ['http://other:80', HOST])
+
+    def test_compare(self):
+        self.record_baseline([100.0, 104.0, 96.0, 102.0, 98.0, 101.0])
+
+        slower = self.store.record(histograms(150.0), HOST, key='slower', started=2000.0)
+        (p95, p99) = self.store.compare(slower, window=5)
+        self.assertEqual((p95.metric, p95.runs), ('p95', 5))
+        self.assertTrue(p95.regressed)
+        self.assertGreater(p95.z, 3.0)
+        self.assertIn('REGRESSED  GET /v1/things p95', history.format_comparison(p95))
+
+        steady = self.store.record(histograms(103.0), HOST, key='steady', started=1999.0)
+        self.assertFalse(any(c.regressed for c in self.store.compare(steady)))
+
+    def test_compare_needs_baseline(self):
+        self.record_baseline([100.0, 100.0])
+        run_id = self.store.record(histograms(500.0), HOST, key='new', started=2000.0)
+
+        comparisons = self.store.compare(run_id, min_runs=5)
+        self.assertEqual([(c.z, c.runs, c.regressed) for c in comparisons],
+                         [(None, 2, False), (None, 2, False)])
+        self.assertTrue(history.format_comparison(comparisons[0]).startswith('NEW '))
+
+    def test_steady_slowdown_below_ratio(self):
+        self.record_baseline([100.0] * 10)
+        run_id = self.store.record(histograms(107.0), HOST, key='new', started=2000.0)
+
+        (p95, _) = self.store.compare(run_id, min_ratio=1.1)
+        self.assertGreater(p95.z, 3.0)
+        self.assertFalse(p95.regressed)
+
+    def test_trend_many_runs(self):
+        rng = random.Random(7)
+        endpoints = [('GET', '/v1/things/{}'.format(n)) for n in range(20)]
+        samples = [histograms(50.0 + n, requests=10)[('GET', '/v1/things')] for n in range(10)]
+        for n in range(2000):
+            self.store.record(dict((endpoint, rng.choice(samples)) for endpoint in endpoints),
+                              HOST, key='run{}'.format(n), sha='abc', started=float(n))
+
+        plan = ' '.join(row[-1] for row in self.store.db.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM endpoints WHERE method = ? AND rest_url = ? '
+            'AND started >= ? ORDER BY started DESC', ('GET', '/v1/things/3', 0.0)))
+        self.assertIn('endpoints_trend', plan)
+
+        start = time.perf_counter()
+        points = self.store.trend('GET /v1/things/3', since=1000.0)
+        run_id = self.store.runs(key='run1999')[0]['id']
+        comparisons = self.store.compare(run_id, window=100)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+        self.assertEqual(len(points), 1000)
+        self.assertEqual(points[0].run_key, 'run1999')
+        self.assertEqual(len(comparisons), 40)
+        self.assertEqual({c.runs for c in comparisons}, {100})
+
+
+class HistoryMainTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.path = os.path.join(tmp, 'history.db')
+
+    def main(self, *argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = history.main(list(argv))
+        return (status, out.getvalue())
+
+    def test_compare_and_trend(self):
+        with history.HistoryStore(self.path) as store:
+            for n in range(6):
+                store.record(histograms(100.0 + n % 2), HOST, key='run{}'.format(n),
+                             sha='abc', started=1000.0 + n)
+
+            (status, out) = self.main('compare', '--history', self.path)
+            self.assertEqual(status, 0)
+            self.assertIn('Run run5 on {} (git abc)'.format(HOST), out)
+            self.assertIn('0 regressions', out)
+
+            store.record(histograms(300.0), HOST, key='run6', sha='def', started=2000.0)
+
+        (status, out) = self.main('compare', '--history', self.path, '--z', '4')
+        self.assertEqual(status, 1)
+        self.assertIn('REGRESSED  GET /v1/things p95', out)
+        self.assertIn('2 regressions', out)
+
+        (status, out) = self.main('trend', '--history', self.path, 'GET /v1/things', '-n', '2')
+        self.assertEqual(status, 0)
+        self.assertEqual(len(out.splitlines()), 2)
+        self.assertIn('def', out.splitlines()[0])
+
+    def test_missing_history(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            self.main('compare', '--history', self.path)
+
+
+class HistoryTestCase(testcases.LiveRestApiTestCase):
+    """ Append the class's endpoint histograms to a history file. """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalTestServer().start()
+        cls.HOST = cls.server.host
+        cls.PORT = cls.server.port
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+    def test_get(self):
+        self.assertEqual(self.client.get('/v1/test/object').status_code, 200)
+
+
+class LiveHistoryTests(TestCase):
+
+    def test_class_history(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, 'history.db')
+
+        test_class = type('HistoryTestCase', (HistoryTestCase,), {'HISTORY': path})
+        suite = unittest.defaultTestLoader.loadTestsFromTestCase(test_class)
+        self.assertTrue(unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+                        .wasSuccessful())
+
+        with history.HistoryStore(path) as store:
+            (run,) = store.runs()
+            self.assertEqual((run['run_key'], run['host']), (history.run_key(),
+                                                             test_class.client.host_url))
+            (point,) = store.trend('GET /v1/test/object')
+        self.assertEqual(point.requests, 1)
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+
+from unittest import TestCase
+
+from testharness.rest_api import async_testcases, clients, testcases
+from testharness.rest_api.clients import live
+
+# Import time budget of "testharness.rest_api.testcases" in a unittest worker (milliseconds).
+IMPORT_BUDGET_MS = 50.0
+
+# Modules only the client backends need.
+HEAVY_MODULES = ['asyncio', 'flask', 'requests', 'urllib3']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+
+
+def fresh_import(module):
+    """ import a module in a fresh interpreter that already imported unittest
+
+    :returns: tuple (import milliseconds, heavy modules it imported)
+    """
+
+    code = '\n'.join([
+        'import json, sys, time, unittest',
+        'start = time.perf_counter()',
+        'import {}'.format(module),
+        'elapsed = (time.perf_counter() - start) * 1000.0',
+        'heavy = [m for m in {!r} if m in sys.modules]'.format(HEAVY_MODULES),
+        'print(json.dumps([elapsed, heavy]))',
+    ])
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    output = subprocess.check_output([sys.executable, '-c', code], env=env, cwd=ROOT)
+    return tuple(json.loads(output.decode('utf8')))
+
+
+class ImportTimeTests(TestCase):
+
+    def test_testcases_import_budget(self):
+        runs = [fresh_import('testharness.rest_api.testcases') for n in range(3)]
+
+        self.assertEqual(runs[0][1], [])
+        best = min(elapsed for (elapsed, heavy) in runs)
+        self.assertLess(best, IMPORT_BUDGET_MS,
+                        'testcases import took {:.1f} ms'.format(best))
+
+    def test_clients_package_is_lazy(self):
+        (elapsed, heavy) = fresh_import('testharness.rest_api.clients')
+        self.assertEqual(heavy, [])
+
+
+class LazyImportTests(TestCase):
+
+    def test_lazy_client_attribute(self):
+        self.assertIs(clients.RestApiClient, live.RestApiClient)
+        self.assertIn('AsyncRestApiClient', dir(clients))
+
+        with self.assertRaisesRegex(AttributeError, r"has no attribute 'NoClient'"):
+            clients.NoClient
+
+    def test_lazy_async_test_case(self):
+        self.assertIs(testcases.AsyncLiveRestApiTestCase,
+                      async_testcases.AsyncLiveRestApiTestCase)
+
+        with self.assertRaises(AttributeError):
+            testcases.NoTestCase
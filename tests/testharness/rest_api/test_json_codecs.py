@@ -0,0 +1,41 @@
+from unittest import TestCase, mock, skipIf
+
+from testharness.rest_api import json_codecs
+from testharness.rest_api.clients import base
+
+
+class JsonCodecTests(TestCase):
+
+    def test_stdlib_round_trip(self):
+        codec = json_codecs.get_codec('json')
+
+        self.assertEqual(codec.dumps({'code': 'asdf'}), b'{"code": "asdf"}')
+        self.assertEqual(codec.loads(b'{"code": "asdf"}'), {'code': 'asdf'})
+        self.assertEqual(codec.request_body({'a': 1}), {'json': {'a': 1}})
+
+    @skipIf(json_codecs.orjson is None, 'orjson codec requires orjson')
+    def test_orjson_round_trip(self):
+        codec = json_codecs.get_codec('orjson')
+
+        self.assertEqual(codec.dumps({'code': 'asdf'}), b'{"code":"asdf"}')
+        self.assertEqual(codec.loads(b'{"code": "asdf"}'), {'code': 'asdf'})
+        self.assertEqual(codec.request_body({'a': 1}), {'data': b'{"a":1}'})
+
+    def test_auto_falls_back_to_stdlib(self):
+        with mock.patch.object(json_codecs, 'orjson', None):
+            self.assertIsInstance(json_codecs.get_codec(), json_codecs.StdlibJsonCodec)
+            with self.assertRaisesRegex(ImportError, r'pip install orjson'):
+                json_codecs.get_codec('orjson')
+
+    def test_codec_instance_and_unknown(self):
+        codec = json_codecs.StdlibJsonCodec()
+
+        self.assertIs(json_codecs.get_codec(codec), codec)
+        with self.assertRaisesRegex(ValueError, r'^Unknown JSON codec: yaml'):
+            json_codecs.get_codec('yaml')
+
+    def test_client_json(self):
+        client = base.BaseRestApiClient('test.example.com', codec='json')
+
+        self.assertEqual(client.json(mock.MagicMock(content=b'[1, 2]')), [1, 2])
+        self.assertEqual(client.json(mock.MagicMock(spec=['data'], data=b'{}')), {})
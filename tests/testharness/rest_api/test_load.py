@@ -0,0 +1,134 @@
+import io
+import json
+import os
+import tempfile
+
+from unittest import TestCase, mock
+
+from testharness.rest_api import load
+
+from .clients.http_server import LocalTestServer
+from . import load_samples
+
+
+class LoadHelperTests(TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(load.percentile(values, 50), 50)
+        self.assertEqual(load.percentile(values, 90), 90)
+        self.assertEqual(load.percentile(values, 99.9), 100)
+        self.assertEqual(load.percentile([7], 50), 7)
+        self.assertIsNone(load.percentile([], 50))
+
+    def test_latency_recorder_stats(self):
+        recorder = load.LatencyRecorder()
+        for n in range(1, 11):
+            recorder.record('GET /v1/test', n / 1000.0, error=(n == 10))
+
+        [stats] = recorder.stats(2.0)
+
+        self.assertEqual(stats.endpoint, 'GET /v1/test')
+        self.assertEqual(stats.requests, 10)
+        self.assertEqual(stats.errors, 1)
+        self.assertEqual(stats.requests_per_sec, 5.0)
+        self.assertEqual(stats.error_rate, 0.1)
+        self.assertAlmostEqual(stats.p50, 5.0)
+        self.assertAlmostEqual(stats.p999, 10.0)
+
+    def test_timed_client_records_errors(self):
+        recorder = load.LatencyRecorder()
+        client = mock.MagicMock()
+        client.get.return_value = mock.MagicMock(status_code=503)
+        client.delete.side_effect = ConnectionError('down')
+
+        timed = load._TimedClient(client, recorder)
+        timed.get('/v1/test', {'a': 1})
+        with self.assertRaises(ConnectionError):
+            timed.delete('/v1/test', 'asdf')
+
+        client.get.assert_called_once_with('/v1/test', {'a': 1})
+        self.assertIs(timed.host_url, client.host_url)
+        self.assertEqual(recorder.errors, {'GET /v1/test': 1, 'DELETE /v1/test': 1})
+
+    def test_request_pacer_spaces_requests(self):
+        pacer = load.RequestPacer(100.0)
+
+        with mock.patch('time.sleep') as sleep:
+            for _ in range(3):
+                pacer.wait()
+
+        delays = [call[0][0] for call in sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertAlmostEqual(delays[0], 0.01, delta=0.005)
+        self.assertAlmostEqual(delays[1], 0.02, delta=0.005)
+
+    def test_timed_client_waits_for_pacer(self):
+        pacer = mock.MagicMock()
+        inner = mock.MagicMock()
+        inner.get.return_value = inner.post.return_value = mock.MagicMock(status_code=200)
+        client = load._TimedClient(inner, load.LatencyRecorder(), pacer=pacer)
+
+        client.get('/v1/test')
+        client.post('/v1/test', {})
+
+        self.assertEqual(pacer.wait.call_count, 2)
+
+    def test_needs_duration_or_iterations(self):
+        with self.assertRaisesRegex(ValueError, r'duration or an iteration count'):
+            load.LoadRunner(load_samples.SampleLoadCase)
+
+
+class LoadRunnerTests(TestCase):
+
+    def setUp(self):
+        self.server = LocalTestServer().start()
+        patcher = mock.patch.multiple(load_samples.SampleLoadCase, HOST=self.server.host,
+                                      PORT=self.server.port)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_run_iterations(self):
+        runner = load.LoadRunner(load_samples.SampleLoadCase, concurrency=4, iterations=30)
+
+        report = runner.run()
+
+        self.assertEqual(report.iterations, 30)
+        self.assertEqual(report.failures, 10)
+        self.assertEqual([(s.endpoint, s.requests) for s in sorted(report.endpoints)],
+                         [('GET /v1/test/object', 10), ('POST /v1/test/object', 20)])
+        self.assertEqual(report.requests, 30)
+        for stats in report.endpoints:
+            self.assertEqual(stats.errors, 0)
+            self.assertGreater(stats.p99, 0.0)
+        self.assertIn('GET /v1/test/object', report.format())
+        self.assertNotIn('client', vars(load_samples.SampleLoadCase))
+
+    def test_run_duration_at_rate(self):
+        runner = load.LoadRunner(load_samples.SampleLoadCase, test_names=['test_get_object'],
+                                 concurrency=2, duration=0.5, rate=20)
+
+        report = runner.run()
+
+        # The pacer meters requests, not test runs; allow one request per worker in flight.
+        self.assertEqual(report.failures, 0)
+        self.assertGreaterEqual(report.requests, 5)
+        self.assertLessEqual(report.requests, 20 * report.wall_time + runner.concurrency + 1)
+        self.assertEqual(report.endpoints[0].endpoint, 'GET /v1/test/object')
+
+    def test_main_json(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'load.json')
+            with mock.patch('sys.stdout', new_callable=io.StringIO):
+                status = load.main([load_samples.__name__ + '.SampleLoadCase',
+                                    'test_get_object', '-c', '2', '-n', '6', '--json', path])
+            with open(path) as f:
+                report = json.load(f)
+
+        self.assertEqual(status, 0)
+        self.assertEqual(report['iterations'], 6)
+        self.assertEqual(report['endpoints'][0]['endpoint'], 'GET /v1/test/object')
@@ -0,0 +1,108 @@
+from unittest import TestCase
+
+from testharness.rest_api import metrics
+
+
+def make_timing(method='GET', rest_url='/v1/test', status_code=200, total=0.010,
+                request_bytes=0, response_bytes=100):
+    return metrics.RequestTiming(method, rest_url, 'http://test.example.com:80' + rest_url,
+                                 status_code, 0.0, 0.0, total, total,
+                                 request_bytes, response_bytes)
+
+
+class LatencyHistogramTests(TestCase):
+
+    def test_empty(self):
+        histogram = metrics.LatencyHistogram()
+
+        self.assertEqual(histogram.count, 0)
+        self.assertIsNone(histogram.mean)
+        self.assertIsNone(histogram.percentile(95))
+
+    def test_percentiles_within_precision(self):
+        histogram = metrics.LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.add(float(ms))
+
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.mean, 500.5)
+        self.assertEqual(histogram.max, 1000.0)
+        for (pct, expected) in ((50, 500.0), (95, 950.0), (99, 990.0)):
+            self.assertGreaterEqual(histogram.percentile(pct), expected)
+            self.assertLessEqual(histogram.percentile(pct), expected * 1.02)
+        self.assertEqual(histogram.percentile(100), 1000.0)
+
+    def test_constant_memory(self):
+        histogram = metrics.LatencyHistogram()
+        for n in range(100000):
+            histogram.add(10.0 + (n % 100) / 10.0)
+
+        self.assertLessEqual(len(histogram.buckets), 36)
+
+    def test_merge(self):
+        (first, second) = (metrics.LatencyHistogram(), metrics.LatencyHistogram())
+        first.add(1.0, error=True, request_bytes=10, response_bytes=20)
+        second.add(3.0, response_bytes=5)
+
+        merged = metrics.LatencyHistogram().merge(first).merge(second)
+
+        self.assertEqual(merged.count, 2)
+        self.assertEqual(merged.errors, 1)
+        self.assertEqual(merged.max, 3.0)
+        self.assertEqual(merged.request_bytes, 10)
+        self.assertEqual(merged.response_bytes, 25)
+
+
+class HistogramMetricsSinkTests(TestCase):
+
+    def test_endpoint_key(self):
+        self.assertEqual(metrics.endpoint_key('get /v1/test'), ('GET', '/v1/test'))
+        self.assertEqual(metrics.endpoint_key('/v1/test'), (None, '/v1/test'))
+
+    def test_is_error(self):
+        self.assertFalse(metrics.is_error(make_timing(status_code=404)))
+        self.assertTrue(metrics.is_error(make_timing(status_code=503)))
+        self.assertTrue(metrics.is_error(make_timing(status_code=None)))
+        self.assertFalse(metrics.is_error(make_timing(status_code='n/a')))
+
+    def test_record_per_endpoint(self):
+        sink = metrics.HistogramMetricsSink()
+        sink.record(make_timing(total=0.010))
+        sink.record(make_timing(total=0.030, status_code=500))
+        sink.record(make_timing(method='POST', total=0.020, request_bytes=42))
+
+        self.assertEqual(sink.histogram('GET /v1/test').count, 2)
+        self.assertEqual(sink.histogram('POST /v1/test').request_bytes, 42)
+        self.assertEqual(sink.histogram('/v1/test').count, 3)
+        self.assertEqual(sink.histogram('DELETE /v1/test').count, 0)
+
+        summary = {(s.method, s.rest_url): s for s in sink.summary()}
+        get_summary = summary[('GET', '/v1/test')]
+        self.assertEqual(get_summary.requests, 2)
+        self.assertEqual(get_summary.errors, 1)
+        self.assertAlmostEqual(get_summary.max, 30.0)
+        self.assertEqual(get_summary.response_bytes, 200)
+        self.assertEqual(get_summary.response_wire_bytes, 200)
+
+    def test_wire_bytes(self):
+        sink = metrics.HistogramMetricsSink()
+        sink.record(make_timing(response_bytes=100)._replace(response_wire_bytes=20))
+        sink.record(make_timing(response_bytes=100))
+
+        histogram = sink.histogram('GET /v1/test')
+        self.assertEqual((histogram.response_bytes, histogram.response_wire_bytes), (200, 120))
+        self.assertAlmostEqual(histogram.response_savings, 0.4)
+        self.assertIsNone(metrics.LatencyHistogram().response_savings)
+
+    def test_reset(self):
+        sink = metrics.HistogramMetricsSink()
+        sink.record(make_timing())
+        sink.reset()
+
+        self.assertEqual(sink.summary(), [])
+
+    def test_base_sink_not_implemented(self):
+        with self.assertRaisesRegex(NotImplementedError, r'must record timings'):
+            metrics.MetricsSink().record(make_timing())
+
+        metrics.NullMetricsSink().record(make_timing())
@@ -0,0 +1,130 @@
+import json
+import threading
+
+from unittest import TestCase, mock
+
+from testharness.rest_api import pagination
+from testharness.rest_api.clients import base
+from testharness.rest_api.clients.live import RestApiClient
+
+from .clients.http_server import LocalTestServer
+
+
+def page_response(body, headers={}):
+    return mock.MagicMock(json=mock.MagicMock(return_value=body), headers=headers,
+                          content=json.dumps(body).encode('utf8'))
+
+
+class PaginationStrategyTests(TestCase):
+
+    def test_offset(self):
+        strategy = pagination.OffsetPagination(limit=2)
+        page = strategy.first_page('/v1/test', {'q': 'x'})
+
+        self.assertEqual(page, ('/v1/test', {'q': 'x', 'offset': 0, 'limit': 2}))
+        self.assertEqual(strategy.next_page(page, None, [1, 2]),
+                         ('/v1/test', {'q': 'x', 'offset': 2, 'limit': 2}))
+        self.assertIsNone(strategy.next_page(page, None, [1]))
+
+    def test_page_number(self):
+        strategy = pagination.PagePagination(size_param='per_page', page_size=2)
+        page = strategy.first_page('/v1/test', {})
+
+        self.assertEqual(page, ('/v1/test', {'page': 1, 'per_page': 2}))
+        self.assertEqual(strategy.next_page(page, None, [1, 2])[1]['page'], 2)
+        self.assertIsNone(strategy.next_page(page, None, [1]))
+        self.assertIsNone(pagination.PagePagination().next_page(page, None, []))
+
+    def test_cursor(self):
+        strategy = pagination.CursorPagination(cursor_key='meta.next')
+        page = strategy.first_page('/v1/test', {})
+        resp = page_response({'items': [1], 'meta': {'next': 'abc'}})
+
+        self.assertEqual(strategy.page_items(resp), [1])
+        self.assertEqual(strategy.next_page(page, resp, [1]), ('/v1/test', {'cursor': 'abc'}))
+        self.assertIsNone(strategy.next_page(page, page_response({'items': []}), []))
+
+    def test_link_header(self):
+        strategy = pagination.LinkHeaderPagination()
+        resp = page_response([1], headers={
+            'Link': '<http://a.example.com/v1/test?page=2>; rel="next", '
+                    '<http://a.example.com/v1/test?page=9>; rel="last"'})
+
+        self.assertEqual(strategy.page_items(resp), [1])
+        self.assertEqual(strategy.next_page(('/v1/test', {}), resp, [1]),
+                         ('/v1/test', {'page': '2'}))
+        self.assertIsNone(strategy.next_page(('/v1/test', {}), page_response([1]), [1]))
+
+    def test_items_not_a_list(self):
+        with self.assertRaisesRegex(ValueError, r'set items_key'):
+            pagination.OffsetPagination().page_items(page_response({'items': []}))
+
+
+class PaginateTests(TestCase):
+
+    def test_prefetch_next_page(self):
+        client = base.BaseRestApiClient('test.example.com')
+        requested = []
+        second_requested = threading.Event()
+
+        def get(rest_url, query):
+            requested.append(query['offset'])
+            if query['offset'] == 2:
+                second_requested.set()
+            return page_response([query['offset'], query['offset'] + 1][:4 - query['offset']])
+
+        with mock.patch.object(client, 'get', side_effect=get):
+            items = client.paginate('/v1/test', strategy=pagination.OffsetPagination(limit=2))
+            self.assertEqual(next(items), 0)
+            self.assertTrue(second_requested.wait(1.0))
+            self.assertEqual(list(items), [1, 2, 3])
+
+        self.assertEqual(requested, [0, 2, 4])
+
+    def test_no_prefetch(self):
+        client = base.BaseRestApiClient('test.example.com')
+
+        with mock.patch.object(client, 'get', return_value=page_response([])) as mock_get:
+            self.assertEqual(list(client.paginate('/v1/test', prefetch=False)), [])
+
+        mock_get.assert_called_once_with('/v1/test', {'offset': 0, 'limit': 100})
+
+
+class PaginateServerTests(TestCase):
+    """ Paginate Server Tests.
+
+    Walk a 25 item collection on a local HTTP server with each strategy.
+    """
+
+    def setUp(self):
+        self.server = LocalTestServer().start()
+        self.client = RestApiClient(self.server.host, port=self.server.port)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def assertWalk(self, strategy, query={'total': 25}):
+        items = self.client.paginate('/v1/test/items', query, strategy=strategy)
+        self.assertEqual([item['id'] for item in items], list(range(25)))
+
+    def test_offset(self):
+        self.assertWalk(pagination.OffsetPagination(limit=10, items_key='items'))
+
+    def test_page_number(self):
+        self.assertWalk(pagination.PagePagination(size_param='per_page', page_size=10,
+                                                  items_key='items'))
+
+    def test_cursor(self):
+        self.assertWalk(pagination.CursorPagination())
+
+    def test_page_decoded_once(self):
+        with mock.patch.object(self.client.codec, 'loads',
+                               wraps=self.client.codec.loads) as loads:
+            self.assertWalk(pagination.CursorPagination())
+        self.assertEqual(loads.call_count,
+                         self.client.metrics.histogram('GET /v1/test/items').count)
+
+    def test_link_header(self):
+        self.assertWalk(pagination.LinkHeaderPagination(items_key='items'))
+        self.assertEqual(self.client.metrics.histogram('GET /v1/test/items').count, 3)
@@ -0,0 +1,120 @@
+import cProfile
+import io
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from unittest import TestCase, mock
+
+from testharness.rest_api import profiling, testcases
+
+from .clients.http_server import LocalTestServer
+
+
+def leaf():
+    return sum(range(20000))
+
+
+def branch():
+    return [leaf() for n in range(3)]
+
+
+class ProfileModesTests(TestCase):
+
+    def test_modes(self):
+        self.assertEqual(profiling.profile_modes(None), ())
+        self.assertEqual(profiling.profile_modes('off'), ())
+        self.assertEqual(profiling.profile_modes('all'), ('cpu', 'memory'))
+        self.assertEqual(profiling.profile_modes('memory, CPU'), ('cpu', 'memory'))
+        self.assertEqual(profiling.profile_modes('memory'), ('memory',))
+
+        with self.assertRaisesRegex(ValueError, r'^Unknown profile mode: disk'):
+            profiling.profile_modes('cpu,disk')
+
+    def test_off(self):
+        with mock.patch.dict(os.environ, {'TESTHARNESS_PROFILE': '0'}):
+            self.assertIsNone(profiling.get_profiler())
+
+
+class CollapsedStacksTests(TestCase):
+
+    def test_stacks(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        branch()
+        profile.disable()
+
+        stacks = profiling.collapsed_stacks(pstats.Stats(profile))
+        (stack,) = [stack for stack in stacks
+                    if stack.endswith(':leaf;<built-in method builtins.sum>')]
+        self.assertRegex(stack, r'^test_profiling\.py:\d+:branch;')
+        self.assertTrue(all(value > 0 for value in stacks.values()))
+
+
+class ProfiledTestCase(testcases.LiveRestApiTestCase):
+    """ Profile the tests against a local HTTP server. """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalTestServer().start()
+        cls.HOST = cls.server.host
+        cls.PORT = cls.server.port
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+    def test_get(self):
+        for n in range(2):
+            resp = self.client.get('/v1/test/object')
+            self.assertEqual(self.client.json(resp)['method'], 'GET')
+        branch()
+
+
+class LiveProfilingTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def run_class(self, environ):
+        with mock.patch.dict(os.environ, environ), \
+                mock.patch.object(profiling, '_profiler', None):
+            suite = unittest.defaultTestLoader.loadTestsFromTestCase(ProfiledTestCase)
+            result = unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+            profiler = profiling._profiler
+        if profiler is not None:
+            profiler.stop()
+        self.assertTrue(result.wasSuccessful())
+        return profiler
+
+    def test_profiled(self):
+        profiler = self.run_class({'TESTHARNESS_PROFILE': 'all',
+                                   'TESTHARNESS_PROFILE_DIR': self.tmp})
+
+        test_id = ProfiledTestCase('test_get').id()
+        self.assertEqual(profiler.endpoints['GET /v1/test/object'].calls, 2)
+        self.assertEqual(profiler.tests[test_id].calls, 1)
+        self.assertGreater(profiler.tests[test_id].cpu, 0.0)
+
+        with open(os.path.join(self.tmp, 'tests', test_id + '.collapsed')) as f:
+            collapsed = f.read()
+        self.assertIn(':branch;', collapsed)
+        self.assertIn(':profiled_request;', collapsed)
+        pstats.Stats(os.path.join(self.tmp, 'endpoints',
+                                  'GET_v1_test_object.{}.prof'.format(os.getpid())))
+
+        with open(os.path.join(self.tmp, 'summary.{}.txt'.format(os.getpid()))) as f:
+            summary = f.read()
+        self.assertIn('GET /v1/test/object', summary)
+        self.assertIn('Top allocation sites:', summary)
+
+    def test_disabled(self):
+        self.assertIsNone(self.run_class({'TESTHARNESS_PROFILE': ''}))
+        self.assertIsNone(ProfiledTestCase._profiler)
+        self.assertNotIn('request', vars(ProfiledTestCase.client))
+        self.assertEqual(os.listdir(self.tmp), [])
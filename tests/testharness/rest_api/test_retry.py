@@ -0,0 +1,180 @@
+from unittest import TestCase, mock
+
+from testharness.rest_api import retry
+from testharness.rest_api.clients import base
+from testharness.rest_api.clients.live import RestApiClient
+
+from .clients.http_server import LocalTestServer
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = retry.CircuitBreaker('http://down.example.com:80', failure_threshold=2,
+                                            reset_timeout=10.0, clock=self.clock)
+
+    def test_opens_after_threshold(self):
+        self.breaker.record(True)
+        self.breaker.check('http://down.example.com:80/v1')
+
+        with self.assertLogs('testharness.rest_api.retry', level='WARNING'):
+            self.breaker.record(True)
+
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaisesRegex(retry.CircuitOpenError, r'Circuit open .* not sent'):
+            self.breaker.check('http://down.example.com:80/v1')
+
+    def test_half_open_trial(self):
+        for _ in range(2):
+            self.breaker.record(True)
+        self.clock.now = 10.0
+
+        with self.assertLogs('testharness.rest_api.retry', level='WARNING'):
+            self.breaker.check('http://down.example.com:80/v1')
+            self.breaker.record(True)
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.breaker.trips, 2)
+
+        self.clock.now = 20.0
+        with self.assertLogs('testharness.rest_api.retry', level='WARNING'):
+            self.breaker.check('http://down.example.com:80/v1')
+            self.breaker.record(False)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_shared_per_host(self):
+        self.assertIs(retry.circuit_breaker('http://shared.example.com:80'),
+                      retry.circuit_breaker('http://shared.example.com:80'))
+
+
+class RetryPolicyTests(TestCase):
+
+    def setUp(self):
+        self.policy = retry.RetryPolicy(max_attempts=3, backoff=0.01, failure_threshold=0)
+
+    def test_delay_backoff(self):
+        policy = retry.RetryPolicy(backoff=0.5, backoff_max=1.5, jitter=False)
+
+        self.assertEqual([policy.delay(n) for n in (1, 2, 3, 4)], [0.5, 1.0, 1.5, 1.5])
+        self.assertLessEqual(retry.RetryPolicy(backoff=0.5).delay(2), 1.0)
+
+    def test_retry_status_until_success(self):
+        responses = [mock.MagicMock(status_code=503), mock.MagicMock(status_code=200)]
+
+        with self.assertLogs('testharness.rest_api.retry', level='WARNING') as logs, \
+                mock.patch('time.sleep') as sleep:
+            resp = self.policy.send('GET', 'http://a/v1', 'http://a', iter(responses).__next__)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertIn('attempt 1 of 3 failed: status', logs.output[0])
+
+    def test_retry_errors_then_raise(self):
+        send = mock.MagicMock(side_effect=ConnectionError('refused'))
+
+        with self.assertLogs('testharness.rest_api.retry', level='WARNING'), \
+                mock.patch('time.sleep'), self.assertRaises(ConnectionError):
+            self.policy.send('GET', 'http://a/v1', 'http://a', send)
+
+        self.assertEqual(send.call_count, 3)
+
+    def test_no_retry_for_post(self):
+        send = mock.MagicMock(return_value=mock.MagicMock(status_code=503))
+
+        resp = self.policy.send('POST', 'http://a/v1', 'http://a', send)
+
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(send.call_count, 1)
+
+    def test_budget(self):
+        policy = retry.RetryPolicy(max_attempts=10, backoff=5.0, jitter=False, budget=1.0,
+                                   failure_threshold=0)
+        send = mock.MagicMock(return_value=mock.MagicMock(status_code=504))
+
+        with self.assertLogs('testharness.rest_api.retry', level='WARNING') as logs:
+            resp = policy.send('GET', 'http://a/v1', 'http://a', send)
+
+        self.assertEqual(resp.status_code, 504)
+        self.assertEqual(send.call_count, 1)
+        self.assertIn('Retry budget', logs.output[0])
+
+    def test_breaker_trial_error_not_retried(self):
+        clock = FakeClock()
+        breaker = retry.CircuitBreaker('http://a', failure_threshold=1, reset_timeout=10.0,
+                                       clock=clock)
+        policy = retry.RetryPolicy(max_attempts=1)
+        policy.breaker = lambda host_url: breaker
+
+        with self.assertLogs('testharness.rest_api.retry', level='WARNING'):
+            with self.assertRaises(OSError):
+                policy.send('GET', 'http://a/v1', 'http://a',
+                            mock.MagicMock(side_effect=OSError('refused')))
+            self.assertEqual(breaker.state, 'open')
+
+            clock.now = 10.0
+            with self.assertRaises(ValueError):
+                policy.send('GET', 'http://a/v1', 'http://a',
+                            mock.MagicMock(side_effect=ValueError('bad')))
+        self.assertEqual(breaker.state, 'open')
+        self.assertEqual(breaker.trips, 2)
+
+
+class RetryClientTests(TestCase):
+    """ Retry Client Tests.
+
+    Prove the client retries and trips its breaker on a stopped local server.
+    """
+
+    def setUp(self):
+        self.server = LocalTestServer().start()
+        self.client = RestApiClient(self.server.host, port=self.server.port,
+                                    retry=retry.RetryPolicy(max_attempts=2, backoff=0.01,
+                                                            failure_threshold=3))
+
+    def tearDown(self):
+        self.client.close()
+        retry.circuit_breaker(self.client.host_url).reset()
+
+    def test_success_no_retry(self):
+        response = self.client.get('/v1/test/object')
+        self.server.stop()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.metrics.histogram('GET /v1/test/object').count, 1)
+
+    def test_breaker_fails_fast(self):
+        self.server.stop()
+
+        with self.assertLogs('testharness.rest_api.retry', level='WARNING') as logs:
+            with self.assertRaises(OSError):
+                self.client.get('/v1/test/object')
+            with self.assertRaises(retry.CircuitOpenError):
+                self.client.get('/v1/test/object')
+            with self.assertRaises(retry.CircuitOpenError):
+                self.client.delete('/v1/test/object', 1)
+
+        self.assertTrue(any('Circuit open' in line for line in logs.output))
+        self.assertEqual(self.client.metrics.histogram('GET /v1/test/object').count, 3)
+
+    def test_base_client_retries(self):
+        policy = retry.RetryPolicy(backoff=0.0, failure_threshold=0)
+        client = base.BaseRestApiClient('test.example.com', retry=policy)
+        send = mock.MagicMock(side_effect=[TimeoutError('slow'),
+                                           mock.MagicMock(status_code=200)])
+
+        with self.assertLogs('testharness.rest_api.retry', level='WARNING'):
+            resp = client._timed('GET', '/v1/test', client.get_url('/v1/test'), send)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(client.metrics.histogram('GET /v1/test').count, 2)
+        self.assertEqual(client.metrics.histogram('GET /v1/test').errors, 1)
+        self.server.stop()
@@ -0,0 +1,106 @@
+import logging
+
+from unittest import TestCase, mock
+
+from testharness.rest_api import routes
+from testharness.rest_api.clients import base, live
+
+from .clients.http_server import LocalTestServer
+
+
+class _Unformattable(dict):
+    """ a payload that fails the test when it is formatted for a log message """
+
+    def __repr__(self):
+        raise AssertionError('payload formatted with DEBUG logging off')
+
+    __str__ = __repr__
+
+
+class RouteTests(TestCase):
+
+    def setUp(self):
+        self.client = base.BaseRestApiClient('test.example.com')
+
+    def test_url(self):
+        route = self.client.route('/v1/things/{id}/parts/{part}')
+
+        self.assertEqual(route.fields, ('id', 'part'))
+        self.assertEqual(route.url(id=7, part='a b/c'),
+                         'http://test.example.com:80/v1/things/7/parts/a%20b%2Fc')
+        self.assertEqual(route.url({'page': 2, 'q': 'x y'}, id=7, part='a'),
+                         'http://test.example.com:80/v1/things/7/parts/a?page=2&q=x+y')
+
+    def test_url_static(self):
+        route = self.client.route('/v1/things')
+
+        self.assertEqual(route.url(), 'http://test.example.com:80/v1/things')
+        self.assertEqual(route.url({'code': 'asdf'}), self.client.get_url(
+            '/v1/things', query={'code': 'asdf'}))
+
+    def test_url_missing_parameter(self):
+        route = self.client.route('/v1/things/{id}')
+
+        with self.assertRaisesRegex(TypeError, r'needs path parameter id'):
+            route.url(code=7)
+
+    def test_bad_templates(self):
+        for template in ('/v1/things/{}', '/v1/things/{0}', '/v1/things/{id!r}',
+                         '/v1/things/{id:>4}', '/v1/things/{query}'):
+            with self.assertRaises(ValueError, msg=template):
+                routes.Route(self.client, template)
+
+    def test_route_cached_per_template(self):
+        route = self.client.route('/v1/things/{id}')
+        self.assertIs(self.client.route('/v1/things/{id}'), route)
+
+    def test_request_dispatch(self):
+        route = self.client.route('/v1/things/{id}')
+        mock_response = mock.MagicMock(status_code=200)
+
+        with mock.patch.object(self.client, '_send', return_value=mock_response) as mock_send:
+            response = route.put({'code': 'asdf'}, id=7)
+
+            mock_send.assert_called_once_with(
+                'PUT', 'http://test.example.com:80/v1/things/7', {},
+                payload={'code': 'asdf'}, stream=False)
+            self.assertEqual(response, mock_response)
+            self.assertEqual(response.timing.rest_url, '/v1/things/{id}')
+
+    def test_lazy_logging(self):
+        route = self.client.route('/v1/things/{id}')
+        payload = _Unformattable(code='asdf')
+
+        with mock.patch.object(self.client, '_send', return_value=mock.MagicMock()):
+            with mock.patch.object(base.log, 'isEnabledFor', return_value=False):
+                route.post(payload, id=7)
+                self.client.post('/v1/things', payload)
+
+        with self.assertLogs(base.log, logging.DEBUG) as logs:
+            self.client.request_url('GET', '/v1/things')
+        self.assertEqual(logs.output, ['DEBUG:testharness.rest_api.clients:Client GET '
+                                       'http://test.example.com:80/v1/things'])
+
+
+class RouteServerTests(TestCase):
+
+    def setUp(self):
+        self.server = LocalTestServer().start()
+        self.client = live.RestApiClient(self.server.host, port=self.server.port)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_requests_share_endpoint_metrics(self):
+        route = self.client.route('/v1/test/things/{id}')
+
+        for n in range(3):
+            response = route.get({'n': n}, id=n)
+            self.assertEqual(response.json()['path'], '/v1/test/things/{}'.format(n))
+            self.assertEqual(response.json()['query'], {'n': str(n)})
+        response = route.post({'code': 'asdf'}, id=9)
+        self.assertEqual(response.json()['body'], {'code': 'asdf'})
+
+        histogram = self.client.metrics.histogram('GET /v1/test/things/{id}')
+        self.assertEqual(histogram.count, 3)
@@ -0,0 +1,162 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from unittest import TestCase, mock
+from xml.etree import ElementTree
+
+from testharness.rest_api import runner
+
+from . import runner_module_samples, runner_samples
+
+SAMPLES = runner_samples.__name__
+
+
+class ParallelTestRunnerTests(TestCase):
+
+    def _suite(self, *test_classes):
+        loader = unittest.TestLoader()
+        return unittest.TestSuite(loader.loadTestsFromTestCase(c) for c in test_classes)
+
+    def test_group_test_classes(self):
+        suite = self._suite(runner_samples.SlowSampleCase, runner_samples.OtherSlowSampleCase)
+
+        units = runner.group_test_classes(suite)
+
+        self.assertEqual([(name, [t._testMethodName for t in tests])
+                          for (name, tests) in units.items()], [
+            (SAMPLES + '.SlowSampleCase', ['test_first', 'test_second']),
+            (SAMPLES + '.OtherSlowSampleCase', ['test_skipped', 'test_sleep']),
+        ])
+
+    def test_group_module_fixtures(self):
+        suite = self._suite(runner_module_samples.FirstModuleSampleCase,
+                            runner_module_samples.SecondModuleSampleCase)
+
+        units = runner.group_test_classes(suite)
+
+        self.assertEqual(list(units), [runner_module_samples.__name__])
+        self.assertEqual(len(units[runner_module_samples.__name__]), 2)
+
+    def test_run_classes_in_parallel(self):
+        suite = self._suite(runner_samples.SlowSampleCase, runner_samples.OtherSlowSampleCase)
+        stream = io.StringIO()
+
+        result = runner.ParallelTestRunner(workers=2, stream=stream).run(suite)
+
+        self.assertTrue(result.wasSuccessful())
+        self.assertEqual(result.testsRun, 4)
+        self.assertEqual(len(result.skipped), 1)
+        self.assertEqual(list(result.class_times),
+                         [SAMPLES + '.SlowSampleCase', SAMPLES + '.OtherSlowSampleCase'])
+        self.assertIn('Wall time per class:', stream.getvalue())
+        self.assertIn('OK', stream.getvalue())
+
+    def test_run_classes_overlap(self):
+        suite = self._suite(runner_samples.FirstOverlapSampleCase,
+                            runner_samples.SecondOverlapSampleCase)
+
+        result = runner.ParallelTestRunner(workers=2, stream=io.StringIO()).run(suite)
+
+        self.assertTrue(result.wasSuccessful(), result.errors)
+        self.assertEqual(result.testsRun, 2)
+
+    def test_run_module_fixtures_once(self):
+        del runner_module_samples.calls[:]
+        suite = self._suite(runner_module_samples.FirstModuleSampleCase,
+                            runner_module_samples.SecondModuleSampleCase)
+
+        result = runner.ParallelTestRunner(workers=2, stream=io.StringIO()).run(suite)
+
+        self.assertTrue(result.wasSuccessful(), result.failures)
+        self.assertEqual(runner_module_samples.calls, ['setUpModule', 'tearDownModule'])
+
+    def test_run_import_failure(self):
+        suite = unittest.TestLoader().loadTestsFromNames([
+            SAMPLES + '_missing_module', SAMPLES + '.OtherSlowSampleCase'])
+
+        for mode in ('thread', 'process'):
+            stream = io.StringIO()
+            result = runner.ParallelTestRunner(workers=2, mode=mode, stream=stream).run(suite)
+
+            self.assertEqual(len(result.errors), 1)
+            self.assertIn('ModuleNotFoundError', result.errors[0][1])
+            self.assertEqual(result.testsRun, 3)
+            self.assertIn('FAILED (failures=0, errors=1)', stream.getvalue())
+
+    def test_run_unit_crash_is_an_error(self):
+        with mock.patch('unittest.TestSuite.run', side_effect=RuntimeError('suite crash')):
+            result = runner.run_tests('sample.Unit', [])
+
+        self.assertEqual(result.records[0].test_id, 'sample.Unit')
+        self.assertEqual(result.records[0].outcome, 'error')
+        self.assertIn('RuntimeError: suite crash', result.records[0].detail)
+
+    def test_run_merges_failures(self):
+        suite = self._suite(runner_samples.FailingSampleCase)
+        stream = io.StringIO()
+
+        result = runner.ParallelTestRunner(workers=2, stream=stream).run(suite)
+
+        self.assertFalse(result.wasSuccessful())
+        self.assertEqual(result.testsRun, 3)
+        self.assertEqual([str(case) for (case, _) in result.failures],
+                         [SAMPLES + '.FailingSampleCase.test_fails'])
+        self.assertIn('RuntimeError: sample error', result.errors[0][1])
+        self.assertEqual(len(result.expectedFailures), 1)
+        self.assertIn('FAILED (failures=1, errors=1)', stream.getvalue())
+
+    def test_run_process_mode(self):
+        suite = self._suite(runner_samples.OtherSlowSampleCase)
+
+        result = runner.ParallelTestRunner(workers=2, mode='process',
+                                           stream=io.StringIO()).run(suite)
+
+        self.assertTrue(result.wasSuccessful())
+        self.assertEqual(result.testsRun, 2)
+
+    def test_unknown_mode(self):
+        with self.assertRaisesRegex(ValueError, r'^Unknown worker mode'):
+            runner.ParallelTestRunner(mode='fiber')
+
+    def test_write_junit_xml(self):
+        suite = self._suite(runner_samples.FailingSampleCase,
+                            runner_samples.OtherSlowSampleCase)
+        result = runner.ParallelTestRunner(workers=2, stream=io.StringIO()).run(suite)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'junit.xml')
+            runner.write_junit_xml(result, path)
+            root = ElementTree.parse(path).getroot()
+
+        self.assertEqual(root.tag, 'testsuites')
+        self.assertEqual(root.get('tests'), '5')
+        suites = {s.get('name'): s for s in root.findall('testsuite')}
+        failing = suites[SAMPLES + '.FailingSampleCase']
+        self.assertEqual(failing.get('failures'), '1')
+        self.assertEqual(failing.get('errors'), '1')
+        self.assertIsNotNone(failing.find("testcase[@name='test_fails']/failure"))
+        self.assertIsNotNone(failing.find("testcase[@name='test_errors']/error"))
+        other = suites[SAMPLES + '.OtherSlowSampleCase']
+        self.assertIsNotNone(other.find("testcase[@name='test_skipped']/skipped"))
+
+    def test_main_durations(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            durations = os.path.join(tmp_dir, 'durations.json')
+            with open(durations, 'w') as f:
+                json.dump({SAMPLES + '.OtherSlowSampleCase': 9.0}, f)
+
+            with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+                status = runner.main(['-w', '2', '--durations', durations,
+                                      SAMPLES + '.OtherSlowSampleCase',
+                                      SAMPLES + '.SlowSampleCase'])
+
+            with open(durations) as f:
+                saved = json.load(f)
+
+        self.assertEqual(status, 0)
+        self.assertIn('Ran 4 tests', stderr.getvalue())
+        self.assertLess(saved[SAMPLES + '.OtherSlowSampleCase'], 9.0)
+        self.assertIn(SAMPLES + '.SlowSampleCase', saved)
@@ -0,0 +1,243 @@
+import json
+import os
+import tempfile
+import time
+
+from unittest import TestCase
+
+from testharness.rest_api import schema, testcases
+from testharness.rest_api.clients.live import RestApiClient
+
+from .clients.http_server import JsonTestHandler, LocalTestServer
+
+SWAGGER = {
+    'swagger': '2.0',
+    'basePath': '/v1',
+    'paths': {
+        '/test/object': {
+            'get': {'responses': {'200': {'schema': {'$ref': '#/definitions/Echo'}}}},
+            'post': {'responses': {'201': {'schema': {'$ref': '#/definitions/Echo'}}}},
+        },
+        '/test/object/{key}': {
+            'get': {'responses': {'200': {'schema': {'type': 'string'}}}},
+        },
+        '/test/stream': {
+            'get': {'responses': {'200': {'schema': {
+                'type': 'array', 'items': {'$ref': '#/definitions/Item'}}}}},
+        },
+        '/test/object/first': {
+            'get': {'responses': {'default': {'description': 'No schema'}}},
+        },
+    },
+    'definitions': {
+        'Echo': {
+            'type': 'object',
+            'required': ['method', 'path', 'query'],
+            'properties': {
+                'method': {'type': 'string', 'enum': ['GET', 'POST']},
+                'path': {'type': 'string', 'pattern': '^/v1/'},
+                'query': {'type': 'object', 'additionalProperties': {'type': 'string'}},
+                'body': {'type': 'object', 'x-nullable': True},
+            },
+        },
+        'Item': {
+            'type': 'object',
+            'required': ['id'],
+            'properties': {'id': {'type': 'integer', 'minimum': 0, 'maximum': 5}},
+            'additionalProperties': False,
+        },
+    },
+}
+
+OPENAPI = {
+    'openapi': '3.0.0',
+    'servers': [{'url': 'http://example.com/api'}],
+    'paths': {
+        '/tree': {'get': {'responses': {'2XX': {'content': {'application/json': {
+            'schema': {'$ref': '#/components/schemas/Node'}}}}}}},
+    },
+    'components': {'schemas': {
+        'Node': {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string', 'minLength': 1},
+                'children': {'type': 'array', 'items': {'$ref': '#/components/schemas/Node'}},
+            },
+        },
+    }},
+}
+
+
+class SpecTestHandler(JsonTestHandler):
+    """ Serve the Swagger document at "/v1/swagger.json". """
+
+    def do_GET(self):
+        if self.path == '/v1/swagger.json':
+            self._send_json(200, SWAGGER)
+        else:
+            super().do_GET()
+
+
+class SchemaCompilerTests(TestCase):
+
+    def check(self, schema_dict, value, document=None):
+        schema.SchemaCompiler(document).compile(schema_dict)(value)
+
+    def assertSchemaError(self, schema_dict, value, message, document=None):
+        with self.assertRaises(schema.SchemaError) as caught:
+            self.check(schema_dict, value, document)
+        self.assertEqual(str(caught.exception), message)
+
+    def test_types(self):
+        self.check({'type': 'integer'}, 3)
+        self.check({'type': 'number'}, 3.5)
+        self.check({'type': ['string', 'null']}, None)
+        self.check({'type': 'boolean'}, False)
+
+        self.assertSchemaError({'type': 'integer'}, True, '$: expected integer, not boolean')
+        self.assertSchemaError({'type': 'string'}, 3, '$: expected string, not integer')
+        self.assertSchemaError({'type': 'object'}, None, '$: expected object, not null')
+        self.check({'type': 'object', 'nullable': True}, None)
+
+    def test_paths(self):
+        items = {'type': 'array', 'items': {'type': 'object', 'properties': {
+            'tags': {'type': 'array', 'items': {'type': 'string'}}}}}
+
+        self.check(items, [{'tags': ['a']}, {'tags': []}])
+        self.assertSchemaError(items, [{'tags': ['a']}, {'tags': ['b', 7]}],
+                               '$[1].tags[1]: expected string, not integer')
+
+    def test_constraints(self):
+        self.assertSchemaError({'required': ['id']}, {}, '$: missing required property "id"')
+        self.assertSchemaError({'properties': {}, 'additionalProperties': False}, {'x': 1},
+                               '$: unexpected property "x"')
+        self.assertSchemaError({'enum': ['a', 'b']}, 'c', "$: 'c' is not one of ['a', 'b']")
+        self.assertSchemaError({'minimum': 1}, 0, '$: 0 is less than 1')
+        self.assertSchemaError({'maximum': 1, 'exclusiveMaximum': True}, 1,
+                               '$: 1 is not less than 1')
+        self.assertSchemaError({'maxLength': 2}, 'abc', "$: 'abc' is longer than 2")
+        self.assertSchemaError({'minItems': 1}, [], '$: 0 items, fewer than 1')
+
+    def test_combined(self):
+        one_of = {'oneOf': [{'type': 'integer'}, {'type': 'number'}]}
+        self.check(one_of, 1.5)
+        self.assertSchemaError(one_of, 1, '$: matches 2 of the oneOf schemas, not 1')
+        self.assertSchemaError({'anyOf': [{'type': 'string'}]}, 1,
+                               '$: matches none of the anyOf schemas')
+        self.assertSchemaError({'allOf': [{'required': ['a']}, {'required': ['b']}]},
+                               {'a': 1}, '$: missing required property "b"')
+
+    def test_recursive_ref(self):
+        spec = schema.OpenApiSpec(OPENAPI)
+        check = spec.validator('GET', 'http://example.com/api/tree', 200)
+
+        check({'name': 'root', 'children': [{'name': 'leaf', 'children': []}]})
+        with self.assertRaisesRegex(schema.SchemaError, r'^\$\.children\[0\]\.name: '):
+            check({'name': 'root', 'children': [{'name': ''}]})
+
+    def test_unknown_ref(self):
+        with self.assertRaisesRegex(ValueError, r'^Unknown schema reference: #/nope'):
+            self.check({'$ref': '#/nope'}, 1)
+
+
+class OpenApiSpecTests(TestCase):
+
+    def setUp(self):
+        self.spec = schema.OpenApiSpec(SWAGGER)
+
+    def test_match(self):
+        self.assertEqual(self.spec.match('GET', 'http://h:80/v1/test/object/first')[0],
+                         '/test/object/first')
+        self.assertEqual(self.spec.match('get', '/v1/test/object/7?x=1')[0],
+                         '/test/object/{key}')
+
+        with self.assertRaisesRegex(LookupError, r'^No OpenAPI operation for PUT /test/object'):
+            self.spec.match('PUT', '/v1/test/object')
+
+    def test_validators_cached(self):
+        check = self.spec.validator('GET', '/v1/test/object/1')
+        self.assertIs(self.spec.validator('GET', '/v1/test/object/2'), check)
+
+        with self.assertRaisesRegex(LookupError, r'^No OpenAPI response 404 documented'):
+            self.spec.validator('GET', '/v1/test/object', 404)
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'swagger.json')
+            with open(path, 'w') as f:
+                json.dump(SWAGGER, f)
+
+            spec = schema.load_spec(path)
+            self.assertIs(schema.load_spec(path), spec)
+        self.assertEqual(spec.base_path, '/v1')
+
+    def test_big_list_is_fast(self):
+        check = self.spec.validator('GET', '/v1/test/stream', items=True)
+        items = [{'id': n % 6} for n in range(100000)]
+
+        start = time.perf_counter()
+        for item in items:
+            check(item)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+
+class SchemaTestCaseTests(testcases.LiveRestApiTestCase):
+    """ Prove assertMatchesSchema against a local HTTP server's Swagger document. """
+
+    OPENAPI_SPEC = '/v1/swagger.json'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalTestServer(SpecTestHandler).start()
+        cls.HOST = cls.server.host
+        cls.PORT = cls.server.port
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+    def test_spec_loaded_once(self):
+        self.assertIsInstance(self.client.openapi, schema.OpenApiSpec)
+        client = RestApiClient(self.HOST, port=self.PORT)
+        self.addCleanup(client.close)
+
+        self.assertIs(client.load_openapi('/v1/swagger.json'), self.client.openapi)
+        self.assertEqual(self.client.metrics.histogram('/v1/swagger.json').count, 0)
+
+    def test_spec_from_absolute_path(self):
+        client = RestApiClient(self.HOST, port=self.PORT)
+        self.addCleanup(client.close)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'swagger.json')
+            with open(path, 'w') as f:
+                json.dump(SWAGGER, f)
+
+            spec = client.load_openapi(path)
+        self.assertIsNot(spec, self.client.openapi)
+        self.assertEqual(spec.base_path, '/v1')
+
+    def test_assert_matches_schema(self):
+        self.assertMatchesSchema(self.client.get('/v1/test/object', {'code': 'asdf'}))
+        self.assertMatchesSchema(self.client.post('/v1/test/object', {'code': 'asdf'}))
+        self.assertMatchesSchema(self.client.get('/v1/test/object/first'))
+
+        response = self.client.get('/v1/test/object/7')
+        with self.assertRaisesRegex(AssertionError,
+                                    r'^GET .*/v1/test/object/7 200 does not match the schema: '
+                                    r'\$: expected string, not object'):
+            self.assertMatchesSchema(response)
+
+    def test_assert_matches_schema_undocumented(self):
+        with self.assertRaisesRegex(AssertionError, r'No OpenAPI operation for DELETE'):
+            self.assertMatchesSchema(self.client.delete('/v1/test/object', 'x'))
+
+    def test_assert_stream_matches_schema(self):
+        stream = self.client.get_stream('/v1/test/stream', query={'count': 6})
+        self.assertEqual(self.assertStreamMatchesSchema(stream, count=6), 6)
+
+        stream = self.client.get_stream('/v1/test/stream', query={'count': 8})
+        with self.assertRaisesRegex(AssertionError, r'^Stream item 6 failed: \$\.id: 6 is'):
+            self.assertStreamMatchesSchema(stream)
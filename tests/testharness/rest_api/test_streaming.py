@@ -0,0 +1,51 @@
+import json
+
+from unittest import TestCase, mock
+
+from testharness.rest_api import streaming
+
+
+class IterJsonArrayTests(TestCase):
+
+    def test_items_split_across_chunks(self):
+        items = [{'id': n, 'name': 'café {}'.format(n)} for n in range(20)]
+        items.extend([123456, -2.5e-3, True, None, 'a,]', [1, [2]]])
+        data = json.dumps(items).encode('utf8')
+
+        for size in (1, 3, 7, 64):
+            chunks = [data[n:n + size] for n in range(0, len(data), size)]
+            self.assertEqual(list(streaming.iter_json_array(chunks)), items)
+
+    def test_empty_array(self):
+        self.assertEqual(list(streaming.iter_json_array([b' [', b' ] '])), [])
+
+    def test_number_at_chunk_end(self):
+        self.assertEqual(list(streaming.iter_json_array([b'[1', b'2.', b'5]'])), [12.5])
+
+    def test_items_are_lazy(self):
+        chunks = iter([b'[1,', b'2,', b'3]'])
+
+        items = streaming.iter_json_array(chunks)
+
+        self.assertEqual(next(items), 1)
+        self.assertEqual(next(chunks), b'2,')
+
+    def test_malformed(self):
+        for data in (b'{"id": 1}', b'[1 2]', b'[1,', b'[1,]', b'[1] x'):
+            with self.assertRaises(streaming.StreamError, msg=data):
+                list(streaming.iter_json_array([data]))
+
+
+class StreamedResponseTests(TestCase):
+
+    def test_iter_items_counts_bytes_and_closes(self):
+        close = mock.MagicMock()
+        response = mock.MagicMock(status_code=200)
+
+        with streaming.StreamedResponse(response, [b'[{"id": 1},', b'', b'{"id": 2}]'],
+                                        close) as stream:
+            self.assertEqual(stream.status_code, 200)
+            self.assertEqual(list(stream), [{'id': 1}, {'id': 2}])
+            self.assertEqual(stream.bytes_read, 21)
+
+        close.assert_called_once_with()
@@ -0,0 +1,149 @@
+import io
+import unittest
+
+from unittest import TestCase
+
+from testharness.rest_api import schema, sweep, testcases
+from testharness.rest_api.runner import ParallelTestRunner
+
+from .clients.http_server import LocalTestServer
+
+ECHO = {'type': 'object', 'required': ['method', 'path']}
+
+SWAGGER = {
+    'swagger': '2.0',
+    'basePath': '/v1',
+    'paths': {
+        '/test/object': {
+            'get': {'responses': {'200': {'schema': ECHO}}},
+            'head': {'responses': {'200': {'description': 'Exists'}}},
+            'post': {
+                'parameters': [{'in': 'body', 'name': 'thing', 'schema': {
+                    'type': 'object', 'example': {'code': 'asdf'}}}],
+                'responses': {'201': {'schema': ECHO}},
+            },
+            'delete': {'responses': {'204': {'description': 'Deleted'}}},
+        },
+        '/test/object/{key}': {
+            'parameters': [{'in': 'path', 'name': 'key', 'type': 'string', 'x-example': 'a b'}],
+            'get': {
+                'parameters': [{'in': 'query', 'name': 'fields', 'type': 'string',
+                                'required': True, 'enum': ['name', 'all']}],
+                'responses': {'200': {'schema': ECHO}},
+            },
+        },
+        '/test/missing/{id}': {
+            'get': {
+                'parameters': [{'in': 'path', 'name': 'id', 'type': 'integer'}],
+                'responses': {'200': {'schema': ECHO}},
+            },
+        },
+        '/test/wrong': {
+            'get': {'responses': {'404': {'description': 'Never found'}}},
+        },
+        '/test/options': {
+            'options': {'responses': {'default': {'description': 'Allowed methods'}}},
+        },
+    },
+}
+
+
+class SweepOperationsTests(TestCase):
+
+    def setUp(self):
+        self.spec = schema.OpenApiSpec(SWAGGER)
+
+    def test_safe_methods(self):
+        operations = sweep.sweep_operations(self.spec)
+
+        self.assertEqual([(op.method, op.template) for op in operations], [
+            ('GET', '/v1/test/object'),
+            ('HEAD', '/v1/test/object'),
+            ('GET', '/v1/test/object/{key}'),
+            ('GET', '/v1/test/missing/{id}'),
+            ('GET', '/v1/test/wrong'),
+            ('OPTIONS', '/v1/test/options'),
+        ])
+
+        by_template = {op.template: op for op in operations if op.method == 'GET'}
+        keyed = by_template['/v1/test/object/{key}']
+        self.assertEqual((keyed.rest_url, keyed.query), ('/v1/test/object/a%20b',
+                                                         {'fields': 'name'}))
+        missing = by_template['/v1/test/missing/{id}']
+        self.assertEqual(missing.skip, 'No value for path parameter "id"')
+
+    def test_params_and_filters(self):
+        operations = sweep.sweep_operations(
+            self.spec, methods=['GET', 'POST', 'DELETE'], params={'id': 7},
+            include=r'/test/(object|missing)', exclude=r'^DELETE ')
+
+        self.assertEqual([(op.method, op.rest_url) for op in operations], [
+            ('GET', '/v1/test/object'),
+            ('POST', '/v1/test/object'),
+            ('GET', '/v1/test/object/a%20b'),
+            ('GET', '/v1/test/missing/7'),
+        ])
+        self.assertEqual(operations[1].payload, {'code': 'asdf'})
+
+
+class SweepBase(testcases.LiveRestApiTestCase):
+    """ Sweep the local HTTP server. """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalTestServer().start()
+        cls.HOST = cls.server.host
+        cls.PORT = cls.server.port
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+
+class SweepTestCasesTests(TestCase):
+
+    def make_classes(self, **options):
+        classes = sweep.sweep_test_cases(SWAGGER, base=SweepBase, module=__name__, **options)
+        self.assertTrue(all(issubclass(cls, SweepBase) for cls in classes.values()))
+        return classes
+
+    def run_classes(self, classes):
+        suite = unittest.TestSuite(unittest.defaultTestLoader.loadTestsFromTestCase(cls)
+                                   for cls in classes.values())
+        runner = ParallelTestRunner(workers=len(classes), stream=io.StringIO())
+        return runner.run(suite)
+
+    def test_shards(self):
+        classes = self.make_classes(shards=3)
+        names = sorted(name for cls in classes.values()
+                       for name in unittest.defaultTestLoader.getTestCaseNames(cls))
+
+        self.assertLessEqual(len(classes), 3)
+        self.assertTrue(all(name.startswith('SweepShard') for name in classes))
+        self.assertEqual(names, [
+            'test_get_v1_test_missing_id', 'test_get_v1_test_object',
+            'test_get_v1_test_object_key', 'test_get_v1_test_wrong',
+            'test_head_v1_test_object', 'test_options_v1_test_options',
+        ])
+        self.assertEqual({name: sorted(vars(cls)) for (name, cls) in classes.items()},
+                         {name: sorted(vars(cls)) for (name, cls)
+                          in self.make_classes(shards=3).items()})
+
+    def test_sweep_run(self):
+        result = self.run_classes(self.make_classes(shards=2))
+
+        self.assertEqual(result.testsRun, 6)
+        self.assertEqual(len(result.skipped), 1)
+        self.assertEqual(len(result.errors), 0)
+        (failure,) = result.failures
+        self.assertIn('GET /v1/test/wrong answered 200, not one of the documented 404',
+                      failure[1])
+
+    def test_sweep_latency_limit(self):
+        result = self.run_classes(self.make_classes(shards=1, max_ms=0,
+                                                    include=r'^GET /v1/test/object$'))
+
+        (failure,) = result.failures
+        self.assertIn('not faster than 0 ms', failure[1])
@@ -1,7 +1,19 @@
 # from unittest import TestCase
+import asyncio
+import os
+import tempfile
+
+from collections import OrderedDict
+from unittest import TestCase, mock
 
 from testharness.rest_api import testcases
+from testharness.rest_api.clients.async_live import AsyncRestApiClient
+from testharness.rest_api.clients.cassette import (
+    CassetteError, RecordingRestApiClient, ReplayRestApiClient)
 from testharness.rest_api.clients.live import RestApiClient
+from testharness.rest_api.metrics import NullMetricsSink
+
+from .clients.http_server import LocalTestServer
 
 
 class LiveRestApiTestCaseTests(testcases.LiveRestApiTestCase):
@@ -15,6 +27,8 @@ class LiveRestApiTestCaseTests(testcases.LiveRestApiTestCase):
     HOST = 'secure.example.com'
     PORT = 443
 
+    POOL_MAXSIZE = 4
+
     def test_setup_class_client(self):
         " Prove live client has been configured with HOST, PORT, ..etc. "
         self.assertIsInstance(self.client, RestApiClient)
@@ -22,3 +36,233 @@ class LiveRestApiTestCaseTests(testcases.LiveRestApiTestCase):
         self.assertEqual(self.SCHEME, 'https')
         self.assertEqual(self.HOST, 'secure.example.com')
         self.assertEqual(self.PORT, 443)
+
+    def test_setup_class_client_pool(self):
+        " Prove live client pool has been configured with POOL_MAXSIZE, ..etc. "
+        self.assertEqual(self.client.adapter._pool_maxsize, 4)
+        self.assertEqual(self.client.adapter._pool_connections, 10)
+        self.assertEqual(self.client.adapter._pool_block, False)
+
+
+class LiveRestApiTestCaseAssertionTests(testcases.LiveRestApiTestCase):
+    """ LiveRestApiTestCase Assertion Tests.
+
+    Prove the latency assertions against a local HTTP server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalTestServer().start()
+        cls.HOST = cls.server.host
+        cls.PORT = cls.server.port
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+    def test_assert_response_faster_than(self):
+        response = self.client.get('/v1/test/fast')
+
+        self.assertResponseFasterThan(response, 5000)
+        with self.assertRaisesRegex(AssertionError, r'^GET .*/v1/test/fast took .* ms'):
+            self.assertResponseFasterThan(response, 0)
+
+    def test_assert_response_faster_than_no_timing(self):
+        with self.assertRaisesRegex(AssertionError, r'^Response has no timing'):
+            self.assertResponseFasterThan(object(), 5000)
+
+    def test_assert_p95_below(self):
+        for n in range(20):
+            self.client.get('/v1/test/p95', query={'n': n})
+
+        self.assertP95Below('GET /v1/test/p95', 5000)
+        self.assertP95Below('/v1/test/p95', 5000)
+        with self.assertRaisesRegex(AssertionError, r'p95 latency is .* over 20 requests'):
+            self.assertP95Below('GET /v1/test/p95', 0)
+
+    def test_assert_stream_items(self):
+        stream = self.client.get_stream('/v1/test/stream', query={'count': 50})
+        count = self.assertStreamItems(stream, lambda item: item['id'] >= 0, count=50)
+        self.assertEqual(count, 50)
+
+        stream = self.client.get_stream('/v1/test/stream', query={'count': 50})
+        with self.assertRaisesRegex(AssertionError, r'^Stream item 7 failed the check'):
+            self.assertStreamItems(stream, lambda item: item['id'] != 7)
+
+        stream = self.client.get_stream('/v1/test/stream', query={'count': 3})
+        with self.assertRaisesRegex(AssertionError, r'^Stream has 3 items, not 4'):
+            self.assertStreamItems(stream, count=4)
+
+    def test_assert_compressed(self):
+        response = self.client.post('/v1/test/gzip', {'items': list(range(500))})
+        savings = self.assertCompressed(response, 'gzip')
+        self.assertGreater(savings, 0.5)
+
+        response = self.client.get('/v1/test/fast')
+        with self.assertRaisesRegex(AssertionError, r'^Response body is identity, not gzip'):
+            self.assertCompressed(response, 'gzip')
+
+    def test_assert_p95_below_no_requests(self):
+        with self.assertRaisesRegex(AssertionError, r'^No requests recorded for'):
+            self.assertP95Below('GET /v1/test/never', 5000)
+
+
+class AsyncLiveRestApiTestCaseTests(testcases.AsyncLiveRestApiTestCase):
+    """ AsyncLiveRestApiTestCase Class Tests.
+
+    Run the async test case against a local HTTP server.
+    """
+
+    MAX_CONCURRENCY = 5
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalTestServer().start()
+        cls.HOST = cls.server.host
+        cls.PORT = cls.server.port
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+    def test_setup_class_client(self):
+        " Prove async client has been configured with HOST, PORT, ..etc. "
+        self.assertIsInstance(self.client, AsyncRestApiClient)
+        self.assertEqual(self.client.host_url, 'http://127.0.0.1:{}'.format(self.PORT))
+        self.assertEqual(self.client.max_concurrency, 5)
+
+    async def test_gather_endpoints(self):
+        responses = await asyncio.gather(*[
+            self.client.get('/v1/test/object/{}'.format(n)) for n in range(10)
+        ])
+
+        self.assertEqual([r.status_code for r in responses], [200] * 10)
+
+
+class LiveRestApiTestCaseCassetteTests(TestCase):
+    """ LiveRestApiTestCase Cassette Tests.
+
+    Prove CASSETTE_MODE picks the recording, replay or live client.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'api.cassette')
+        open(self.path, 'w').close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _client_class(self, cassette, mode=None, environ={}):
+        test_class = type('CassetteCase', (testcases.LiveRestApiTestCase,),
+                          {'CASSETTE': cassette, 'CASSETTE_MODE': mode})
+        with mock.patch.dict(os.environ, environ):
+            if 'TESTHARNESS_CASSETTE_MODE' not in environ:
+                os.environ.pop('TESTHARNESS_CASSETTE_MODE', None)
+            test_class.setUpClass()
+        test_class.tearDownClass()
+        return type(test_class.client)
+
+    def test_no_cassette_is_live(self):
+        self.assertIs(self._client_class(None), RestApiClient)
+
+    def test_cassette_modes(self):
+        self.assertIs(self._client_class(self.path), ReplayRestApiClient)
+        self.assertIs(self._client_class(self.path, mode='record'), RecordingRestApiClient)
+        self.assertIs(self._client_class(self.path, mode='live'), RestApiClient)
+        record_environ = {'TESTHARNESS_CASSETTE_MODE': 'record'}
+        self.assertIs(self._client_class(self.path, environ=record_environ),
+                      RecordingRestApiClient)
+
+    def test_environ_overrides_cassette_mode(self):
+        live_environ = {'TESTHARNESS_CASSETTE_MODE': 'live'}
+        self.assertIs(self._client_class(self.path, mode='replay', environ=live_environ),
+                      RestApiClient)
+
+    def test_replay_missing_cassette(self):
+        missing = os.path.join(self.tmp_dir.name, 'missing.cassette')
+        with self.assertRaisesRegex(CassetteError, r'does not exist: record it first'):
+            self._client_class(missing, mode='replay')
+
+    def test_metrics_sink(self):
+        sink = NullMetricsSink()
+        test_class = type('SinkCase', (testcases.LiveRestApiTestCase,), {'METRICS_SINK': sink})
+        test_class.setUpClass()
+        test_class.tearDownClass()
+
+        self.assertIs(test_class.client.metrics, sink)
+
+    def test_response_cache(self):
+        test_class = type('CacheCase', (testcases.LiveRestApiTestCase,),
+                          {'RESPONSE_CACHE_SIZE': 8, 'RESPONSE_CACHE_TTL': 5.0})
+        test_class.setUpClass()
+        test_class.tearDownClass()
+
+        self.assertEqual(test_class.client.cache.max_entries, 8)
+        self.assertEqual(test_class.client.cache.ttl, 5.0)
+
+        testcases.LiveRestApiTestCase.setUpClass()
+        testcases.LiveRestApiTestCase.tearDownClass()
+        self.assertIsNone(testcases.LiveRestApiTestCase.client.cache)
+
+    def test_unknown_cassette_mode(self):
+        with self.assertRaisesRegex(ValueError, r'^Unknown cassette mode: tape'):
+            self._client_class(self.path, mode='tape')
+
+
+class MultiHostRestApiTestCaseTests(testcases.MultiHostRestApiTestCase):
+    """ MultiHostRestApiTestCase Class Tests.
+
+    Compare two local test servers, a baseline and its canary.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servers = [LocalTestServer().start(), LocalTestServer().start()]
+        cls.HOSTS = OrderedDict(
+            (name, 'http://{}:{}'.format(server.host, server.port))
+            for (name, server) in zip(['baseline', 'canary'], cls.servers))
+        with mock.patch.dict(os.environ, {'TESTHARNESS_HOSTS': ''}):
+            super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for server in cls.servers:
+            server.stop()
+
+    def test_assert_no_divergence(self):
+        self.assertNoDivergence(self.client.get('/v1/test/object', {'code': 'asdf'}))
+
+        multi = self.client.get('/v1/test/object')
+        multi.responses['canary'] = self.client.clients['canary'].get('/v1/test/other')
+        with self.assertRaisesRegex(AssertionError, r"canary body \$\.path: "
+                                                    r"'/v1/test/object' != '/v1/test/other'"):
+            self.assertNoDivergence(multi)
+
+    def test_assert_latency_within(self):
+        self.client.get('/v1/test/timed')
+        self.assertLatencyWithin(1000.0, 'GET /v1/test/timed')
+
+        slower = [mock.MagicMock(host='canary', endpoint='GET /v1/test/timed', host_ms=30.0,
+                                 baseline_ms=10.0, ratio=3.0)]
+        with mock.patch.object(self.client, 'compare_latency', return_value=slower):
+            with self.assertRaisesRegex(AssertionError, r'canary GET /v1/test/timed: p95 '
+                                                        r'30\.0 ms vs 10\.0 ms \(3\.00x\)'):
+                self.assertLatencyWithin(1.2)
+
+    def test_environ_hosts(self):
+        environ = {
+            'TESTHARNESS_HOSTS': 'blue=http://a.example.com, green=https://b.example.com'}
+        with mock.patch.dict(os.environ, environ):
+            hosts = self._hosts()
+        self.assertEqual(hosts, OrderedDict([('blue', 'http://a.example.com'),
+                                             ('green', 'https://b.example.com')]))
+
+        with mock.patch.dict(os.environ, {'TESTHARNESS_HOSTS': 'blue'}):
+            with self.assertRaisesRegex(ValueError, r'must be "name=url": blue'):
+                self._hosts()
@@ -0,0 +1,191 @@
+import datetime
+import threading
+import time
+
+from unittest import TestCase, mock
+
+from testharness.rest_api import throttle
+from testharness.rest_api.clients.live import RestApiClient
+
+from .clients.http_server import LocalTestServer
+
+
+class FakeClock(object):
+    """ a clock that only moves when the fake sleep is called """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ParseRetryAfterTests(TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(throttle.parse_retry_after('120'), 120.0)
+        self.assertEqual(throttle.parse_retry_after(' 3 '), 3.0)
+
+    def test_http_date(self):
+        now = datetime.datetime(2015, 10, 21, 7, 28, 0, tzinfo=datetime.timezone.utc)
+        self.assertEqual(throttle.parse_retry_after('Wed, 21 Oct 2015 07:28:30 GMT', now=now),
+                         30.0)
+        self.assertEqual(throttle.parse_retry_after('Wed, 21 Oct 2015 07:27:00 GMT', now=now),
+                         0.0)
+
+    def test_invalid(self):
+        self.assertIsNone(throttle.parse_retry_after(None))
+        self.assertIsNone(throttle.parse_retry_after('soon'))
+        self.assertIsNone(throttle.parse_retry_after('-5'))
+
+
+class TokenBucketTests(TestCase):
+
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = throttle.TokenBucket(10, burst=2, clock=clock)
+
+        self.assertEqual([bucket.reserve() for n in range(4)], [0.0, 0.0, 0.1, 0.2])
+
+        clock.now = 1.0
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_bad_rate(self):
+        with self.assertRaisesRegex(ValueError, r'^Token bucket rate must be positive: 0'):
+            throttle.TokenBucket(0)
+
+
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def make_throttle(self, **options):
+        return throttle.Throttle(clock=self.clock, sleep=self.clock.sleep, **options)
+
+    def send(self, shaper, rest_url, host_url='http://a.example.com:80'):
+        with shaper.slot(host_url, rest_url):
+            pass
+
+    def test_host_rate(self):
+        shaper = self.make_throttle(rate=5, burst=1)
+        for n in range(3):
+            self.send(shaper, '/v1/things')
+
+        self.assertAlmostEqual(self.clock.now, 0.4)
+        stats = shaper.stats()
+        self.assertEqual((stats.requests, stats.delayed, stats.retry_after), (3, 2, 0))
+        self.assertAlmostEqual(stats.waited, 0.4)
+
+    def test_hosts_limited_apart(self):
+        shaper = self.make_throttle(rate=1, burst=1)
+        self.send(shaper, '/v1/things', 'http://a.example.com:80')
+        self.send(shaper, '/v1/things', 'http://b.example.com:80')
+
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_endpoint_rules(self):
+        shaper = self.make_throttle(rules={'/v1/search': {'rate': 2, 'burst': 1}})
+        for n in range(3):
+            self.send(shaper, '/v1/things')
+        self.assertEqual(self.clock.sleeps, [])
+
+        self.send(shaper, '/v1/search')
+        self.send(shaper, '/v1/search/deep')
+        self.send(shaper, '/v1/searches')
+        self.assertEqual(self.clock.sleeps, [0.5])
+
+    def test_retry_after_blocks_host(self):
+        shaper = self.make_throttle(max_retry_after=30.0)
+        resp = mock.MagicMock(status_code=429, headers={'Retry-After': '5'})
+
+        with self.assertLogs('testharness.rest_api.throttle', 'WARNING'):
+            shaper.record('http://a.example.com:80', resp)
+        self.send(shaper, '/v1/other')
+        self.assertEqual(self.clock.sleeps, [5.0])
+
+        self.send(shaper, '/v1/other')
+        self.send(shaper, '/v1/other', 'http://b.example.com:80')
+        self.assertEqual(self.clock.sleeps, [5.0])
+        self.assertEqual(shaper.stats().retry_after, 1)
+
+    def test_retry_after_capped_or_ignored(self):
+        shaper = self.make_throttle(max_retry_after=2.0)
+        with self.assertLogs('testharness.rest_api.throttle', 'WARNING'):
+            shaper.record('h', mock.MagicMock(status_code=503, headers={'Retry-After': '600'}))
+        shaper.record('h', mock.MagicMock(status_code=200, headers={'Retry-After': '600'}))
+        self.send(shaper, '/v1', 'h')
+        self.assertEqual(self.clock.sleeps, [2.0])
+
+        shaper = self.make_throttle(honor_retry_after=False)
+        shaper.record('h', mock.MagicMock(status_code=429, headers={'Retry-After': '9'}))
+        self.send(shaper, '/v1', 'h')
+        self.assertEqual(self.clock.sleeps, [2.0])
+
+    def test_max_in_flight(self):
+        shaper = throttle.Throttle(max_in_flight=2, rules={'/v1/slow': {'max_in_flight': 1}})
+        lock = threading.Lock()
+        in_flight = {'/v1/fast': [0, 0], '/v1/slow': [0, 0]}
+        totals = []
+
+        def send(rest_url):
+            with shaper.slot('http://a.example.com:80', rest_url):
+                with lock:
+                    counts = in_flight[rest_url]
+                    counts[0] += 1
+                    counts[1] = max(counts)
+                    totals.append(sum(count for (count, peak) in in_flight.values()))
+                time.sleep(0.01)
+                with lock:
+                    counts[0] -= 1
+
+        workers = [threading.Thread(target=send, args=(rest_url,))
+                   for rest_url in ['/v1/fast', '/v1/slow'] * 4]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(max(totals), 2)
+        self.assertEqual(in_flight['/v1/slow'][1], 1)
+        self.assertEqual(shaper.stats().requests, 8)
+        self.assertGreater(shaper.stats().delayed, 0)
+
+
+class ThrottledClientTests(TestCase):
+
+    def setUp(self):
+        self.server = LocalTestServer().start()
+        self.clock = FakeClock()
+        self.throttle = throttle.Throttle(rate=100, burst=1, clock=self.clock,
+                                          sleep=self.clock.sleep)
+        self.client = RestApiClient(self.server.host, port=self.server.port,
+                                    throttle=self.throttle)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_requests_throttled(self):
+        self.client.get('/v1/test/object')
+        self.client.post('/v1/test/object', {'code': 'asdf'})
+
+        self.assertEqual(self.clock.sleeps, [0.01])
+        self.assertEqual(self.throttle.stats().requests, 2)
+        self.assertEqual(self.client.metrics.histogram('GET /v1/test/object').count, 1)
+
+    def test_retry_after_response(self):
+        limited = mock.MagicMock(status_code=429, headers={'Retry-After': '3'})
+        with mock.patch.object(self.client, '_send', return_value=limited):
+            with self.assertLogs('testharness.rest_api.throttle', 'WARNING'):
+                resp = self.client.get('/v1/test/object')
+        self.assertIs(resp, limited)
+
+        resp = self.client.get('/v1/test/object')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.clock.sleeps, [3.0])